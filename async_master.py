@@ -0,0 +1,173 @@
+import asyncio, itertools, functools, collections.abc, concurrent.futures
+from main import Master
+
+class AsyncMaster:
+    ''' Asyncio facade of Master, for frontends running on an event loop.
+
+    Every call is run on a single worker thread owned by AsyncMaster, in the order the calls were
+    made, so Master is never used by two threads at once and the event loop never waits on the
+    storage. AsyncMaster.load() and AsyncMaster.save() load and write the data; every other public
+    method of Master is available as a coroutine method of the same name, e.g.
+
+        task_id = await amaster.create_task(group_id, task_kwargs={"title": "Title"})
+
+    Task objects returned by Master must only be used on the worker thread, through
+    AsyncMaster.run(). Concurrent calls to AsyncMaster.save() made while a write is running
+    share a single write, made once the running one has finished.
+
+    Iterators must be read on the worker thread too. AsyncMaster.iter_export(),
+    AsyncMaster.iter_tasks() and AsyncMaster.iter_group_tasks() are async generators reading
+    CHUNK_SIZE items at a time there, and other methods that return an iterator raise TypeError.
+
+    The worker thread still shares the interpreter with the event loop. Decoding an entire store
+    in one call holds it until done, so a lazily loaded storage (e.g. JSONStorage(lazy=True))
+    keeps AsyncMaster.load() from stalling the event loop on large stores.
+
+    If 'master' is not passed a Master is created with 'ui' and 'master_kwargs'.
+    '''
+
+    # Number of items the async generators read in each call on the worker thread. Calls made
+    # while iterating run between chunks.
+    CHUNK_SIZE = 1000
+
+    def __init__(self, master=None, ui=None, **master_kwargs):
+        self.master = master or Master(ui, **master_kwargs)
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="AsyncMaster")
+
+        # Saves waiting for the running save to finish, and the running save.
+        self._queued_save = None
+        self._running_save = None
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        method = getattr(self.master, name)
+        if not callable(method):
+            raise AttributeError(f"'{name}' is not a method of Master.")
+
+        async def call(*args, **kwargs):
+            result = await self.run(method, *args, **kwargs)
+            if isinstance(result, collections.abc.Iterator):
+                raise TypeError(f"Master.{name}() returns an iterator, which must be read on the worker thread, see AsyncMaster.run().")
+            return result
+
+        call.__name__ = name
+        call.__doc__ = method.__doc__
+        return call
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.close()
+
+    async def _iterate(self, fn, *args, **kwargs):
+        ''' Yields the items of the iterator returned by calling 'fn' with 'args' and 'kwargs',
+        read on the worker thread CHUNK_SIZE items at a time, each holding Master.lock for
+        reading. '''
+
+        iterator = await self.run(fn, *args, **kwargs)
+
+        def read_chunk():
+            with self.master.lock.read():
+                return list(itertools.islice(iterator, self.CHUNK_SIZE))
+
+        while True:
+            chunk = await self.run(read_chunk)
+            if not chunk:
+                return
+
+            for item in chunk:
+                yield item
+
+    async def _save(self, previous):
+        ''' Writes the data once save 'previous' (if any) has finished. '''
+
+        if previous:
+            await asyncio.wait([previous]) # Its error, if any, is raised to its own callers.
+
+        # Saves requested from here on may include changes made after this write was queued.
+        self._queued_save = None
+        self._running_save = asyncio.current_task()
+
+        await self.run(self.master.write_data)
+
+    async def close(self):
+        ''' Waits for pending saves, closes Master (see Master.close()) and stops the worker
+        thread. Does not write data modified since the last save.
+
+        Raises:
+            FSError
+        '''
+
+        pending = [save for save in (self._queued_save, self._running_save) if save]
+        if pending:
+            await asyncio.wait(pending)
+
+        try:
+            await self.run(self.master.close)
+        finally:
+            self._executor.shutdown(wait=False)
+
+    async def iter_export(self):
+        ''' Yields the records of Master.iter_export(), read on the worker thread.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        async for line in self._iterate(self.master.iter_export):
+            yield line
+
+    async def iter_group_tasks(self, group_id, start=None, limit=None):
+        ''' Yields the task IDs of Master.iter_group_tasks(), read on the worker thread.
+
+        Raises:
+            GroupNotFoundError
+            TaskNotFoundError
+        '''
+
+        async for task_id in self._iterate(self.master.iter_group_tasks, group_id, start=start, limit=limit):
+            yield task_id
+
+    async def iter_tasks(self, start=None, limit=None):
+        ''' Yields the task IDs of Master.iter_tasks(), read on the worker thread. '''
+
+        async for task_id in self._iterate(self.master.iter_tasks, start=start, limit=limit):
+            yield task_id
+
+    async def load(self):
+        ''' Loads the data from the storage, see Master.load_data().
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        await self.run(self.master.load_data)
+
+    async def run(self, fn, *args, **kwargs):
+        ''' Calls 'fn' with 'args' and 'kwargs' on the worker thread, after every call made
+        before it, and returns its result. For access to Task objects, e.g.
+
+            await amaster.run(lambda: amaster.master.get_task(task_id).set_title("Title"))
+        '''
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def save(self):
+        ''' Writes every change made by calls made before this one, see Master.write_data().
+        If a save is already waiting for the running one to finish, this shares it.
+
+        Raises:
+            FSError
+        '''
+
+        if not self._queued_save:
+            self._queued_save = asyncio.get_running_loop().create_task(self._save(self._running_save))
+
+        await asyncio.shield(self._queued_save)
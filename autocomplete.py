@@ -0,0 +1,176 @@
+import bisect, threading
+from globals import *
+
+class TitleIndex:
+    ''' Index of titles, for lookups by title and autocomplete.
+
+    Holds the IDs with each title by lowercased title, along with the lowercased titles in
+    sorted order. The titles starting with a prefix are then a contiguous range of the sorted
+    titles, found by bisection, and the sorted titles double as a trie (the titles under a node
+    being such a range) for matching titles within an edit distance of a text.
+    '''
+
+    def __init__(self, titles=()):
+        self._lock = threading.RLock() # Completions, which cache trie nodes, may be made by several readers at once.
+
+        # IDs (as the keys of a dict, in order) by lowercased title, and the lowercased titles in order.
+        self._ids = {}
+
+        for id, title in titles:
+            self._ids.setdefault(title.lower(), {})[id] = None
+        self._keys = sorted(self._ids)
+
+        # The (start, end) by character of the ranges of the titles under each node of the trie that
+        # have been searched, by the start of its range and its depth. See TitleIndex._children().
+        self._nodes = {}
+
+    def _children(self, lo, hi, depth):
+        ''' Returns a dict of (start, end) of each range of the sorted titles in the range from 'lo'
+        to 'hi' of the titles starting with a prefix of length 'depth', by the character following
+        the prefix, in order. '''
+
+        node = (lo, depth)
+        children = self._nodes.get(node)
+        if children is None:
+            keys = self._keys
+            children = {}
+
+            if lo < hi and len(keys[lo]) == depth: # The prefix itself, which sorts first.
+                lo += 1
+
+            while lo < hi:
+                end = self._end(keys[lo][:depth + 1], lo, hi)
+                children[keys[lo][depth]] = (lo, end)
+                lo = end
+
+            self._nodes[node] = children
+
+        return children
+
+    def _end(self, prefix, lo, hi):
+        ''' Returns the end of the range of the sorted titles starting with 'prefix', which starts
+        at or after 'lo' and ends at or before 'hi'. '''
+
+        while prefix and ord(prefix[-1]) == 0x10FFFF: # No successor, the range ends with that of the rest.
+            prefix = prefix[:-1]
+        if not prefix:
+            return hi
+
+        return bisect.bisect_left(self._keys, prefix[:-1] + chr(ord(prefix[-1]) + 1), lo, hi)
+
+    def _fuzzy(self, text, max_distance):
+        ''' Returns a list of (distance, start, end) for ranges of the sorted titles that start with
+        a prefix within Levenshtein distance 'max_distance' of 'text'. A title may be in several. '''
+
+        ranges = []
+        size = len(text)
+        beyond = max_distance + 1 # Distances over 'max_distance' are all counted as this.
+
+        # The empty prefix, which every title (the empty one included) starts with.
+        if size <= max_distance:
+            ranges.append((size, 0, len(self._keys)))
+
+        # Depth-first through the prefixes of the titles, each with the range of titles starting
+        # with it and the distances between it and each prefix of 'text'. Prefixes further than
+        # 'max_distance' from every prefix of 'text' are not descended into. A distance within
+        # 'max_distance' is between a prefix and a prefix of 'text' of a length at most that far
+        # off, so only those are computed (Ukkonen's band).
+        stack = [(0, len(self._keys), 0, [min(i, beyond) for i in range(size + 1)])]
+
+        while stack:
+            lo, hi, depth, row = stack.pop()
+            children = self._children(lo, hi, depth)
+
+            first = max(1, depth + 1 - max_distance)
+            last = min(size, depth + 1 + max_distance)
+            window = text[first - 1:last]
+
+            # Every character but those of 'text' in the band adds an edit to every distance, which
+            # leaves the prefix too far off once it is 'max_distance' from every prefix of 'text'.
+            # Otherwise the distances following each such character are the same.
+            if min(row) >= max_distance:
+                chars = [char for char in dict.fromkeys(window) if char in children]
+            else:
+                chars = children
+            other_row = None
+
+            for char in chars:
+                lo, end = children[char]
+
+                if char in window or other_row is None:
+                    next_row = [beyond] * (size + 1)
+                    next_row[0] = min(depth + 1, beyond)
+                    for i in range(first, last + 1):
+                        next_row[i] = min(next_row[i - 1] + 1, row[i] + 1, row[i - 1] + (text[i - 1] != char), beyond)
+                    if char not in window:
+                        other_row = next_row
+                else:
+                    next_row = other_row
+
+                distance = next_row[-1]
+                if distance <= max_distance:
+                    ranges.append((distance, lo, end))
+                if min(next_row) < min(distance, beyond):
+                    stack.append((lo, end, depth + 1, next_row))
+
+        ranges.sort()
+        return ranges
+
+    def add(self, id, title):
+        key = title.lower()
+
+        with self._lock:
+            ids = self._ids.get(key)
+            if ids is None:
+                ids = self._ids[key] = {}
+                bisect.insort(self._keys, key)
+                self._nodes = {}
+            ids[id] = None
+
+    def complete(self, text, limit=AUTOCOMPLETE_LIMIT, max_distance=AUTOCOMPLETE_MAX_DISTANCE):
+        ''' Returns a list of up to 'limit' IDs with a title starting with 'text', case ignored, in
+        order of title. If there are fewer than 'limit', they are followed by IDs with a title
+        starting with a text within 'max_distance' edits (insertions, deletions or substitutions
+        of a character) of 'text', fewest edits first. '''
+
+        if limit <= 0:
+            return []
+
+        text = text.lower()
+        matches = {}
+
+        with self._lock:
+            lo = bisect.bisect_left(self._keys, text)
+            end = self._end(text, lo, len(self._keys))
+            ranges = [(0, lo, end)]
+            if end - lo < limit and max_distance > 0 and text:
+                ranges += self._fuzzy(text, max_distance)
+
+            seen = set()
+            for _, lo, end in ranges:
+                for i in range(lo, end):
+                    if i in seen:
+                        continue
+                    seen.add(i)
+
+                    for id in self._ids[self._keys[i]]:
+                        matches[id] = None
+                        if len(matches) == limit:
+                            return list(matches)
+
+        return list(matches)
+
+    def get(self, title):
+        ''' Returns the IDs with 'title', case ignored, as the keys of a dict in order (empty if none). '''
+        return self._ids.get(title.lower(), {})
+
+    def remove(self, id, title):
+        key = title.lower()
+
+        with self._lock:
+            ids = self._ids[key]
+            del ids[id]
+            if not ids:
+                del self._ids[key]
+                del self._keys[bisect.bisect_left(self._keys, key)]
+                self._nodes = {}
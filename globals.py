@@ -1,3 +1,4 @@
+import threading, contextlib
 from ordered_set import OrderedSet
 
 # ! Extend OrderedSet (v 4.1.0)
@@ -21,6 +22,94 @@ class OrderedSet(OrderedSet):
         
         return i + steps
 
+# ! Reader/writer lock
+
+class RWLock:
+    ''' Lock that any number of threads may hold for reading at once, or a single thread for 
+    writing. Both are reentrant, and the thread holding it for writing may also read. A thread 
+    holding it only for reading cannot take it for writing. Waiting writers go before readers 
+    that do not hold it yet, so that a steady stream of readers cannot starve them.
+    '''
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._write_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local() # Read depth of each thread.
+
+    def acquire_read(self):
+        depth = getattr(self._local, "depth", 0)
+        if depth or self._writer == threading.get_ident():
+            self._local.depth = depth + 1
+            return
+
+        with self._condition:
+            while self._writer is not None or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+
+        self._local.depth = 1
+
+    def acquire_write(self):
+        me = threading.get_ident()
+
+        with self._condition:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+
+            if getattr(self._local, "depth", 0):
+                raise RuntimeError("A lock held for reading cannot be taken for writing by the same thread.")
+
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+
+            self._writer = me
+            self._write_depth = 1
+
+    @contextlib.contextmanager
+    def read(self):
+        ''' Holds the lock for reading while the block runs. '''
+
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    def release_read(self):
+        self._local.depth -= 1
+        if self._local.depth or self._writer == threading.get_ident():
+            return
+
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+
+    def release_write(self):
+        with self._condition:
+            self._write_depth -= 1
+            if not self._write_depth:
+                self._writer = None
+                self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def write(self):
+        ''' Holds the lock for writing while the block runs. '''
+
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
 # ! STATIC GLOBALS
 
 COMPLETED_SYMBOL = 'x'
@@ -45,6 +134,40 @@ MAX_TITLE_LENGTH = 9999
 
 MAX_GROUP_TITLE_LENGTH = 50
 
+## Number of records the journal may hold before Master.write_data() folds it into a new snapshot.
+JOURNAL_COMPACT_THRESHOLD = 1000
+
+## Seconds the write-behind thread waits for further writes before committing, see Master(write_behind=True).
+WRITE_BEHIND_DEBOUNCE = 0.5
+
+## Number of records Master.import_stream() holds in memory before writing them to the storage.
+IMPORT_BATCH_SIZE = 10000
+
+## Maximum number of shard files storage.ShardedStorage.preload() reads in parallel.
+SHARD_LOAD_WORKERS = 8
+
+## Number of entries kept in the change log of a shared storage.JSONStorage. A process that has not
+## written to or fetched changes from the store for longer fetches the entire store instead.
+SHARED_CHANGE_LOG_LENGTH = 1000
+
+## Number of tasks whose descendants and whose ancestors (each) graph.TaskGraph keeps in memory.
+GRAPH_CLOSURE_CACHE_SIZE = 1000
+
+## Number of times a word in the title of a task counts for each time it occurs, see search.SearchIndex.
+SEARCH_TITLE_WEIGHT = 3
+
+## Default maximum number of tasks returned by Master.search().
+SEARCH_LIMIT = 20
+
+## Default maximum number of IDs returned by Master.complete_title() and Master.complete_group_title(),
+## and the number of edits a title may be from the text to complete and still match.
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_DISTANCE = 1
+
+## Version of the rules task dicts are validated by, written with the stamp of a trusted store (see
+## Master(trusted_load=True)). Increment when they change, so that stores trusted before are validated.
+TRUSTED_LOAD_VERSION = 1
+
 ## Task Keys
 TASK_COMMENTS = "comments"
 TASK_DESCRIPTION = "description"
@@ -65,6 +188,17 @@ DATA_TASKS = "tasks"
 GROUP_TASKS = "task_ids"
 GROUP_TITLE = "title"
 
+## Journal Keys
+JOURNAL_DATA = "data"
+JOURNAL_ID = "id"
+JOURNAL_OP = "op"
+
+JOURNAL_OP_GROUP = "group"
+JOURNAL_OP_HEADER = "header"
+JOURNAL_OP_REMOVE_GROUP = "remove_group"
+JOURNAL_OP_REMOVE_TASK = "remove_task"
+JOURNAL_OP_TASK = "task"
+
 ## Templates
 
 TASKD_TEMPLATE = {
@@ -0,0 +1,394 @@
+import threading
+from globals import *
+
+class TaskGraph:
+    ''' Index of the subtask and parent relationships between tasks, with a cache of the
+    transitive closure (every descendant or ancestor) of the tasks it has been queried for, and
+    of their progress.
+
+    'nodes' is called with a task ID and returns the IDs of its subtasks, the IDs of its parents 
+    and its status as a tuple, or None if there is no such task. The sequences are kept, and must
+    not be modified afterwards. A task is read once, when the graph first reaches it, and again 
+    when TaskGraph.update() is called for it. Tasks that are never reached are never read, so 
+    that a lazily loaded store is not loaded in full.
+
+    Closures are cached for up to 'cache_size' tasks in each direction. When relationships are
+    added the cached closures that reach the modified task are extended, when they are removed
+    those closures are dropped and computed again on their next query.
+
+    The progress of a task (see TaskGraph.rollup()) is computed once, along with that of every
+    task below it, and of a group (see TaskGraph.group_rollup()) once its tasks have been. After 
+    that TaskGraph.update() adjusts it, along with that of every task above, for each change in
+    status or subtasks.
+
+    The graph is walked iteratively, so that the depth of a hierarchy is not limited by the
+    recursion limit.
+    '''
+
+    def __init__(self, nodes, cache_size=GRAPH_CLOSURE_CACHE_SIZE):
+        self._read = nodes
+        self._cache_size = cache_size
+
+        self._lock = threading.RLock() # Queries modify the graph, and may be made by several readers at once.
+
+        # (Subtask IDs, parent IDs, status) of every task reached, and the cached closures of each direction.
+        self._nodes = {}
+        self._closures = {TASK_SUBTASKS: {}, TASK_PARENTS: {}}
+
+        # [Total, completed] of every task whose progress is known, which includes every task below it.
+        self._rollups = {}
+
+        # [Total, completed, task IDs] of every group whose progress is known, and the IDs of those groups by task ID.
+        self._group_rollups = {}
+        self._rollup_groups = {}
+
+    def _cache(self, task_id, key, closure):
+        ''' Caches 'closure' of task with ID 'task_id' in direction 'key', evicting the least
+        recently used closure if the cache is full. '''
+
+        closures = self._closures[key]
+        closures[task_id] = closure
+
+        if len(closures) > self._cache_size:
+            del closures[next(iter(closures))]
+
+    def _propagate(self, task_id, total, completed):
+        ''' Adds 'total' and 'completed' to the progress of every task above task with ID 
+        'task_id', once for each path to it, and of every group it is in. '''
+
+        stack = [task_id]
+
+        while stack:
+            _task_id = stack.pop()
+
+            for group_id in self._rollup_groups.get(_task_id, ()):
+                self._group_rollups[group_id][0] += total
+                self._group_rollups[group_id][1] += completed
+
+            for parent_id in self._nodes[_task_id][1]:
+                rollup = self._rollups.get(parent_id)
+                if rollup is None: # Nor is that of any task above it.
+                    continue
+
+                rollup[0] += total
+                rollup[1] += completed
+                stack.append(parent_id)
+
+    def _update_closures(self, task_id, old, new):
+        ''' Brings the cached closures in line with the change of task with ID 'task_id' from 
+        node 'old' to node 'new'. '''
+
+        for key, old_ids, new_ids in ((TASK_SUBTASKS, old[0], new[0]), (TASK_PARENTS, old[1], new[1])):
+            added = set(new_ids).difference(old_ids)
+            removed = set(old_ids).difference(new_ids)
+            if not added and not removed:
+                continue
+
+            closures = self._closures[key]
+            affected = [_task_id for _task_id, closure in closures.items() if _task_id == task_id or task_id in closure]
+            if not affected:
+                continue
+
+            extension = set()
+            if added and not removed:
+                try:
+                    for _task_id in added:
+                        if self.neighbors(_task_id, key) is not None:
+                            extension.add(_task_id)
+                            extension.update(self.closure(_task_id, key))
+                except DataError:
+                    removed = True # Dropped, so that the error is raised on their next query.
+
+                if not extension.isdisjoint(affected):
+                    removed = True # The new relationship is recursive.
+
+            for _task_id in affected:
+                if removed:
+                    closures.pop(_task_id, None)
+                elif _task_id in closures:
+                    closures[_task_id].update(extension)
+
+    def _update_rollups(self, task_id, old, new):
+        ''' Brings the progress of task with ID 'task_id', and of every task and group above it,
+        in line with its change from node 'old' to node 'new'. '''
+
+        rollup = self._rollups.get(task_id)
+        if rollup is None: # Nor is that of any task or group above it.
+            return
+
+        total = completed = 0
+        added = set(new[0]).difference(old[0])
+        removed = set(old[0]).difference(new[0])
+
+        try:
+            for subtask_id in added:
+                if self.neighbors(subtask_id, TASK_SUBTASKS) is None: # A nonexistent task, which is not counted.
+                    continue
+
+                if subtask_id == task_id or task_id in self.closure(subtask_id, TASK_SUBTASKS):
+                    raise DataError(task_id=task_id, msg=f"Task with ID '{task_id}' has a recursive relationship with task with ID '{subtask_id}'.")
+
+                subtask_total, subtask_completed = self.rollup(subtask_id)
+                total += 1 + subtask_total
+                completed += self._nodes[subtask_id][2] + subtask_completed
+        except DataError: 
+            # Progress is computed again on the next query, which raises the error.
+            self._rollups = {}
+            self._group_rollups = {}
+            self._rollup_groups = {}
+            return
+
+        for subtask_id in removed:
+            subtask_rollup = self._rollups.get(subtask_id)
+            if subtask_rollup is not None:
+                total -= 1 + subtask_rollup[0]
+                completed -= self._nodes[subtask_id][2] + subtask_rollup[1]
+
+        rollup[0] += total
+        rollup[1] += completed
+
+        self._propagate(task_id, total, completed + new[2] - old[2])
+
+    def clear(self):
+        ''' Forgets every task, for when the relationships have been replaced wholesale. '''
+
+        with self._lock:
+            self._nodes = {}
+            self._closures = {TASK_SUBTASKS: {}, TASK_PARENTS: {}}
+            self._rollups = {}
+            self._group_rollups = {}
+            self._rollup_groups = {}
+
+    def closure(self, task_id, key):
+        ''' Returns a set of the IDs of every task reachable from task with ID 'task_id' through
+        subtasks (if 'key' is TASK_SUBTASKS) or parents (if TASK_PARENTS). IDs of tasks that do
+        not exist are left out. The set is the cached one, and must not be modified.
+
+        Raises:
+            DataError
+            TaskNotFoundError
+            ValueError
+        '''
+
+        if key not in self._closures:
+            raise ValueError(f"'key' must be either '{TASK_SUBTASKS}' or '{TASK_PARENTS}'.")
+
+        with self._lock:
+            closures = self._closures[key]
+
+            if task_id in closures:
+                closure = closures.pop(task_id) # Reinserted as the most recently used.
+                closures[task_id] = closure
+                return closure
+
+            if self.neighbors(task_id, key) is None:
+                raise TaskNotFoundError(task_id=task_id)
+
+            # Depth-first, with the path walked so far in 'path' to detect recursive relationships.
+            # The closures of tasks reached that are cached are used as they are.
+            reached = set()
+            path = {task_id}
+            stack = [(task_id, iter(self.neighbors(task_id, key)))]
+
+            while stack:
+                current_id, neighbors = stack[-1]
+                next_id = next(neighbors, None)
+
+                if next_id is None:
+                    stack.pop()
+                    path.discard(current_id)
+                    continue
+
+                if next_id in path:
+                    raise DataError(task_id=current_id, msg=f"Task with ID '{current_id}' has a recursive relationship with task with ID '{next_id}'.")
+
+                if next_id in reached:
+                    continue
+
+                if next_id in closures:
+                    if not path.isdisjoint(closures[next_id]):
+                        raise DataError(task_id=next_id, msg=f"Task with ID '{next_id}' has a recursive relationship with task with ID '{current_id}'.")
+                    reached.add(next_id)
+                    reached.update(closures[next_id])
+                    continue
+
+                next_neighbors = self.neighbors(next_id, key)
+                if next_neighbors is None: # A nonexistent task, most likely from a subtasks or parents list.
+                    continue
+
+                reached.add(next_id)
+                path.add(next_id)
+                stack.append((next_id, iter(next_neighbors)))
+
+            self._cache(task_id, key, reached)
+
+            return reached
+
+    def forget_group(self, group_id):
+        ''' Forgets the progress of group with ID 'group_id', after its tasks have changed. '''
+
+        with self._lock:
+            group_rollup = self._group_rollups.pop(group_id, None)
+            if group_rollup is None:
+                return
+
+            for task_id in group_rollup[2]:
+                group_ids = self._rollup_groups.get(task_id)
+                if group_ids:
+                    group_ids.discard(group_id)
+                    if not group_ids:
+                        del self._rollup_groups[task_id]
+
+    def group_rollup(self, group_id, task_ids):
+        ''' Returns the progress of group with ID 'group_id', which holds the tasks with ID in
+        'task_ids', as a pair of the number of tasks in it and below them, and the number of 
+        those that are completed. See TaskGraph.rollup().
+
+        Raises:
+            DataError
+        '''
+
+        with self._lock:
+            group_rollup = self._group_rollups.get(group_id)
+            if group_rollup is None:
+                total = completed = 0
+                task_ids = [task_id for task_id in task_ids if self.neighbors(task_id, TASK_SUBTASKS) is not None]
+
+                for task_id in task_ids:
+                    task_total, task_completed = self.rollup(task_id)
+                    total += 1 + task_total
+                    completed += self._nodes[task_id][2] + task_completed
+
+                group_rollup = self._group_rollups[group_id] = [total, completed, task_ids]
+                for task_id in task_ids:
+                    self._rollup_groups.setdefault(task_id, set()).add(group_id)
+
+            return group_rollup[0], group_rollup[1]
+
+    def neighbors(self, task_id, key):
+        ''' Returns the subtask (if 'key' is TASK_SUBTASKS) or parent (if TASK_PARENTS) IDs of
+        task with ID 'task_id', or None if there is no such task. '''
+
+        node = self._nodes.get(task_id)
+        if node is None:
+            edges = self._read(task_id)
+            if edges is None:
+                return None
+
+            node = self._nodes[task_id] = edges
+
+        return node[0] if key == TASK_SUBTASKS else node[1]
+
+    def rollup(self, task_id):
+        ''' Returns the progress of task with ID 'task_id' as a pair of the number of tasks below
+        it, and the number of those that are completed. A task is counted once for each path 
+        of subtasks to it, which in a tree (where no task has several parents) is once.
+
+        Raises:
+            DataError
+            TaskNotFoundError
+        '''
+
+        with self._lock:
+            rollup = self._rollups.get(task_id)
+            if rollup is not None:
+                return rollup[0], rollup[1]
+
+            if self.neighbors(task_id, TASK_SUBTASKS) is None:
+                raise TaskNotFoundError(task_id=task_id)
+
+            # Depth-first, computing the progress of each task once that of its subtasks is known.
+            path = {task_id}
+            stack = [(task_id, iter(self._nodes[task_id][0]))]
+
+            while stack:
+                current_id, subtask_ids = stack[-1]
+                next_id = next(subtask_ids, None)
+
+                if next_id is None:
+                    stack.pop()
+                    path.discard(current_id)
+
+                    total = completed = 0
+                    for subtask_id in self._nodes[current_id][0]:
+                        subtask_rollup = self._rollups.get(subtask_id)
+                        if subtask_rollup is not None: # Otherwise a nonexistent task.
+                            total += 1 + subtask_rollup[0]
+                            completed += self._nodes[subtask_id][2] + subtask_rollup[1]
+
+                    self._rollups[current_id] = [total, completed]
+                    continue
+
+                if next_id in path:
+                    raise DataError(task_id=current_id, msg=f"Task with ID '{current_id}' has a recursive relationship with task with ID '{next_id}'.")
+
+                if next_id in self._rollups or self.neighbors(next_id, TASK_SUBTASKS) is None:
+                    continue
+
+                path.add(next_id)
+                stack.append((next_id, iter(self._nodes[next_id][0])))
+
+            rollup = self._rollups[task_id]
+            return rollup[0], rollup[1]
+
+    def reachable(self, task_ids, key):
+        ''' Returns a set of the IDs of the tasks in 'task_ids' and of every task reachable from
+        them through subtasks (if 'key' is TASK_SUBTASKS) or parents (if TASK_PARENTS). IDs of
+        tasks that do not exist are left out. Unlike TaskGraph.closure() the result is not cached,
+        and recursive relationships are not an error. '''
+
+        with self._lock:
+            closures = self._closures[key]
+            reached = set()
+            stack = list(task_ids)
+
+            while stack:
+                task_id = stack.pop()
+                if task_id in reached:
+                    continue
+
+                neighbors = self.neighbors(task_id, key)
+                if neighbors is None:
+                    continue
+
+                reached.add(task_id)
+                if task_id in closures:
+                    reached.update(closures[task_id])
+                else:
+                    stack.extend(neighbors)
+
+            return reached
+
+    def remove(self, task_ids):
+        ''' Forgets the tasks with ID in 'task_ids', after they have been removed and detached 
+        from the remaining tasks, and drops the cached closures that reach any of them. '''
+
+        task_ids = set(task_ids)
+
+        with self._lock:
+            for task_id in task_ids:
+                self._nodes.pop(task_id, None)
+                self._rollups.pop(task_id, None)
+
+            for closures in self._closures.values():
+                for task_id in [task_id for task_id, closure in closures.items() if task_id in task_ids or not task_ids.isdisjoint(closure)]:
+                    del closures[task_id]
+
+    def update(self, task_id):
+        ''' Reads task with ID 'task_id' again, after it has been modified, created or removed,
+        and brings the cached closures and progress in line with it. '''
+
+        with self._lock:
+            old = self._nodes.pop(task_id, None)
+            if old is None: # Not reached yet, so nothing depends on it.
+                return
+
+            new = self._read(task_id)
+            if new is None:
+                self._rollups.pop(task_id, None)
+                self._update_closures(task_id, old, ((), (), False))
+                return
+
+            self._nodes[task_id] = new
+            self._update_rollups(task_id, old, new)
+            self._update_closures(task_id, old, new)
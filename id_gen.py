@@ -39,3 +39,9 @@ def increment_id(id):
     id = int_to_base(n, 36)
     return id
 
+
+def id_key(id):
+    ''' Returns a sort key of id string, ordering IDs generated by increment_id() in the order
+    they were generated. '''
+
+    return (len(id), id)
@@ -1,18 +1,186 @@
-import os, json, copy
+import os, sys, copy, json, time, bisect, random, argparse, functools, threading, contextlib
 from task import Task
-from id_gen import increment_id
+from graph import TaskGraph
+from autocomplete import TitleIndex
+from id_gen import id_key, increment_id, int_to_base
+from search import SearchIndex
+from storage import BinaryStorage, JSONStorage, LazyDict, ShardedStorage, SQLiteStorage, WriteBehind, atomic_write, task_dict, task_text, task_title
 from globals import *
 
+def _reader(method):
+    ''' Runs Master method 'method' holding Master.lock for reading. '''
+
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        self.lock.acquire_read()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.lock.release_read()
+
+    return locked
+
+def _writer(method):
+    ''' Runs Master method 'method' holding Master.lock for writing. '''
+
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        self.lock.acquire_write()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.lock.release_write()
+
+    return locked
+
 class Master:
-    ''' Manages I/O operations and Task objects. '''
-    def __init__(self, ui):
+    ''' Manages I/O operations and Task objects. 
+    
+    Data is persisted through 'storage', a storage backend (see storage.Storage). If not passed,
+    a JSONStorage at 'storage.json' next to this file is used. If 'journal' is True the default
+    JSONStorage appends changes to a journal file instead of rewriting the whole store, see
+    storage.JSONStorage.
+
+    If 'write_behind' is True, Master.write_data() only captures the modified data and returns,
+    leaving the write to a background thread that commits once no further write has been made 
+    for 'debounce' seconds (see storage.WriteBehind). Call Master.flush() to wait for pending 
+    writes, and Master.close() before exiting.
+
+    If 'shared' is True the default JSONStorage may be used by several processes at once (see
+    storage.JSONStorage). Every write then first merges the changes other processes have made
+    to the store since into self.data, see Master.sync(). A 'storage' passed along with 'shared'
+    must be shared itself, or ValueError is raised.
+
+    If 'lazy_neighbors' is True, loading a task (see Master.load_task()) converts only that task
+    to a Task object, and its parents and subtasks are converted once they are accessed in turn.
+    Otherwise every task connected to it is converted along with it.
+
+    If 'persist_search' is True the search index (see Master.search()) is written next to the
+    store on Master.close(), and read back by Master.load_data() rather than built anew, as long
+    as the store has not been written to since.
+
+    If 'trusted_load' is True the stamp of the store (see storage.Storage.stamp()) is written
+    to TRUST_PATH on Master.close(), if every stored task is known to be valid. As long as the
+    store has not been written to since, Master.load_data() then trusts the stored tasks, and
+    loading a task converts its task dict without validating it. Otherwise every stored task is
+    validated by Master.load_data(), once, before self.data is replaced. If any is invalid (or
+    the storage is lazily loaded) tasks are validated as they are loaded instead, until 
+    Master.validate_tasks() is called.
+
+    Master may be used by several threads at once. Methods that only read self.data hold 'lock'
+    (see globals.RWLock) for reading, and run in parallel, while methods that modify it hold it 
+    for writing, as do the modifying methods of its Task objects. Hold Master.lock.read() while
+    iterating Master.iter_export(), and either while doing several calls that must see the same
+    data.
+
+    Some methods that hold 'lock' for reading still modify the state of Master: they build the
+    indexes that are built on first use (see Master._group_index(), Master._search_index(),
+    Master._task_order_index(), Master._title_index() and the title indexes of 
+    Master.complete_title() and Master.complete_group_title()) and convert task dicts to Task
+    objects (see Master.load_task(), Master.load_tasks() and Master.get_task()).
+    They do so holding '_cache_lock', and set each index once it is complete. The indexes, and
+    a lazily loaded LazyDict, lock themselves against concurrent readers.
+    '''
+    def __init__(self, ui, journal=False, storage=None, write_behind=False, debounce=WRITE_BEHIND_DEBOUNCE, shared=False, lazy_neighbors=False, persist_search=False, trusted_load=False):
         self.ui = ui
+        self.lazy_neighbors = lazy_neighbors
+        self.persist_search = persist_search
+        self.trusted_load = trusted_load
+
+        self.lock = RWLock()
+        self._cache_lock = threading.RLock() # Held while building indexes or converting task dicts to Task objects, which readers may do concurrently.
 
         self.SCRIPT_DIR = self._get_script_dir()
-        self.STORAGE_PATH = os.path.join(self.SCRIPT_DIR, "storage.json")
+
+        if storage and shared and not storage.shared:
+            raise ValueError(f"'shared' was passed, but the storage at '{storage.path}' is not shared.")
+
+        self.storage = storage or JSONStorage(os.path.join(self.SCRIPT_DIR, "storage.json"), journal=journal, shared=shared)
+        self.storage.master = self
+        self.STORAGE_PATH = self.storage.path
+        self.SEARCH_INDEX_PATH = os.path.splitext(self.STORAGE_PATH)[0] + ".search"
+        self.TRUST_PATH = os.path.splitext(self.STORAGE_PATH)[0] + ".trust"
+        self._writer = WriteBehind(self.storage, debounce) if write_behind else None
 
         self.data = {}
+
+        # Modified since the last write, as the keys of dicts, in the order first modified. New tasks
+        # and groups are written in that order, which keeps the order of the store that of creation.
+        self._dirty_tasks = {}
+        self._dirty_groups = {}
+        self._dirty_header = False
+
+        # Current task and group IDs as last loaded or written, see Master._merge_changes().
+        self._synced_ids = {}
+
+        # Header values and groups as last loaded or written, and the task dicts of the tasks that
+        # have been loaded, modified or merged since, as last loaded or written. The base of merges
+        # (see Master._merge_changes()) when a shared store is lazily loaded, and so has no backup.
+        self._merge_base = {}
+
+        # Group IDs of each task in a group, see Master._group_index().
+        self._task_groups = None
+
+        # Parent and subtask relationships between tasks, see Master.ancestors() and Master.get_progress().
+        self._graph = TaskGraph(self._task_node)
+
+        # Task IDs by title, and the title of each task, see Master._title_index(). Task IDs by title
+        # in each group, and group IDs by title, see Master.complete_title().
+        self._titles = None
+        self._task_titles = None
+        self._group_task_titles = {}
+        self._group_titles = None
+
+        # Words in the title, description and comments of each task, see Master._search_index().
+        self._search = SearchIndex()
+
+        # Every task ID, in order of ID, see Master._task_order_index().
+        self._task_order = None
+
+        # True if every task dict in self.data is known to be valid, see Master.validate_tasks().
+        self._trusted = False
     
+    def _advance_id(self, key, id):
+        ''' Sets header value 'key' (DATA_CURRENT_TASK or DATA_CURRENT_GROUP) to 'id' if 'id' comes
+        after it (see id_gen.id_key()), so that no ID up to 'id' is given out again.
+
+        Raises:
+            TypeError
+        '''
+
+        if not isinstance(id, str):
+            raise TypeError(f"Expected an ID of type str, got '{id}'.")
+
+        if id_key(id) > id_key(self.data[key]):
+            self.data[key] = id
+            self._dirty_header = True
+
+    def _check_trust(self, data):
+        ''' Returns True if the task dicts in 'data', as loaded from the store, can be converted
+        without validation: if TRUST_PATH holds the stamp of the store or, unless the store is
+        lazily loaded, every task dict is valid. Invalid task dicts are reported, and left to be
+        validated as they are loaded. '''
+
+        if self._load_trust():
+            return True
+        if self.storage.lazy:
+            return False
+
+        try:
+            Task.validate_dicts(data[DATA_TASKS].items())
+        except (TypeError, ValueError) as e:
+            self.ui.relay(message=f"Stored tasks will be validated as they are loaded, as some are invalid.\nDetails: {e}")
+            return False
+
+        return True
+
+    def _clear_dirty(self):
+        self._dirty_tasks = {}
+        self._dirty_groups = {}
+        self._dirty_header = False
+
+        self._synced_ids = {key: self.data.get(key) for key in (DATA_CURRENT_TASK, DATA_CURRENT_GROUP)}
+
     def _convert_to_dict(self, task_id):
         ''' Converts a Task object to a task dictionary.
 
@@ -23,76 +191,162 @@ class Master:
         self.data[DATA_TASKS][task_id] = task_dict
 
     def _deep_remove_task(self, task_id):
-        ''' Removes task with ID task_id from Master.data[DATA_TASKS], then iterates through
-        all tasks in the dict and removes task with ID task_id from any parents or subtasks
-        lists.
-
-        If the task is parent to any other tasks those subtasks are removed as well,
-        recursively.
-         
-        This function is intended as fallback for Master.remove_task() (and is potentially slower)
-        as well as for use when data corruption is suspected (for example, a non-existent task ID 
-        remaining in a parents or subtasks list).
+        ''' Removes task with ID task_id from Master.data[DATA_TASKS] along with every task that
+        is its subtask or has it as a parent, recursively, and removes them from the groups and
+        subtasks lists of the remaining tasks. Tasks that are neither a Task object nor a task 
+        dict are removed as well.
+
+        Relationships are read from the subtasks and the parents lists of every task, in a single
+        scan. This function is intended as fallback for Master.remove_tasks() for when data 
+        corruption is suspected (for example, a non-existent task ID remaining in a parents or 
+        subtasks list).
         '''
 
-        to_remove = set()
+        tasks = self.data[DATA_TASKS]
         taskd_keys = TASKD_TEMPLATE.keys()
 
-        for _task_id, _task in copy.copy(self.data[DATA_TASKS]).items():
-            if task_id == _task_id:
-                pass
-            
-            if isinstance(_task, Task):
-                _task.remove_subtask(task_id)
+        children = {}
+        to_remove = {task_id}
 
-                if task_id in _task.get_parents(): 
-                    to_remove.add(_task_id)
+        for _task_id, _task in tasks.items():
+            if isinstance(_task, Task):
+                subtasks, parents = _task.get_subtasks(), _task.get_parents()
+            elif isinstance(_task, dict) and _task.keys() == taskd_keys:
+                subtasks, parents = _task[TASK_SUBTASKS], _task[TASK_PARENTS]
+            else:
+                to_remove.add(_task_id)
+                continue
 
-                    for __task_id in _task.get_subtasks():
-                        to_remove.add(__task_id)
-            elif isinstance(_task, dict):
-                if _task.keys() != taskd_keys:
-                    to_remove.add(_task_id)
-                    continue
+            children.setdefault(_task_id, set()).update(subtasks)
+            for parent_id in parents:
+                children.setdefault(parent_id, set()).add(_task_id)
 
-                if task_id in _task[TASK_SUBTASKS]:
-                    _task[TASK_SUBTASKS].remove(task_id)
+        stack = list(to_remove)
+        while stack:
+            for child_id in children.get(stack.pop(), ()):
+                if child_id not in to_remove:
+                    to_remove.add(child_id)
+                    stack.append(child_id)
 
-                if task_id in _task[TASK_PARENTS]:
-                    to_remove.add(_task_id)
+        for _task_id, _task in list(tasks.items()):
+            if _task_id not in to_remove and not to_remove.isdisjoint(children.get(_task_id, ())):
+                self._remove_subtasks(_task_id, to_remove)
 
-                    for __task_id in _task[TASK_SUBTASKS]:
-                        to_remove.add(__task_id)
-            else:
-                to_remove.add(_task_id)
-                
-        try:
-            self.data[DATA_TASKS].pop(task_id) 
-        except KeyError: # A nonexistent task, most likely from a subtasks or parents list.
-            pass
+        self._remove_from_groups(to_remove)
 
         for _task_id in to_remove:
-            for group_id in self.data[DATA_GROUPS]:
-                self.group_remove_task(_task_id, group_id)
-            self._deep_remove_task(_task_id)
+            if tasks.pop(_task_id, None) is not None: # Otherwise a nonexistent task, most likely from a subtasks or parents list.
+                self._dirty_tasks[_task_id] = None
+
+        self._graph.clear()
+        self._titles = None
+        self._group_task_titles = {}
+        self._group_titles = None
+        self._search.clear()
+        self._task_order = None
+
+    def _export_line(self, op, id=None, data=None):
+        ''' Returns a record of Master.iter_export() as a line of JSON text. '''
+
+        record = {JOURNAL_OP: op}
+        if id is not None:
+            record[JOURNAL_ID] = id
+        record[JOURNAL_DATA] = data
+
+        return json.dumps(record, ensure_ascii=False) + '\n'
 
     def _get_script_dir(self):
         ''' Get the directory of the file that Master object is created from. '''
         dirname, _ = os.path.split(__file__)
         return os.path.abspath(dirname)
 
-    def _groups_task_ids_to(self, type, data):
-        ''' Converts task IDs in a group to set or list. 
-        
-        Raises:
-            TypeError
-        '''
-        
-        if not (type == OrderedSet or type == list):
-            raise TypeError(f"Invalid type provided: {type}") 
+    def _group_changed(self, group_id):
+        ''' Marks group with ID 'group_id' as modified since the last write. '''
+        self._dirty_groups[group_id] = None
+        self._graph.forget_group(group_id)
+        self._group_task_titles.pop(group_id, None)
+        self._group_titles = None
+
+    def _group_index(self):
+        ''' Returns a dict of the IDs of the groups each task is in (as a set) by task ID, for 
+        tasks in any group. It is built from self.data on first use after the groups have been 
+        loaded or replaced, and kept up to date by the methods that add or remove group tasks. '''
+
+        with self._cache_lock:
+            if self._task_groups is None:
+                index = {}
+                for group_id, group in self.data[DATA_GROUPS].items():
+                    for task_id in group[GROUP_TASKS]:
+                        index.setdefault(task_id, set()).add(group_id)
+
+                self._task_groups = index
+
+            return self._task_groups
+
+    def _index_add(self, task_id, group_id):
+        ''' Records task with ID 'task_id' as in group with ID 'group_id' in the group index. '''
+
+        if self._task_groups is not None:
+            self._task_groups.setdefault(task_id, set()).add(group_id)
+
+    def _index_order(self, task_id):
+        ''' Adds task with ID 'task_id' to or removes it from the task order index (see 
+        Master._task_order_index()), after it has been created or removed. '''
+
+        if self._task_order is None:
+            return
+
+        order = self._task_order
+        i = bisect.bisect_left(order, id_key(task_id), key=id_key)
+        indexed = i < len(order) and order[i] == task_id
+
+        if task_id in self.data[DATA_TASKS]:
+            if not indexed:
+                order.insert(i, task_id)
+        elif indexed:
+            del order[i]
+
+    def _index_remove(self, task_id, group_id):
+        ''' Records task with ID 'task_id' as no longer in group with ID 'group_id' in the group index. '''
+
+        if self._task_groups is None:
+            return
 
-        for group_id in data[DATA_GROUPS].keys():
-            data[DATA_GROUPS][group_id][GROUP_TASKS] = type(data[DATA_GROUPS][group_id][GROUP_TASKS])
+        group_ids = self._task_groups.get(task_id)
+        if group_ids:
+            group_ids.discard(group_id)
+            if not group_ids:
+                del self._task_groups[task_id]
+
+    def _index_title(self, task_id):
+        ''' Brings the title indexes of the tasks and of the groups it is in in line with the title
+        of task with ID 'task_id', after it has been modified, created or removed. '''
+
+        if self._titles is None:
+            return
+
+        task = self.data[DATA_TASKS].get(task_id)
+        title = task_title(task) if task is not None else None
+        old_title = self._task_titles.get(task_id)
+        if title == old_title:
+            return
+
+        indexes = [self._titles]
+        if self._group_task_titles:
+            for group_id in self._group_index().get(task_id, ()):
+                if group_id in self._group_task_titles:
+                    indexes.append(self._group_task_titles[group_id])
+
+        if old_title is not None:
+            for index in indexes:
+                index.remove(task_id, old_title)
+
+        if title is None:
+            del self._task_titles[task_id]
+        else:
+            self._task_titles[task_id] = title
+            for index in indexes:
+                index.add(task_id, title)
 
     def _is_Task(self, task_id):
         ''' Confirms if task ID is a Task object. 
@@ -111,9 +365,323 @@ class Master:
     def _is_group(self, group_id):
         ''' Raises GroupNotFoundError if a group does not exist. '''
         
-        if not group_id in self.get_groups():
+        if not group_id in self.data[DATA_GROUPS]:
             raise GroupNotFoundError(group_id=group_id)
 
+    def _iter_from(self, items, start, limit):
+        ''' Returns an iterator over up to 'limit' (every one if None) items of list 'items' from
+        index 'start'. A page of 'limit' items is copied, otherwise items are read as iterated. '''
+
+        if limit is not None:
+            return iter(items[start:start + max(limit, 0)])
+
+        def iterate(i):
+            while i < len(items):
+                yield items[i]
+                i += 1
+
+        return iterate(start)
+
+    def _keep_base(self, task_id, task):
+        ''' Keeps stored task dict 'task' of task with ID 'task_id' in '_merge_base' before it is
+        converted or replaced, unless the task has been modified since the last write. '''
+
+        bases = self._merge_base.get(DATA_TASKS)
+        if bases is not None and task_id not in self._dirty_tasks:
+            bases.setdefault(task_id, task)
+
+    def _load_tasks(self, task_ids):
+        ''' Converts task dicts to Task objects for tasks with ID in 'task_ids' and, unless
+        lazy_neighbors, for their parents and subtasks, theirs and so on. See Master.load_tasks().
+
+        Raises:
+            DataError
+            TaskNotFoundError
+        '''
+
+        tasks = self.data[DATA_TASKS]
+        pending = {}
+        stack = list(task_ids)
+
+        while stack:
+            task_id = stack.pop()
+            if task_id in pending:
+                continue
+
+            try:
+                task = tasks[task_id]
+            except KeyError as e:
+                raise TaskNotFoundError(task_id=task_id) from e
+
+            if isinstance(task, Task):
+                continue
+
+            pending[task_id] = task
+            self._keep_base(task_id, task)
+
+            if not self.lazy_neighbors and isinstance(task, dict):
+                for key in (TASK_SUBTASKS, TASK_PARENTS):
+                    if isinstance(task.get(key), list):
+                        stack.extend(task[key])
+
+        try:
+            loaded = Task.load_dicts(self, pending.items(), validate=not self._trusted)
+        except (TypeError, ValueError) as e:
+            raise DataError(msg=f"Data in loaded task dicts was invalid.\nDetails: {e}") from e
+
+        for task in loaded:
+            tasks[task.get_id()] = task
+
+    def _load_trust(self):
+        ''' Returns True if TRUST_PATH holds the current stamp of the store, written with the
+        current TRUSTED_LOAD_VERSION by Master._save_trust(). A missing or unreadable file is
+        not trusted. '''
+
+        try:
+            with open(self.TRUST_PATH, mode='r', encoding='utf-8') as f:
+                trust = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        return trust == [TRUSTED_LOAD_VERSION, self.storage.stamp()]
+
+    def _merge_changes(self, changes):
+        ''' Merges 'changes', made to the store by other processes and returned by
+        storage.Storage.fetch_changes(), into self.data.
+
+        Tasks and groups not modified since the last write are replaced with (or removed as in)
+        'changes'. Those modified on both sides are merged field by field, with the data as last
+        written (STORAGE_BACKUP, if any) as their common base: a field changed on one side takes
+        the value of that side, a list changed on both sides keeps the items added by either side
+        and drops those removed by either side, and any other field changed on both sides keeps
+        the local value. If the store is lazily loaded the base is '_merge_base' instead. A task
+        or group removed on one side and modified on the other keeps the local change.
+
+        Tasks and groups created since the last write are given new IDs if other processes have
+        created tasks or groups since as well, as both will have been given the same IDs.
+        '''
+
+        if not changes:
+            return
+
+        self._trusted = False # Written by another process, which may not have validated them.
+
+        changes, complete = changes
+        backup = self._merge_base if self.storage.lazy else getattr(self, "STORAGE_BACKUP", {})
+        has_backup = DATA_TASKS in backup
+
+        for key, container in ((DATA_CURRENT_TASK, DATA_TASKS), (DATA_CURRENT_GROUP, DATA_GROUPS)):
+            if key not in changes:
+                continue
+
+            synced, local, remote = (int(id, 36) for id in (self._synced_ids.get(key) or changes[key], self.data[key], changes[key]))
+            if local > synced and remote > synced:
+                offset = remote - synced
+                self._rename(container, {int_to_base(n, 36): int_to_base(n + offset, 36) for n in range(synced + 1, local + 1)})
+                local += offset
+
+            self.data[key] = int_to_base(max(local, remote), 36)
+            if local > remote:
+                self._dirty_header = True
+
+        for key, value in changes.items():
+            if key in (DATA_GROUPS, DATA_TASKS, DATA_CURRENT_TASK, DATA_CURRENT_GROUP):
+                continue
+
+            if not self._dirty_header or (key in backup and self.data.get(key) == backup[key]):
+                self.data[key] = value
+
+        if has_backup:
+            backup.update((key, value) for key, value in changes.items() if key not in (DATA_GROUPS, DATA_TASKS))
+
+        groups = self.data[DATA_GROUPS]
+        remote_groups = changes[DATA_GROUPS]
+        if complete:
+            remote_groups = dict(remote_groups, **{group_id: None for group_id in groups if group_id not in remote_groups})
+        if remote_groups:
+            self._task_groups = None
+
+        for group_id, group in remote_groups.items():
+            if group is not None:
+                group = {GROUP_TASKS: list(group[GROUP_TASKS]), GROUP_TITLE: group[GROUP_TITLE]}
+
+            if group_id not in self._dirty_groups:
+                if group is None:
+                    groups.pop(group_id, None)
+                else:
+                    groups[group_id] = {GROUP_TASKS: OrderedSet(group[GROUP_TASKS]), GROUP_TITLE: group[GROUP_TITLE]}
+            elif group is not None and group_id in groups:
+                local_group = {GROUP_TASKS: list(groups[group_id][GROUP_TASKS]), GROUP_TITLE: groups[group_id][GROUP_TITLE]}
+                merged = self._merge_dicts(backup.get(DATA_GROUPS, {}).get(group_id), local_group, group)
+                groups[group_id] = {GROUP_TASKS: OrderedSet(merged[GROUP_TASKS]), GROUP_TITLE: merged[GROUP_TITLE]}
+
+            if has_backup:
+                if group is None:
+                    backup[DATA_GROUPS].pop(group_id, None)
+                else:
+                    backup[DATA_GROUPS][group_id] = group
+
+        tasks = self.data[DATA_TASKS]
+        remote_tasks = changes[DATA_TASKS]
+        if complete:
+            remote_tasks = dict(remote_tasks, **{task_id: None for task_id in list(tasks) if task_id not in remote_tasks})
+        if remote_tasks:
+            self._graph.clear()
+            self._titles = None
+            self._group_task_titles = {}
+            self._group_titles = None
+            self._search.clear()
+            self._task_order = None
+
+        for task_id, taskd in remote_tasks.items():
+            if task_id not in self._dirty_tasks:
+                if taskd is None:
+                    tasks.pop(task_id, None)
+                else:
+                    tasks[task_id] = taskd
+            elif taskd is not None and task_id in tasks:
+                tasks[task_id] = self._merge_dicts(backup.get(DATA_TASKS, {}).get(task_id), task_dict(tasks[task_id]), taskd)
+
+            if has_backup:
+                if taskd is None:
+                    backup[DATA_TASKS].pop(task_id, None)
+                else:
+                    backup[DATA_TASKS][task_id] = taskd
+
+        self._synced_ids = {key: self.data[key] for key in (DATA_CURRENT_TASK, DATA_CURRENT_GROUP)}
+
+    def _merge_dicts(self, base, local, remote):
+        ''' Returns a merge of task dicts (or groups with task IDs in a list) 'local' and 'remote',
+        both modified from 'base', which is None if unknown. See Master._merge_changes(). '''
+
+        base = base or {}
+        merged = {}
+
+        for key, value in local.items():
+            remote_value = remote[key]
+            base_value = base.get(key)
+
+            if value == remote_value or remote_value == base_value:
+                merged[key] = value
+            elif value == base_value:
+                merged[key] = remote_value
+            elif isinstance(value, list):
+                base_items, local_items, remote_items = set(base_value or ()), set(value), set(remote_value)
+                merged[key] = [item for item in remote_value if item in local_items or item not in base_items]
+                merged[key] += [item for item in value if item not in remote_items and item not in base_items]
+            else:
+                merged[key] = value
+
+        return merged
+
+    def _remove_from_groups(self, task_ids):
+        ''' Removes every task with ID in set 'task_ids' from the groups it is in, rebuilding the
+        task IDs of each group once. '''
+
+        index = self._group_index()
+        group_tasks = {}
+
+        for task_id in task_ids:
+            for group_id in index.get(task_id, ()):
+                group_tasks.setdefault(group_id, set()).add(task_id)
+
+        for group_id, removed in group_tasks.items():
+            group = self.data[DATA_GROUPS][group_id]
+            group[GROUP_TASKS] = OrderedSet(task_id for task_id in group[GROUP_TASKS] if task_id not in removed)
+
+            for task_id in removed:
+                self._index_remove(task_id, group_id)
+            self._group_changed(group_id)
+
+    def _remove_subtasks(self, task_id, subtask_ids):
+        ''' Removes every ID in set 'subtask_ids' from the subtasks of task with ID 'task_id'. A 
+        task dict is replaced rather than modified, as it may be shared (see Task.write_dict()). '''
+
+        task = self.data[DATA_TASKS][task_id]
+
+        if isinstance(task, Task):
+            task.remove_subtasks(subtask_ids)
+        elif not subtask_ids.isdisjoint(task[TASK_SUBTASKS]):
+            self._keep_base(task_id, task)
+            self.data[DATA_TASKS][task_id] = dict(task, **{TASK_SUBTASKS: [id for id in task[TASK_SUBTASKS] if id not in subtask_ids]})
+            self.task_changed(task_id)
+
+    def _rename(self, container, ids):
+        ''' Gives the tasks (if 'container' is DATA_TASKS) or groups (if DATA_GROUPS) created since
+        the last write new IDs, as mapped from their current ones by 'ids'. References to them can
+        only be held by tasks and groups modified since the last write, so only those are updated. '''
+
+        items = self.data[container]
+        dirty = self._dirty_tasks if container == DATA_TASKS else self._dirty_groups
+
+        # Every item is taken out before any is put back, as new IDs may be among the old ones, and
+        # put back in order so that they are written in the order they were created.
+        moved = []
+        for old_id, new_id in ids.items():
+            if old_id in dirty:
+                del dirty[old_id]
+                if old_id in items:
+                    moved.append((new_id, items.pop(old_id)))
+
+        for new_id, item in moved:
+            items[new_id] = task_dict(item) if container == DATA_TASKS else item
+            dirty[new_id] = None
+
+        self._task_groups = None
+        self._graph.clear()
+        self._titles = None
+        self._group_task_titles = {}
+        self._group_titles = None
+        self._search.clear()
+        self._task_order = None
+
+        if container == DATA_GROUPS:
+            self.data[DATA_ACTIVE_GROUP] = ids.get(self.data[DATA_ACTIVE_GROUP], self.data[DATA_ACTIVE_GROUP])
+            return
+
+        def rename(task_ids):
+            return [ids.get(task_id, task_id) for task_id in task_ids]
+
+        for task_id in self._dirty_tasks:
+            task = self.data[DATA_TASKS].get(task_id)
+            if task is None:
+                continue
+
+            taskd = task_dict(task)
+            if any(id in ids for id in taskd[TASK_SUBTASKS]) or any(id in ids for id in taskd[TASK_PARENTS]):
+                self.data[DATA_TASKS][task_id] = dict(taskd, **{TASK_SUBTASKS: rename(taskd[TASK_SUBTASKS]), TASK_PARENTS: rename(taskd[TASK_PARENTS])})
+
+        for group_id in self._dirty_groups:
+            group = self.data[DATA_GROUPS].get(group_id)
+            if group and any(id in ids for id in group[GROUP_TASKS]):
+                group[GROUP_TASKS] = OrderedSet(rename(group[GROUP_TASKS]))
+
+    def _save_trust(self):
+        ''' Writes the current stamp of the store to TRUST_PATH, see Master._load_trust().
+
+        Raises:
+            FSError
+        '''
+
+        try:
+            atomic_write(self.TRUST_PATH, json.dumps([TRUSTED_LOAD_VERSION, self.storage.stamp()]).encode('utf-8'))
+        except OSError as e:
+            raise FSError(path=self.TRUST_PATH, msg=str(e)) from e
+
+    def _search_index(self):
+        ''' Returns the search index (see search.SearchIndex). It is built from self.data on first 
+        use after the tasks have been loaded or replaced, unless read from SEARCH_INDEX_PATH by 
+        Master.load_data(), without creating Task objects or keeping tasks of a lazily loaded store
+        in memory, and kept up to date through Master.task_changed(). '''
+
+        with self._cache_lock:
+            if not self._search.built:
+                tasks = self.data[DATA_TASKS]
+                fetch = tasks.peek if isinstance(tasks, LazyDict) else tasks.get
+                self._search.build((task_id, task_text(fetch(task_id))) for task_id in tasks)
+
+        return self._search
+
     def _set_current_id(self, id, type, validate_id=True):
         ''' Sets current task ID or group ID based on provided type. 
 
@@ -138,7 +706,116 @@ class Master:
             key = DATA_CURRENT_GROUP
 
         self.data[key] = id
+        self._dirty_header = True
         
+    def _snapshot(self, tasks=True):
+        ''' Returns a snapshot of self.data with Task objects converted to task dicts and task
+        IDs of each group in a list. Task dicts are shared with self.data rather than copied, 
+        as they are never modified in place (see Task.write_dict()). If 'tasks' is False the
+        snapshot holds no tasks. '''
+
+        data = {key: copy.deepcopy(value) for key, value in self.data.items() if key not in (DATA_GROUPS, DATA_TASKS)}
+        data[DATA_GROUPS] = {group_id: {GROUP_TASKS: list(group[GROUP_TASKS]), GROUP_TITLE: group[GROUP_TITLE]} 
+                             for group_id, group in self.data[DATA_GROUPS].items()}
+        data[DATA_TASKS] = {task_id: task_dict(task) for task_id, task in self.data[DATA_TASKS].items()} if tasks else {}
+
+        return data
+
+    def _write(self, compact=False):
+        ''' Prepares modified data for the storage backend, then commits it directly or 
+        hands it to the write-behind thread. If the storage is shared, changes made by other
+        processes are merged into self.data first.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        with self.storage.locked():
+            self._merge_changes(self.storage.fetch_changes())
+
+            payload = self.storage.prepare(self.data, self._dirty_tasks, self._dirty_groups, self._dirty_header, compact=compact)
+            rewritten = bool(payload and payload.rewrites)
+
+            if payload and not self._writer:
+                self.storage.commit([payload])
+
+        self._update_backup(rewritten)
+        self._clear_dirty()
+
+        if payload and self._writer:
+            self._writer.submit(payload)
+
+    def _task_node(self, task_id):
+        ''' Returns the subtask IDs, parent IDs and status of task with ID 'task_id', or None if
+        there is no such task. See graph.TaskGraph. '''
+
+        task = self.data[DATA_TASKS].get(task_id)
+        if task is None:
+            return None
+
+        if isinstance(task, Task):
+            return task.get_subtasks(), task.get_parents(), task.get_status()
+
+        return task[TASK_SUBTASKS], task[TASK_PARENTS], task[TASK_STATUS]
+
+    def _task_order_index(self):
+        ''' Returns a list of every task ID, in order of ID (see id_gen.id_key()), that is the order
+        the tasks were created in. It is built on first use after the tasks have been loaded or 
+        replaced, without fetching tasks, and kept up to date as tasks are created or removed. '''
+
+        with self._cache_lock:
+            if self._task_order is None:
+                self._task_order = sorted(self.data[DATA_TASKS], key=id_key)
+
+            return self._task_order
+
+    def _title_index(self):
+        ''' Returns the title index of every task (see autocomplete.TitleIndex). It is built from 
+        self.data on first use after the tasks have been loaded or replaced, without creating Task
+        objects or keeping tasks of a lazily loaded store in memory, and kept up to date through 
+        Master.task_changed(). '''
+
+        with self._cache_lock:
+            if self._titles is None:
+                tasks = self.data[DATA_TASKS]
+                fetch = tasks.peek if isinstance(tasks, LazyDict) else tasks.get
+
+                self._task_titles = {task_id: task_title(fetch(task_id)) for task_id in tasks}
+                self._titles = TitleIndex(self._task_titles.items())
+
+            return self._titles
+
+    def _update_backup(self, rewritten):
+        ''' Brings STORAGE_BACKUP (or '_merge_base', if the store is lazily loaded) in line with
+        the data last written, replacing only the tasks and groups modified since the previous
+        write. If no complete backup exists yet one is made, but only if the entire store was 
+        rewritten and is not lazily loaded. New tasks and groups are added in the order they
+        were first modified (see '_dirty_tasks'), that is the order they were created in. '''
+
+        backup = self._merge_base if self.storage.lazy else getattr(self, "STORAGE_BACKUP", {})
+        if DATA_TASKS not in backup:
+            if rewritten and not self.storage.lazy:
+                self.STORAGE_BACKUP = self._snapshot()
+            return
+
+        for key, value in self.data.items():
+            if key not in (DATA_GROUPS, DATA_TASKS):
+                backup[key] = value
+
+        for group_id in self._dirty_groups:
+            if group_id in self.data[DATA_GROUPS]:
+                group = self.data[DATA_GROUPS][group_id]
+                backup[DATA_GROUPS][group_id] = {GROUP_TASKS: list(group[GROUP_TASKS]), GROUP_TITLE: group[GROUP_TITLE]}
+            else:
+                backup[DATA_GROUPS].pop(group_id, None)
+
+        for task_id in self._dirty_tasks:
+            if task_id in self.data[DATA_TASKS]:
+                backup[DATA_TASKS][task_id] = task_dict(self.data[DATA_TASKS][task_id])
+            else:
+                backup[DATA_TASKS].pop(task_id, None)
+
     def _validate_group_title(self, title):
         ''' Validates group title.
 
@@ -156,13 +833,26 @@ class Master:
         if len(title) >= MAX_GROUP_TITLE_LENGTH:
             raise ValueError(f"Group title '{title[:MAX_GROUP_TITLE_LENGTH]}..' exceeds maximum character length of {MAX_GROUP_TITLE_LENGTH}.")
 
+    def _write_batch(self):
+        ''' Writes the records imported by Master.import_stream() so far. If the storage is lazily
+        loaded, self.data is loaded again to release them from memory.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        self.write_data()
+
+        if self.storage.lazy:
+            self.load_data()
+
+    @_reader
     def in_group(self, task_id):
         ''' Returns True if task with ID task_id is in a group, else returns False. '''
-        for group_id in self.get_groups():
-            if task_id in self.get_group_tasks(group_id):
-                return True
-        return False
+        return task_id in self._group_index()
         
+    @_writer
     def make_subtask(self, subtask_id, task_id):
         ''' Make task with ID 'subtask_id' a subtask of task with ID 'task_id'.
 
@@ -186,6 +876,7 @@ class Master:
         task.add_subtask(subtask_id)
         subtask.add_parent(task_id)
 
+    @_writer
     def make_parent(self, parent_id, task_id):
         ''' Make task with ID 'parent_id' a parent of task with ID 'task_id'.
 
@@ -211,6 +902,7 @@ class Master:
 
         return True
     
+    @_writer
     def remove_direct_relationship(self, parent_id, subtask_id):
         ''' Removes a subtask from it's parents' subtasks list and 
         removes the parent from the subtasks' parents list.
@@ -226,22 +918,18 @@ class Master:
     remove_parent = remove_direct_relationship
     remove_subtask = remove_direct_relationship 
     
-    def _is_recursive_relationship(self, origin_id, x_id, check, visited=None):
+    def _is_recursive_relationship(self, origin_id, x_id, check):
         '''Checks for a would-be recursive parent or subtask relationship between two tasks.
 
-        Performs a depth-first search starting from `x_id` to determine if
-        `origin_id` is found in the specified direction (parents or subtasks)
-        at any level of recursion.
+        Determines if `origin_id` is `x_id` or is found in the specified direction (parents or
+        subtasks) at any level from `x_id`, see Master.ancestors() and Master.descendants().
         
         Args:
             origin_id (str): The ID of the task to search for.
-            x_id (str): The ID of the task from which to start the recursive search.
+            x_id (str): The ID of the task from which to start the search.
             check (str): The direction of the search.
                          Must be "parents" to check upwards through parent tasks.
                          Must be "subtasks" to check downwards through subtasks.
-            visited (set, optional): Internal parameter used for tracking visited
-                                     task IDs during recursion to prevent infinite
-                                     loops and detect cycles. Do not pass this directly.
 
         Returns:
             bool: True if origin_id is found as a recursive parent/subtask,
@@ -251,30 +939,102 @@ class Master:
             DataError
             TaskNotFoundError
         '''
-        if not visited:
-            visited = set()
-                
-        if check == "subtasks":
-            task_ids = self.get_task(x_id).get_subtasks()
-        elif check == "parents":
-            task_ids = self.get_task(x_id).get_parents()
-        else:
+        if check not in (TASK_SUBTASKS, TASK_PARENTS):
             raise ValueError("'check' must be a str with contents of either 'subtasks' or 'parents'.")
 
-        if origin_id in task_ids:
-            return True
-        
-        if x_id in visited:
-            raise DataError(task_id=x_id, msg=f"Task with ID '{x_id}' (not '{origin_id}') has a recursive relationship with another task.") 
-        
-        visited.add(x_id)
-        for _x_id in task_ids:
-            if self._is_recursive_relationship(origin_id, _x_id, check, visited):
-                return True
-        visited.remove(x_id)
-        
-        return False
+        return origin_id == x_id or origin_id in self._graph.closure(x_id, check)
+
+    @_reader
+    def ancestors(self, task_id):
+        ''' Returns a frozenset of the IDs of every task above task with ID 'task_id': its parents,
+        their parents and so on, see graph.TaskGraph.
+
+        Raises:
+            DataError
+            TaskNotFoundError
+        '''
+
+        return frozenset(self._graph.closure(task_id, TASK_PARENTS))
+
+    @_writer
+    def close(self):
+        ''' Waits for pending writes, stops the write-behind thread (if any) and closes the storage 
+        backend. Does not write data modified since the last call to Master.write_data().
+
+        If 'persist_search' is True and the search index has been built, it is written to
+        SEARCH_INDEX_PATH, unless modified data has not been written. Likewise if 'trusted_load'
+        is True the stamp of the store is written to TRUST_PATH, see Master.
+
+        Raises:
+            FSError
+        '''
+
+        try:
+            if self._writer:
+                self._writer.close()
+        finally:
+            self._writer = None
+            self.storage.close()
+
+        if self.persist_search and self._search.built and not self.is_dirty():
+            self._search.save(self.SEARCH_INDEX_PATH, self.storage.stamp())
+
+        if self.trusted_load and self._trusted and not self.is_dirty():
+            self._save_trust()
+
+    @_writer
+    def compact_journal(self):
+        ''' Writes modified data and compacts the store. For a journaling JSONStorage this folds 
+        the journal into a new snapshot. 
         
+        Raises:
+            FSError
+        '''
+
+        self._write(compact=True)
+
+    @_reader
+    def complete_group_title(self, text, limit=AUTOCOMPLETE_LIMIT, max_distance=AUTOCOMPLETE_MAX_DISTANCE):
+        ''' Returns a list of the IDs of up to 'limit' groups with a title starting with 'text', 
+        followed by those with a title within 'max_distance' edits of it if there are fewer, see
+        autocomplete.TitleIndex.complete(). '''
+
+        with self._cache_lock:
+            if self._group_titles is None:
+                self._group_titles = TitleIndex((group_id, group[GROUP_TITLE]) for group_id, group in self.data[DATA_GROUPS].items())
+            index = self._group_titles
+
+        return index.complete(text, limit, max_distance)
+
+    @_reader
+    def complete_title(self, text, group_id=None, limit=AUTOCOMPLETE_LIMIT, max_distance=AUTOCOMPLETE_MAX_DISTANCE):
+        ''' Returns a list of the IDs of up to 'limit' tasks with a title starting with 'text', 
+        followed by those with a title within 'max_distance' edits of it if there are fewer, see
+        autocomplete.TitleIndex.complete(). If group_id is passed only tasks that belong to that 
+        group are returned. 
+
+        Titles are looked up in an index of every task (see Master._title_index()), or one of 
+        the tasks of the group built on first use after the group has been modified, so no task
+        is loaded.
+
+        Raises:
+            GroupNotFoundError
+        '''
+
+        index = self._title_index()
+
+        if group_id:
+            self._is_group(group_id)
+
+            with self._cache_lock:
+                if group_id not in self._group_task_titles:
+                    task_ids = self.data[DATA_GROUPS][group_id][GROUP_TASKS]
+                    self._group_task_titles[group_id] = TitleIndex((task_id, self._task_titles[task_id]) for task_id in task_ids if task_id in self._task_titles)
+                index = self._group_task_titles[group_id]
+
+        return index.complete(text, limit, max_distance)
+
+    @_writer
     def clear_group(self, group_id):
         ''' Clears all task IDs from group. Does not remove the tasks 
         from data.
@@ -284,8 +1044,14 @@ class Master:
         '''
 
         self._is_group(group_id)
+
+        for task_id in self.data[DATA_GROUPS][group_id][GROUP_TASKS]:
+            self._index_remove(task_id, group_id)
+
         self.data[DATA_GROUPS][group_id][GROUP_TASKS] = OrderedSet()
+        self._group_changed(group_id)
         
+    @_writer
     def create_group(self, title=None):
         ''' Creates a new group and returns its group ID. 
         
@@ -306,9 +1072,11 @@ class Master:
         group_id = increment_id(self.get_current_group_id())
         self.data[DATA_GROUPS][group_id] = group
         self.set_current_group_id(group_id, validate_id=False)
+        self._group_changed(group_id)
         
         return group_id
 
+    @_writer
     def create_subtask(self, parent_task_id, task_kwargs={}):
         ''' Creates a Task object and adds task ID to subtask 
         attribute of Task object with ID parent_task_id. 
@@ -334,6 +1102,7 @@ class Master:
 
         return task_id
 
+    @_writer
     def create_task(self, group_id=None, subtask=False, task_kwargs={}):
         ''' Creates a Task object with args in task_kwargs and returns task ID on success. 
         
@@ -358,6 +1127,7 @@ class Master:
 
         task_id = task.get_id()
         self.data[DATA_TASKS][task_id] = task
+        self.task_changed(task_id)
 
         if group_id:
             try:
@@ -369,15 +1139,103 @@ class Master:
             
         return task_id
 
+    @_writer
+    def create_tasks(self, specs, group_id=None, parent_id=None):
+        ''' Creates a task for each dict of keyword arguments to Task.__init__() in 'specs' (see 
+        'task_kwargs' of Master.create_task()) and returns their IDs, in order. The tasks are 
+        added to group with ID 'group_id' or made subtasks of task with ID 'parent_id', if passed.
+
+        Every spec is validated before any task is created, so that on error no task is created.
+        The tasks are given consecutive IDs and stored as task dicts, see Master.load_task().
+
+        Raises:
+            GroupNotFoundError
+            TaskCreationError
+            TaskNotFoundError
+        '''
+
+        specs = list(specs)
+        first_id = increment_id(self.get_current_task_id())
+
+        if group_id and parent_id:
+            raise TaskCreationError(task_id=first_id, msg="Argument Error: A task cannot be both a subtask and part of a group.")
+
+        for spec in specs:
+            if "task_id" in spec:
+                raise TaskCreationError(task_id=spec["task_id"], msg="Cannot create task with excplicit task ID.")
+
+        if group_id:
+            self._is_group(group_id)
+        if parent_id:
+            self.load_task(parent_id)
+
+        try:
+            taskds = Task.build_dicts(specs)
+        except (TypeError, ValueError) as e:
+            raise TaskCreationError(task_id=first_id, msg=f"Error with argument passed to Master.create_tasks():\nDetails: {e}") from e
+
+        for i, taskd in enumerate(taskds):
+            if group_id and taskd[TASK_PARENTS]:
+                raise TaskCreationError(task_id=first_id, msg=f"Task {i} has parents. A subtask cannot be part of a group.")
+            if parent_id and parent_id not in taskd[TASK_PARENTS]:
+                taskd[TASK_PARENTS].append(parent_id)
+
+        # Nothing below raises.
+        start = int(first_id, 36)
+        task_ids = [int_to_base(start + i, 36) for i in range(len(taskds))]
+        if not task_ids:
+            return task_ids
+
+        tasks = self.data[DATA_TASKS]
+        for task_id, taskd in zip(task_ids, taskds):
+            tasks[task_id] = taskd
+        self._dirty_tasks.update(dict.fromkeys(task_ids))
+        self.set_current_task_id(task_ids[-1], validate_id=False)
+        if self._titles is not None:
+            for task_id in task_ids:
+                self._index_title(task_id)
+        for task_id, taskd in zip(task_ids, taskds):
+            self._search.update(task_id, task_text(taskd))
+            self._index_order(task_id)
+
+        if group_id:
+            self.data[DATA_GROUPS][group_id][GROUP_TASKS].update(task_ids)
+            for task_id in task_ids:
+                self._index_add(task_id, group_id)
+            self._group_changed(group_id)
+
+        if parent_id:
+            parent = self.get_task(parent_id)
+            for task_id in task_ids:
+                parent.add_subtask(task_id)
+
+        return task_ids
+
+    @_reader
+    def descendants(self, task_id):
+        ''' Returns a frozenset of the IDs of every task below task with ID 'task_id': its subtasks,
+        their subtasks and so on, see graph.TaskGraph.
+
+        Raises:
+            DataError
+            TaskNotFoundError
+        '''
+
+        return frozenset(self._graph.closure(task_id, TASK_SUBTASKS))
+
+    @_reader
     def get_active_group(self):
         return self.data[DATA_ACTIVE_GROUP]
     
+    @_reader
     def get_current_task_id(self):
         return self.data[DATA_CURRENT_TASK]
 
+    @_reader
     def get_current_group_id(self):
         return self.data[DATA_CURRENT_GROUP]
 
+    @_reader
     def get_group_tasks(self, group_id):
         ''' Returns a list of task IDs in group. 
         
@@ -389,6 +1247,7 @@ class Master:
 
         return list(self.data[DATA_GROUPS][group_id][GROUP_TASKS])
 
+    @_reader
     def get_group_title(self, group_id):
         ''' Returns title of group with ID 'group_id' 
         
@@ -399,10 +1258,45 @@ class Master:
 
         return self.data[DATA_GROUPS][group_id][GROUP_TITLE]
     
+    @_reader
     def get_groups(self):
         ''' Returns a list of group IDs. '''
         return list(self.data[DATA_GROUPS].keys())
     
+    @_reader
+    def get_group_progress(self, group_id):
+        ''' Returns a tuple of the number of completed tasks and the number of tasks in group 
+        with ID 'group_id' and below them, see Master.get_progress().
+        
+        Raises:
+            DataError
+            GroupNotFoundError
+        '''
+
+        self._is_group(group_id)
+        total, completed = self._graph.group_rollup(group_id, self.data[DATA_GROUPS][group_id][GROUP_TASKS])
+
+        return completed, total
+
+    @_reader
+    def get_progress(self, task_id):
+        ''' Returns a tuple of the number of completed tasks and the number of tasks below task 
+        with ID 'task_id': its subtasks, their subtasks and so on. A task with several parents 
+        below the task is counted once for each of them.
+
+        The progress of every task in a tree is computed together on first use, then kept up to
+        date on every change of status or subtasks, see graph.TaskGraph.
+
+        Raises:
+            DataError
+            TaskNotFoundError
+        '''
+
+        total, completed = self._graph.rollup(task_id)
+
+        return completed, total
+
+    @_reader
     def get_task(self, task_id):
         ''' Loads and returns Task object with ID task_id. 
         
@@ -415,30 +1309,42 @@ class Master:
 
         return self.data[DATA_TASKS][task_id]
 
+    @_reader
     def get_task_by_title(self, title, ignore_case=True, group_id=None):
         ''' Returns a list of tasks with matching title. If group_id
         is passed only tasks that belong to that group will be 
-        returned (recommended).
+        returned.
 
-        If ignore_case is True case is ignored.
+        If ignore_case is True case is ignored. Titles are looked up in an index (see 
+        Master._title_index()), so no task is loaded.
         
         Raises:
-            DataError
             GroupNotFoundError
-            TaskNotFoundError
         '''
 
-        ids = self.get_tasks() if not group_id else self.get_group_tasks(group_id)
-        if ignore_case:
-            title = title.lower()
+        if group_id:
+            self._is_group(group_id)
+
+        task_ids = self._title_index().get(title)
+        if not ignore_case:
+            task_ids = [task_id for task_id in task_ids if self._task_titles[task_id] == title]
+        if group_id:
+            group_index = self._group_index()
+            task_ids = [task_id for task_id in task_ids if group_id in group_index.get(task_id, ())]
 
-        return [task_id for task_id in ids if title ==
-                (self.get_task(task_id).get_title().lower() if ignore_case else self.get_task(task_id).get_title())]
+        return list(task_ids)
             
+    @_reader
+    def get_task_groups(self, task_id):
+        ''' Returns a list of the IDs of the groups task with ID 'task_id' is in. '''
+        return list(self._group_index().get(task_id, ()))
+
+    @_reader
     def get_tasks(self):
         ''' Returns a list of all task IDs. '''
         return list(self.data[DATA_TASKS].keys())
 
+    @_writer
     def group_add_task(self, task_id, group_id): 
         ''' Adds an existing task ID to a group. 
         
@@ -458,7 +1364,10 @@ class Master:
         self._is_group(group_id)
         
         self.data[DATA_GROUPS][group_id][GROUP_TASKS].add(task_id)
+        self._index_add(task_id, group_id)
+        self._group_changed(group_id)
 
+    @_writer
     def group_remove_task(self, task_id, group_id):
         ''' Removes a task from a group. 
         
@@ -472,6 +1381,77 @@ class Master:
         except KeyError:  # Task is not in group
             return
 
+        self._index_remove(task_id, group_id)
+        self._group_changed(group_id)
+
+    @_writer
+    def import_stream(self, lines, batch_size=IMPORT_BATCH_SIZE):
+        ''' Imports records, as written by Master.iter_export(), from iterable 'lines' (e.g. a file
+        object) and returns the number of records imported. Tasks and groups with the same ID as
+        an imported one are replaced. 
+
+        The current task and group IDs are only ever advanced (see Master._advance_id()), to the
+        imported ones or the IDs of imported tasks and groups, so that IDs of existing tasks and
+        groups are not given out again. The imported active group is taken if the group exists
+        once every record is imported. Other header values are ignored.
+
+        Records are written to the storage every 'batch_size' records. If the storage is lazily
+        loaded Master.data is then loaded again, so that memory use does not grow with the number
+        of records imported.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        n = 0
+        active_group = None
+
+        for line_n, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+
+            try:
+                record = json.loads(line)
+                op = record[JOURNAL_OP]
+
+                if op == JOURNAL_OP_HEADER:
+                    header = record[JOURNAL_DATA]
+                    for key in (DATA_CURRENT_TASK, DATA_CURRENT_GROUP):
+                        if key in header:
+                            self._advance_id(key, header[key])
+                    active_group = header.get(DATA_ACTIVE_GROUP, active_group)
+                elif op == JOURNAL_OP_GROUP:
+                    group = record[JOURNAL_DATA]
+                    self._advance_id(DATA_CURRENT_GROUP, record[JOURNAL_ID])
+                    self.data[DATA_GROUPS][record[JOURNAL_ID]] = {GROUP_TASKS: OrderedSet(group[GROUP_TASKS]), GROUP_TITLE: group[GROUP_TITLE]}
+                    self._group_changed(record[JOURNAL_ID])
+                    self._task_groups = None
+                elif op == JOURNAL_OP_TASK:
+                    taskd = record[JOURNAL_DATA]
+                    self._advance_id(DATA_CURRENT_TASK, record[JOURNAL_ID])
+                    if isinstance(self.data[DATA_TASKS].get(record[JOURNAL_ID]), dict):
+                        self._keep_base(record[JOURNAL_ID], self.data[DATA_TASKS][record[JOURNAL_ID]])
+                    self.data[DATA_TASKS][record[JOURNAL_ID]] = {key: taskd[key] for key in TASKD_TEMPLATE}
+                    self._trusted = False
+                    self.task_changed(record[JOURNAL_ID])
+                else:
+                    raise DataError(msg=f"Unknown record type on line {line_n}: '{op}'")
+            except (json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+                raise DataError(msg=f"Record on line {line_n} could not be interpreted.") from e
+
+            n += 1
+            if n % batch_size == 0:
+                self._write_batch()
+
+        if active_group in self.data[DATA_GROUPS] and active_group != self.data[DATA_ACTIVE_GROUP]:
+            self.data[DATA_ACTIVE_GROUP] = active_group
+            self._dirty_header = True
+
+        self._write_batch()
+        return n
+
+    @_writer
     def init_storage_file(self):
         ''' Initializes (and if not exists, creates) the storage file. 
         
@@ -492,26 +1472,126 @@ class Master:
             DATA_TASKS: {} 
         }
 
-        try:
-            with open(self.STORAGE_PATH, "w") as f:
-                json.dump(storage, f, ensure_ascii=False)
-        except FileNotFoundError as e:
-            raise FSError(path=self.STORAGE_PATH, msg="A file system error occured during creation of storage file.") from e
-        except PermissionError as e:
-            raise FSError(path=self.STORAGE_PATH, msg=f"No permission to create storage file. Inspect file permissions for: '{self.STORAGE_PATH}'") from e
-
-        with open(self.STORAGE_PATH, "r") as f:
+        self.storage.create(storage)
+        self.ui.relay(f"Succesfully initialized storage file at '{self.STORAGE_PATH}'.")
+
+    def flush(self):
+        ''' Blocks until every write made by Master.write_data() has reached the storage. 
+        Returns immediately unless write-behind is enabled.
+
+        Raises:
+            FSError
+        '''
+
+        if self._writer:
+            self._writer.flush()
+
+    @_reader
+    def is_dirty(self):
+        ''' Returns True if any task, group or header value has been modified since 
+        the last write, else returns False. '''
+        return bool(self._dirty_tasks or self._dirty_groups or self._dirty_header)
+
+    def iter_export(self):
+        ''' Yields every header value, group and task in self.data as records of one line of
+        JSON text each, in the format of journal records (see storage.JSONStorage). The header
+        comes first, then the groups, then the tasks with the parents of each task before it.
+        Tasks fetched from a lazily loaded store are not kept in memory.
+
+        Records are read from self.data as they are yielded, so hold Master.lock.read() while
+        iterating, as otherwise a concurrent write may change self.data in between. The groups
+        and task IDs are listed up front, so that iteration itself survives such a write, as
+        when AsyncMaster.iter_export() runs other calls between chunks.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        header = {key: value for key, value in self.data.items() if key not in (DATA_GROUPS, DATA_TASKS)}
+        yield self._export_line(JOURNAL_OP_HEADER, data=header)
+
+        for group_id, group in list(self.data[DATA_GROUPS].items()):
+            yield self._export_line(JOURNAL_OP_GROUP, group_id, {GROUP_TASKS: list(group[GROUP_TASKS]), GROUP_TITLE: group[GROUP_TITLE]})
+
+        tasks = self.data[DATA_TASKS]
+        fetch = tasks.peek if isinstance(tasks, LazyDict) else tasks.get
+
+        exported = set()
+        for task_id in list(tasks):
+            # Depth-first through parents not yet exported, each with its task dict once fetched.
+            # A parent already on the stack is part of a cycle, and is exported after its subtask.
+            stack = [(task_id, None)]
+            stacked = {task_id}
+
+            while stack:
+                current_id, taskd = stack[-1]
+
+                if taskd is None:
+                    task = None if current_id in exported else fetch(current_id)
+                    if task is None:
+                        stack.pop()
+                        continue
+
+                    taskd = task_dict(task)
+                    stack[-1] = (current_id, taskd)
+
+                    parents = [parent_id for parent_id in taskd[TASK_PARENTS] if parent_id not in exported and parent_id not in stacked]
+                    if parents:
+                        stack.extend((parent_id, None) for parent_id in reversed(parents))
+                        stacked.update(parents)
+                        continue
+
+                stack.pop()
+                exported.add(current_id)
+                yield self._export_line(JOURNAL_OP_TASK, current_id, taskd)
+
+    @_reader
+    def iter_group_tasks(self, group_id, start=None, limit=None):
+        ''' Returns an iterator over the IDs of up to 'limit' (every one if None) tasks in group 
+        with ID 'group_id', in order, after task with ID 'start' or from the first if None. Pass 
+        the last task ID of a page as 'start' to get the next page, which stays valid if tasks
+        are moved (see Master.move_task()) in between. 
+
+        Only a page of 'limit' task IDs is copied, so a page costs the same wherever it is in the
+        group. If 'limit' is None the IDs are read as iterated, in which case hold 
+        Master.lock.read() while iterating.
+
+        Raises:
+            GroupNotFoundError
+            TaskNotFoundError
+        '''
+
+        self._is_group(group_id)
+        task_ids = self.data[DATA_GROUPS][group_id][GROUP_TASKS]
+
+        i = 0
+        if start is not None:
             try:
-                written = json.loads(f.read())
-            except json.JSONDecodeError as e:
-                raise DataError(path=self.STORAGE_PATH, 
-                                msg="An error occured while creating storage file.") from e
+                i = task_ids.index(start) + 1
+            except KeyError as e:
+                raise TaskNotFoundError(task_id=start, msg=f"Task is not in group with ID '{group_id}'.") from e
+
+        return self._iter_from(task_ids.items, i, limit)
+
+    @_reader
+    def iter_tasks(self, start=None, limit=None):
+        ''' Returns an iterator over the IDs of up to 'limit' (every one if None) tasks, in the order
+        they were created, after task with ID 'start' or from the first if None. Pass the last 
+        task ID of a page as 'start' to get the next page, which stays valid even if that task
+        has been removed in between.
+
+        Tasks are listed through an index of task IDs (see Master._task_order_index()), so a page
+        costs the same wherever it is, and no task is fetched. If 'limit' is None the IDs are read
+        as iterated, in which case hold Master.lock.read() while iterating.
+        '''
 
-            if written == storage:
-                self.ui.relay(f"Succesfully initialized storage file at '{self.STORAGE_PATH}'.")
-            else:
-                raise DataError(path=self.STORAGE_PATH, msg=f"Expected: {storage}\nActual: {written}")
+        order = self._task_order_index()
+        i = 0 if start is None else bisect.bisect_right(order, id_key(start), key=id_key)
 
+        return self._iter_from(order, i, limit)
+
+    @_writer
     def load_data(self):
         ''' Loads from storage file to self.data. 
         
@@ -520,25 +1600,31 @@ class Master:
             FSError
         '''
 
-        data = {}
-
-        try:
-            with open(self.STORAGE_PATH, mode='r') as f:
-                data = json.loads(f.read())
-        except FileNotFoundError as e:
-            self.ui.relay(f"Storage file at '{self.STORAGE_PATH}' not found.")
-        except json.JSONDecodeError as e:
-            raise DataError(path=self.STORAGE_PATH, msg="The data in storage file could not be interpreted.") from e
-        except PermissionError as e:
-            raise FSError(path=self.STORAGE_PATH, msg=f"No permission to access storage file. Inspect file permissions for: '{self.STORAGE_PATH}'") from e
-        except Exception as e:
-            raise FSError(path=self.STORAGE_PATH, msg="An unexpected error occurred while loading data.") from e
+        self.flush()
+        data = self.storage.load()
 
         if data:
-            self.STORAGE_BACKUP = copy.deepcopy(self.data)
+            trusted = self.trusted_load and self._check_trust(data)
 
-            self._groups_task_ids_to(OrderedSet, data)
             self.data = data
+            self._task_groups = None
+            self._graph.clear()
+            self._titles = None
+            self._group_task_titles = {}
+            self._group_titles = None
+            self._search.clear()
+            self._task_order = None
+            self._clear_dirty()
+
+            if self.persist_search:
+                self._search.load(self.SEARCH_INDEX_PATH, self.storage.stamp())
+
+            self._trusted = trusted
+
+            # A lazily loaded store is its own backup, and cannot be copied without loading it in full.
+            # Its tasks are kept as the base of merges as they are loaded instead, see Master._keep_base().
+            self.STORAGE_BACKUP = {} if self.storage.lazy else self._snapshot()
+            self._merge_base = self._snapshot(tasks=False) if self.storage.lazy and self.storage.shared else {}
         else:
             self.ui.relay(message=f"No data loaded from storage file at: '{self.STORAGE_PATH}'.")
             self.ui.relay(message="Attempting to create a new storage file...")
@@ -546,49 +1632,85 @@ class Master:
             self.init_storage_file()
             self.load_data()
 
+    @_writer
     def load_group(self, group_id):
         ''' Converts task dicts to Task objects for tasks in group with ID group_id. 
         
         Raises:
             DataError
+            FSError
             GroupNotFoundError
         '''        
+        self.storage.preload([group_id])
+
+        tasks = self.data[DATA_TASKS]
+        task_ids = []
         for task_id in self.get_group_tasks(group_id):
-            try:
-                self.load_task(task_id)
-            except TaskNotFoundError:
+            if task_id in tasks:
+                task_ids.append(task_id)
+            else:
                 self.group_remove_task(task_id, group_id)
-                continue
 
+        with self._cache_lock:
+            self._load_tasks(task_ids)
+
+    @_writer
+    def load_groups(self, group_ids):
+        ''' Converts task dicts to Task objects for tasks in every group with ID in 'group_ids'.
+        The stored tasks of all groups are read at once, in parallel if the storage supports it.
+
+        Raises:
+            DataError
+            FSError
+            GroupNotFoundError
+        '''
+
+        group_ids = list(group_ids)
+        for group_id in group_ids:
+            self._is_group(group_id)
+
+        self.storage.preload(group_ids)
+
+        for group_id in group_ids:
+            self.load_group(group_id)
+
+    @_reader
     def load_task(self, task_id):
-        ''' Converts task dict to Task object for task with ID task_id. 
+        ''' Converts task dict to Task object for task with ID task_id, and returns the Task 
+        object.
         
-        Recursively loads parent and subtasks.
+        Unless lazy_neighbors (see Master) its parent and subtasks are loaded as well, see
+        Master.load_tasks().
         
         Raises:
             DataError
             TaskNotFoundError
         '''
         
-        if self._is_Task(task_id):
-            return
+        if not self._is_Task(task_id):
+            with self._cache_lock:
+                self._load_tasks([task_id])
 
-        try:
-            task = Task(self, 
-                        task_id=task_id, 
-                        taskd=self.data[DATA_TASKS][task_id])
-        except (TypeError, ValueError) as e:
-            raise DataError(task_id=increment_id(self.get_current_task_id()), 
-                                msg=f"Data in loaded task dict with ID '{task_id}' was invalid.\nDetails: {e}") from e
+        return self.data[DATA_TASKS][task_id]
 
-        self.data[DATA_TASKS][task_id] = task
-        
-        for subtask_id in self.data[DATA_TASKS][task_id].get_subtasks():
-            self.load_task(subtask_id)
+    @_reader
+    def load_tasks(self, task_ids):
+        ''' Converts task dicts to Task objects for every task with ID in 'task_ids'. Every task
+        dict is validated before any is converted, so that on error no task is converted.
 
-        for parent_id in self.data[DATA_TASKS][task_id].get_parents():
-            self.load_task(parent_id)
+        Unless lazy_neighbors (see Master) the parents and subtasks of the tasks are loaded as
+        well, then theirs and so on, which loads every task connected to them. The tasks are
+        walked iteratively, so that deep hierarchies do not exceed the recursion limit.
+
+        Raises:
+            DataError
+            TaskNotFoundError
+        '''
+
+        with self._cache_lock:
+            self._load_tasks(task_ids)
     
+    @_writer
     def move_task(self, task_id, steps, group_id=None, parent_task_id=None):
         ''' Moves a task ID 'steps' indices in a group or subtasks list
         and returns the index of task ID. If index would be out of range 
@@ -606,9 +1728,11 @@ class Master:
             raise TypeError("Expected group_id or parent_task_id, got both.")
 
         if group_id:
-            if task_id not in self.get_group_tasks(group_id):
+            self._is_group(group_id)
+            if task_id not in self.data[DATA_GROUPS][group_id][GROUP_TASKS]:
                 raise TaskNotFoundError(task_id=task_id, msg=f"Task with ID '{task_id}' not found in group with ID '{group_id}'.")
             
+            self._group_changed(group_id)
             return self.data[DATA_GROUPS][group_id][GROUP_TASKS].move(task_id, steps)
         elif parent_task_id:
             parent = self.get_task(parent_task_id)
@@ -617,6 +1741,7 @@ class Master:
         else:
             raise TypeError("Expected group_id or parent_task_id, got neither.")
 
+    @_writer
     def orphan_task(self, task_id):
         ''' Removes a task from all parents' subtask attribute. 
 
@@ -627,39 +1752,119 @@ class Master:
         self.load_task(task_id)
         
         for parent_id in self.data[DATA_TASKS][task_id].get_parents():
-            self.data[DATA_TASKS][parent_id].remove_subtask(task_id)
+            self.get_task(parent_id).remove_subtask(task_id)
+
+    @_reader
+    def query(self, predicate=None, group_id=None, limit=None):
+        ''' Returns a list of the IDs of the tasks matching query.Predicate 'predicate' (every
+        task if None), in order, up to 'limit' (if not None). If group_id is passed, or the 
+        predicate requires membership of a group (see query.in_group()), only the tasks of that
+        group are read.
+
+        The predicate is evaluated against the stored task dicts, so no task is loaded as a Task
+        object, and tasks fetched from a lazily loaded store are not kept in memory.
+
+        Raises:
+            GroupNotFoundError
+        '''
+
+        group_id = group_id or (predicate.group_id if predicate else None)
+        test = predicate.bind(self) if predicate else None
 
+        tasks = self.data[DATA_TASKS]
+        fetch = tasks.peek if isinstance(tasks, LazyDict) else tasks.get
+
+        if group_id:
+            self._is_group(group_id)
+            task_ids = self.data[DATA_GROUPS][group_id][GROUP_TASKS]
+        else:
+            task_ids = tasks
+
+        matches = []
+        if limit is not None and limit <= 0:
+            return matches
+
+        for task_id in task_ids:
+            task = fetch(task_id)
+            if task is None or (test and not test(task_id, task)):
+                continue
+
+            matches.append(task_id)
+            if len(matches) == limit:
+                break
+
+        return matches
+
+    @_writer
     def remove_task(self, task_id, subtask=False):
         ''' Removes a task from all groups, orphans the task 
-        and recursively removes all of its subtaskts.
+        and recursively removes all of its subtasks, see Master.remove_tasks().
+
+        'subtask' is accepted for compatibility, and has no effect.
 
         Raises:
             DataError
             TaskNotFoundError
         '''
 
-        if not subtask:
-            for group_id in self.data[DATA_GROUPS].keys():
-                self.group_remove_task(task_id, group_id)
+        self.remove_tasks([task_id])
 
-        try:
-            self.load_task(task_id)
-        except (TaskNotFoundError, DataError) as e: 
-            # Indicates failure to load task (OR its parents/subtasks, which indicates data corruption).
-            self._deep_remove_task(task_id)
-            raise type(e)(msg=f"An attempt has been made to remove mention of task with ID '{task_id}' from groups, parents and subtasks lists and all of its children (if any).", 
-                          task_id=e.task_id) from e
+    @_writer
+    def remove_tasks(self, task_ids):
+        ''' Removes every task with ID in 'task_ids' along with its subtasks, their subtasks and
+        so on. The removed tasks are removed from all groups and from the subtasks of the parents
+        that remain. 
 
-        self.orphan_task(task_id)
-        
-        for subtask_id in self.data[DATA_TASKS][task_id].get_subtasks():
-            try:
-                self.remove_task(subtask_id, subtask=True)
-            except TaskNotFoundError:
-                pass
+        The tasks to remove are collected through the subtasks index (see graph.TaskGraph) and 
+        detached from groups and parents in a single pass, without loading them as Task objects.
+        If they are found to be corrupt, an attempt is made to remove them and any mention of 
+        them regardless (see Master._deep_remove_task()) before DataError is raised. Likewise
+        IDs with no task, which may remain in groups and subtasks lists, are removed from them
+        (along with any task that has them as a parent) before TaskNotFoundError is raised, 
+        once the other tasks have been removed.
 
-        self.data[DATA_TASKS].pop(task_id)
+        Raises:
+            DataError
+            TaskNotFoundError
+        '''
+
+        tasks = self.data[DATA_TASKS]
+        task_ids = list(task_ids)
+        missing = [task_id for task_id in task_ids if task_id not in tasks]
+        task_ids = [task_id for task_id in task_ids if task_id in tasks]
+
+        try:
+            removed = self._graph.reachable(task_ids, TASK_SUBTASKS)
+
+            parents = {}
+            for task_id in removed:
+                for parent_id in self._graph.neighbors(task_id, TASK_PARENTS):
+                    if parent_id not in removed and parent_id in tasks:
+                        parents.setdefault(parent_id, set()).add(task_id)
+        except (KeyError, TypeError, AttributeError) as e: # A task that is neither a Task object nor a task dict.
+            for task_id in task_ids + missing:
+                self._deep_remove_task(task_id)
+            raise DataError(msg=f"An attempt has been made to remove mention of the tasks with IDs {task_ids + missing} from groups, parents and subtasks lists and all of their children (if any).") from e
+
+        for parent_id, subtask_ids in parents.items():
+            self._remove_subtasks(parent_id, subtask_ids)
+
+        self._remove_from_groups(removed)
+
+        for task_id in removed:
+            tasks.pop(task_id)
+            self._index_title(task_id)
+            self._search.update(task_id, None)
+            self._index_order(task_id)
+        self._dirty_tasks.update(dict.fromkeys(removed))
+        self._graph.remove(removed)
+
+        if missing:
+            for task_id in missing:
+                self._deep_remove_task(task_id)
+            raise TaskNotFoundError(task_id=missing[0], msg=f"An attempt has been made to remove mention of the tasks with IDs {missing} from groups, parents and subtasks lists and all of their children (if any).")
     
+    @_writer
     def remove_group(self, group_id):
         ''' Removes group with group ID group_id. Tasks are left without a group unless explicitly moved first. 
         
@@ -667,8 +1872,66 @@ class Master:
             GroupNotFoundError
         '''
         self._is_group(group_id)
-        self.data[DATA_GROUPS].pop(group_id)
+
+        for task_id in self.data[DATA_GROUPS].pop(group_id)[GROUP_TASKS]:
+            self._index_remove(task_id, group_id)
+
+        self._group_changed(group_id)
         
+    @_writer
+    def restore_backup(self):
+        ''' Replaces self.data with STORAGE_BACKUP, the data as last loaded or written, discarding 
+        every change made since. Task dicts are shared with the backup rather than copied. A 
+        lazily loaded store is its own backup, and is loaded again instead.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        if self.storage.lazy:
+            self.load_data()
+            return
+
+        backup = getattr(self, "STORAGE_BACKUP", {})
+        if DATA_TASKS not in backup:
+            raise DataError(path=self.STORAGE_PATH, msg="No backup to restore.")
+
+        data = {key: copy.deepcopy(value) for key, value in backup.items() if key not in (DATA_GROUPS, DATA_TASKS)}
+        data[DATA_GROUPS] = {group_id: {GROUP_TASKS: OrderedSet(group[GROUP_TASKS]), GROUP_TITLE: group[GROUP_TITLE]}
+                             for group_id, group in backup[DATA_GROUPS].items()}
+        data[DATA_TASKS] = dict(backup[DATA_TASKS])
+
+        self.data = data
+        self._task_groups = None
+        self._graph.clear()
+        self._titles = None
+        self._group_task_titles = {}
+        self._group_titles = None
+        self._search.clear()
+        self._task_order = None
+        self._clear_dirty()
+
+    @_reader
+    def search(self, query, group_id=None, limit=SEARCH_LIMIT):
+        ''' Returns a list of the IDs of up to 'limit' tasks whose title, description or comments
+        hold every word in 'query', best match first. Case is ignored. If group_id is passed only
+        tasks that belong to that group are returned.
+
+        Words are looked up in an index (see Master._search_index()), so no task is loaded.
+
+        Raises:
+            GroupNotFoundError
+        '''
+
+        task_ids = None
+        if group_id:
+            self._is_group(group_id)
+            task_ids = self.data[DATA_GROUPS][group_id][GROUP_TASKS]
+
+        return self._search_index().search(query, task_ids, limit)
+
+    @_writer
     def set_active_group(self, group_id):
         ''' Sets the active group, loading all of its tasks. 
         
@@ -681,7 +1944,9 @@ class Master:
             self.load_group(group_id)
 
             self.data[DATA_ACTIVE_GROUP] = group_id
+            self._dirty_header = True
 
+    @_writer
     def set_current_group_id(self, group_id, validate_id=True):
         ''' Set current group ID to 'id'. 
         
@@ -692,6 +1957,7 @@ class Master:
 
         self._set_current_id(group_id, "group", validate_id=validate_id)
 
+    @_writer
     def set_current_task_id(self, task_id, validate_id=True):
         ''' Set current task ID to 'id'. 
         
@@ -702,6 +1968,7 @@ class Master:
         
         self._set_current_id(task_id, "task", validate_id=validate_id)
 
+    @_writer
     def set_group_title(self, group_id, title):
         ''' Sets group title.
         
@@ -719,34 +1986,125 @@ class Master:
             raise type(e)(f" Invalid title for group: '{group_id}'.\nDetails: {e}") from e
         
         self.data[DATA_GROUPS][group_id][GROUP_TITLE] = title
+        self._group_changed(group_id)
+
+    @_writer
+    def sync(self):
+        ''' Merges the changes made to the store by other processes since the last load, write or 
+        sync into self.data, keeping unwritten changes (see Master._merge_changes()). Does 
+        nothing unless the storage is shared, see storage.JSONStorage.
 
-    def write_data(self): 
-        ''' Writes self.data to storage file. 
-        
         Raises:
+            DataError
             FSError
         '''
 
-        data = copy.deepcopy(self.data)
+        with self.storage.locked():
+            self._merge_changes(self.storage.fetch_changes())
+
+    @_writer
+    def task_changed(self, task_id):
+        ''' Marks task with ID 'task_id' as modified since the last write. 
+        
+        Called by Task whenever it is modified, and by Master when a task is created or removed.
+        '''
+        self._dirty_tasks[task_id] = None
+        self._graph.update(task_id)
+        self._index_title(task_id)
+        self._index_order(task_id)
+
+        task = self.data[DATA_TASKS].get(task_id)
+        self._search.update(task_id, task_text(task) if task is not None else None)
+
+    @_reader
+    def validate_tasks(self):
+        ''' Validates every stored task dict (Task objects were validated when created), after
+        which loading a task no longer validates its task dict, see Master. Reads every task of
+        a lazily loaded storage.
+
+        Raises:
+            DataError
+        '''
+
+        with self._cache_lock:
+            tasks = self.data[DATA_TASKS]
 
-        self._groups_task_ids_to(list, data)
+            try:
+                Task.validate_dicts((task_id, task) for task_id, task in tasks.items() if not isinstance(task, Task))
+            except (TypeError, ValueError) as e:
+                raise DataError(msg=f"Data in stored task dicts was invalid.\nDetails: {e}") from e
+
+            self._trusted = True
 
-        for task_id, task in self.data[DATA_TASKS].items():
-            if self._is_Task(task_id): # If Task object, convert to task dict
-                data[DATA_TASKS][task_id] = task.write_dict()
+    @_writer
+    def write_data(self): 
+        ''' Writes self.data to storage file. Does nothing if no data has been 
+        modified since the last write, see Master.is_dirty().
+
+        Only tasks and groups modified since the last write are serialized. If journaling 
+        is enabled only those are appended to the journal file, unless the journal has 
+        grown past JOURNAL_COMPACT_THRESHOLD records in which case it is folded into a 
+        new snapshot. If write-behind is enabled the data is written on a background 
+        thread, and this only raises FSError for an earlier write that failed.
         
-        try:
-            with open(self.STORAGE_PATH, mode='w') as f:
-                json.dump(data, f, ensure_ascii=False)
-        except FileNotFoundError as e:
-            raise FSError(path=self.STORAGE_PATH, msg=f"No file found at: '{self.STORAGE_PATH}'") from e
-        except PermissionError as e:
-            raise FSError(path=self.STORAGE_PATH, msg=f"No permission to write to storage file. Inspect file permissions for: '{self.STORAGE_PATH}'") from e
-        except Exception as e:
-            raise FSError(path=self.STORAGE_PATH, msg=f"An unexpected error occured during attempt to write data to storage file at: '{self.STORAGE_PATH}'") from e
+        Raises:
+            FSError
+        '''
 
-        self.STORAGE_BACKUP = copy.deepcopy(data)
+        if not self.is_dirty():
+            return
+
+        self._write()
         
+def benchmark_reads(master, thread_counts, seconds=2.0, writer=False, sample=1000):
+    ''' Reads a random task (Master.get_task() and Task.summarize()) in a loop on each number of 
+    threads in 'thread_counts' in turn, for 'seconds' seconds each, and returns a dict of the number
+    of reads per second by number of threads. If 'writer' is True, another thread sets the title of
+    a random task in a loop meanwhile. Only 'sample' random tasks are read, and they are loaded 
+    before reading starts. Expects the data of 'master' to be loaded and to hold a task.
+
+    Raises:
+        DataError
+    '''
+
+    task_ids = random.sample(master.get_tasks(), min(sample, len(master.get_tasks())))
+    for task_id in task_ids:
+        master.get_task(task_id)
+
+    results = {}
+
+    for n in thread_counts:
+        stop = threading.Event()
+        reads = [0] * n
+
+        def read(i):
+            rng = random.Random(i)
+            while not stop.is_set():
+                master.get_task(rng.choice(task_ids)).summarize()
+                reads[i] += 1
+
+        def write():
+            rng = random.Random()
+            while not stop.is_set():
+                task = master.get_task(rng.choice(task_ids))
+                task.set_title(task.get_title())
+
+        threads = [threading.Thread(target=read, args=(i,)) for i in range(n)]
+        if writer:
+            threads.append(threading.Thread(target=write))
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        results[n] = sum(reads) / (time.perf_counter() - start)
+
+    return results
+
 if __name__ == '__main__':
     class DevUI:
         ''' Simple frontend for development purposes. 
@@ -781,4 +2139,59 @@ if __name__ == '__main__':
                     u_in = prompt_user("> ")
                 return int(u_in)
 
-    master = Master(DevUI())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Development frontend for Master.")
+    parser.add_argument("--storage", help="Path of the store. A directory is a ShardedStorage, a '.db' file an SQLiteStorage, a '.bin' file a BinaryStorage and anything else a JSONStorage.")
+    parser.add_argument("--shared", action="store_true", help="Lock a JSONStorage, so that other processes may use it at the same time.")
+    parser.add_argument("--lazy-neighbors", action="store_true", help="Load the parents and subtasks of a task only once they are accessed (see Master).")
+    parser.add_argument("--persist-search", action="store_true", help="Keep the search index in a file next to the store (see Master).")
+    parser.add_argument("--trusted-load", action="store_true", help="Skip validating stored tasks while the store is as this frontend last left it (see Master).")
+
+    commands = parser.add_subparsers(dest="command")
+    export_parser = commands.add_parser("export", help="Write every header value, group and task as a line of JSON each (see Master.iter_export()).")
+    export_parser.add_argument("file", nargs="?", default="-", help="File to write to, standard output if '-' (default).")
+    import_parser = commands.add_parser("import", help="Import lines written by 'export' into the store (see Master.import_stream()).")
+    import_parser.add_argument("file", nargs="?", default="-", help="File to read from, standard input if '-' (default).")
+    benchmark_parser = commands.add_parser("benchmark", help="Measure the read throughput of Master by number of reading threads, without and with a concurrent writer (see benchmark_reads()).")
+    benchmark_parser.add_argument("--threads", default="1,2,4,8", help="Comma separated numbers of reading threads (default: 1,2,4,8).")
+    benchmark_parser.add_argument("--seconds", type=float, default=2.0, help="Seconds to read for with each number of threads (default: 2).")
+
+    args = parser.parse_args()
+
+    storage = None
+    if args.storage:
+        extension = os.path.splitext(args.storage)[1]
+
+        if os.path.isdir(args.storage):
+            storage = ShardedStorage(args.storage)
+        elif extension == ".db":
+            storage = SQLiteStorage(args.storage)
+        elif extension == ".bin":
+            storage = BinaryStorage(args.storage)
+        else:
+            storage = JSONStorage(args.storage, lazy=True, shared=args.shared)
+
+    if args.shared and storage and not storage.shared:
+        parser.error("--shared is only supported by a JSONStorage.")
+
+    master = Master(DevUI(), storage=storage, shared=args.shared, lazy_neighbors=args.lazy_neighbors, persist_search=args.persist_search, trusted_load=args.trusted_load)
+
+    if args.command:
+        master.load_data()
+
+        try:
+            if args.command == "export":
+                with (open(args.file, mode='w', encoding='utf-8') if args.file != '-' else contextlib.nullcontext(sys.stdout)) as f, master.lock.read():
+                    f.writelines(master.iter_export())
+            elif args.command == "import":
+                with (open(args.file, mode='r', encoding='utf-8') if args.file != '-' else contextlib.nullcontext(sys.stdin)) as f:
+                    n = master.import_stream(f)
+                master.ui.relay(f"Imported {n} records into '{master.STORAGE_PATH}'.")
+            else:
+                thread_counts = [int(n) for n in args.threads.split(',')]
+
+                for writer in (False, True):
+                    results = benchmark_reads(master, thread_counts, seconds=args.seconds, writer=writer)
+                    for n, rate in results.items():
+                        master.ui.relay(f"{n} reading thread(s){' and a writing thread' if writer else ''}: {rate:.0f} reads/s")
+        finally:
+            master.close()
\ No newline at end of file
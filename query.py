@@ -0,0 +1,143 @@
+from task import Task
+from globals import *
+
+# Task getters by task dict key, for reading the fields of Task objects. See _field().
+_GETTERS = {
+    TASK_COMMENTS: Task.get_comments,
+    TASK_DESCRIPTION: Task.get_description,
+    TASK_FILES: Task.get_files,
+    TASK_LINKS: Task.get_links,
+    TASK_STATUS: Task.get_status,
+    TASK_SUBTASKS: Task.get_subtasks,
+    TASK_PARENTS: Task.get_parents,
+    TASK_TITLE: Task.get_title
+}
+
+_LIST_KEYS = (TASK_COMMENTS, TASK_FILES, TASK_LINKS, TASK_SUBTASKS, TASK_PARENTS)
+
+def _field(task, key):
+    ''' Returns the value of 'key' of 'task', which is either a Task object or a task dictionary. '''
+    return _GETTERS[key](task) if isinstance(task, Task) else task[key]
+
+def _text(key, text, ignore_case, exact):
+    ''' Returns a Predicate matching tasks with 'text' in (or as, if 'exact') the string of task dict key 'key'. '''
+
+    if ignore_case:
+        text = text.lower()
+        if exact:
+            return where(key, lambda value: value.lower() == text)
+        return where(key, lambda value: text in value.lower())
+
+    if exact:
+        return where(key, lambda value: value == text)
+    return where(key, lambda value: text in value)
+
+def _validate_key(key, keys):
+    if key not in keys:
+        raise ValueError(f"Expected one of {list(keys)}, got '{key}'.")
+
+class Predicate:
+    ''' Condition on a task, for Master.query(). Predicates are made with the functions of this
+    module and combined with & (and), | (or) and ~ (not), e.g.
+
+        master.query(status(False) & count(TASK_SUBTASKS, minimum=4) & ~in_group())
+
+    A predicate is evaluated against the stored task dict of each task (or its Task object, if
+    it has been loaded), so that no Task object is created.
+
+    'bind' is called with the Master the query is made on, once per query, and returns a
+    function of a task ID and a task that returns True if the task matches. 'group_id' is the
+    ID of a group every matching task is in, if known, which Master.query() then reads the
+    tasks of instead of every task.
+    '''
+
+    def __init__(self, bind, group_id=None):
+        self.bind = bind
+        self.group_id = group_id
+
+    def __and__(self, other):
+        def bind(master):
+            first, second = self.bind(master), other.bind(master)
+            return lambda task_id, task: first(task_id, task) and second(task_id, task)
+
+        return Predicate(bind, self.group_id or other.group_id)
+
+    def __invert__(self):
+        def bind(master):
+            test = self.bind(master)
+            return lambda task_id, task: not test(task_id, task)
+
+        return Predicate(bind)
+
+    def __or__(self, other):
+        def bind(master):
+            first, second = self.bind(master), other.bind(master)
+            return lambda task_id, task: first(task_id, task) or second(task_id, task)
+
+        return Predicate(bind)
+
+def contains(key, value):
+    ''' Returns a Predicate matching tasks with 'value' in the list of task dict key 'key', one
+    of TASK_COMMENTS, TASK_FILES, TASK_LINKS, TASK_SUBTASKS and TASK_PARENTS.
+
+    Raises:
+        ValueError
+    '''
+
+    _validate_key(key, _LIST_KEYS)
+
+    return where(key, lambda values: value in values)
+
+def count(key, minimum=1, maximum=None):
+    ''' Returns a Predicate matching tasks with at least 'minimum' and at most 'maximum' (if not
+    None) items in the list of task dict key 'key', one of TASK_COMMENTS, TASK_FILES, TASK_LINKS,
+    TASK_SUBTASKS and TASK_PARENTS.
+
+    Raises:
+        ValueError
+    '''
+
+    _validate_key(key, _LIST_KEYS)
+
+    if maximum is None:
+        return where(key, lambda values: len(values) >= minimum)
+
+    return where(key, lambda values: minimum <= len(values) <= maximum)
+
+def description(text, ignore_case=True):
+    ''' Returns a Predicate matching tasks with 'text' in their description. '''
+    return _text(TASK_DESCRIPTION, text, ignore_case, False)
+
+def in_group(group_id=None):
+    ''' Returns a Predicate matching tasks in group with ID 'group_id', or in any group if None.
+    Master.query() raises GroupNotFoundError if there is no such group. '''
+
+    if group_id is None:
+        return Predicate(lambda master: lambda task_id, task: master.in_group(task_id))
+
+    def bind(master):
+        task_ids = set(master.get_group_tasks(group_id))
+        return lambda task_id, task: task_id in task_ids
+
+    return Predicate(bind, group_id)
+
+def status(completed=True):
+    ''' Returns a Predicate matching tasks that are completed, or not if 'completed' is False. '''
+    return where(TASK_STATUS, lambda value: value == completed)
+
+def title(text, ignore_case=True, exact=False):
+    ''' Returns a Predicate matching tasks with 'text' in their title, or with title 'text' if
+    'exact' is True. '''
+    return _text(TASK_TITLE, text, ignore_case, exact)
+
+def where(key, test):
+    ''' Returns a Predicate matching tasks for which 'test' returns True when called with the
+    value of task dict key 'key' (e.g. TASK_TITLE) of the task. List values must not be modified.
+
+    Raises:
+        ValueError
+    '''
+
+    _validate_key(key, _GETTERS)
+
+    return Predicate(lambda master: lambda task_id, task: test(_field(task, key)))
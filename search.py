@@ -0,0 +1,287 @@
+import re, json, math, heapq, bisect, threading
+from collections import Counter
+from storage import atomic_write
+from globals import *
+
+class SearchIndex:
+    ''' Inverted index of the words in the title, description and comments of tasks, for ranked
+    full-text search.
+
+    Text is split into words of letters, digits and underscores, lowercased. Each task is
+    indexed by the number of times each word occurs in it, with words in the title counted
+    SEARCH_TITLE_WEIGHT times. SearchIndex.search() returns the tasks holding every word of
+    a query, ranked by the sum over those words of their count in the task times their inverse
+    document frequency (the rarer a word, the more it counts).
+
+    The index is built with SearchIndex.build() and kept up to date with SearchIndex.update(),
+    which only touches the words of the task passed. It can be written to a file with
+    SearchIndex.save() and read back with SearchIndex.load(), along with a stamp identifying
+    the data it was built from.
+    '''
+
+    WORD = re.compile(r'\w+')
+
+    # Number of tasks holding the rarest word of a query of several words above which
+    # SearchIndex.search() walks the tasks of each word by descending count (see
+    # SearchIndex._top()) rather than score them all. Queries of a single word always do.
+    RANKED_SIZE = 10000
+
+    def __init__(self):
+        self._lock = threading.RLock() # Searches may be made by several readers at once.
+
+        # Word counts by task ID, by word. None until built.
+        self._postings = None
+
+        # Words of each task ID, derived from the postings once a task is updated (see
+        # SearchIndex._task_words()), and the number of tasks indexed.
+        self._words = None
+        self._size = 0
+
+        # (-count, task ID) pairs of the tasks holding each word, in order, for the words that
+        # have been searched for. See SearchIndex._top().
+        self._ranked = {}
+
+    def _count(self, title, description, comments):
+        ''' Returns a dict of the weighted number of times each word occurs in the texts of a task. '''
+
+        counts = Counter(self.WORD.findall(' '.join((description, *comments)).lower()))
+
+        for word in self.WORD.findall(title.lower()):
+            counts[word] += SEARCH_TITLE_WEIGHT
+
+        return counts
+
+    def _index(self, task_id, counts):
+        ''' Replaces the word counts of task with ID 'task_id' with 'counts' (None to remove it). '''
+
+        words = self._task_words()
+        old_words = words.pop(task_id, None)
+
+        if old_words is not None:
+            self._size -= 1
+            for word in old_words:
+                task_counts = self._postings[word]
+                count = task_counts.pop(task_id)
+                if not task_counts:
+                    del self._postings[word]
+                self._rank(word, task_id, count, None)
+
+        if counts:
+            words[task_id] = list(counts)
+            self._size += 1
+            for word, count in counts.items():
+                task_counts = self._postings.get(word)
+                if task_counts is None:
+                    self._postings[word] = {task_id: count}
+                else:
+                    task_counts[task_id] = count
+                self._rank(word, task_id, None, count)
+
+    def _rank(self, word, task_id, old_count, count):
+        ''' Moves task with ID 'task_id' from 'old_count' to 'count' (either None if it is not
+        ranked) in the ranked tasks of 'word', if they have been ranked. '''
+
+        ranked = self._ranked.get(word)
+        if ranked is None:
+            return
+
+        if old_count is not None:
+            del ranked[bisect.bisect_left(ranked, (-old_count, task_id))]
+        if count is not None:
+            bisect.insort(ranked, (-count, task_id))
+
+    def _ranked_tasks(self, word):
+        ''' Returns the (-count, task ID) pairs of the tasks holding 'word', most occurrences first. '''
+
+        ranked = self._ranked.get(word)
+        if ranked is None:
+            ranked = self._ranked[word] = sorted((-count, task_id) for task_id, count in self._postings[word].items())
+
+        return ranked
+
+    def _task_words(self):
+        ''' Returns a dict of the words of each task by task ID. '''
+
+        if self._words is None:
+            words = {}
+            for word, task_counts in self._postings.items():
+                for task_id in task_counts:
+                    task_words = words.get(task_id)
+                    if task_words is None:
+                        words[task_id] = [word]
+                    else:
+                        task_words.append(word)
+            self._words = words
+
+        return self._words
+
+    def _top(self, words, weights, task_ids, limit):
+        ''' Returns the IDs of the 'limit' tasks with ID in 'task_ids' (any if None) with the
+        highest score, best first, with the tasks holding each word walked in parallel by
+        descending count. Stops once no task not yet seen can score higher than the last of
+        them (Fagin's threshold algorithm). '''
+
+        rankings = [self._ranked_tasks(word) for word in words]
+        top = [] # Heap of (score, task ID).
+        seen = set()
+
+        for depth in range(len(rankings[0])):
+            threshold = 0.0
+
+            for ranked, (task_counts, weight) in zip(rankings, weights):
+                if depth >= len(ranked):
+                    continue
+
+                count, task_id = ranked[depth]
+                threshold -= count * weight
+                if task_id in seen:
+                    continue
+                seen.add(task_id)
+
+                if task_ids is not None and task_id not in task_ids:
+                    continue
+
+                score = self._score(task_id, weights)
+                if score is None:
+                    continue
+                if len(top) < limit:
+                    heapq.heappush(top, (score, task_id))
+                elif score > top[0][0]:
+                    heapq.heapreplace(top, (score, task_id))
+
+            if len(top) == limit and top[0][0] >= threshold:
+                break
+
+        return [task_id for _, task_id in sorted(top, key=lambda entry: entry[0], reverse=True)]
+
+    def _score(self, task_id, weights):
+        ''' Returns the score of task with ID 'task_id', or None if it does not hold every word. '''
+
+        score = 0.0
+        for task_counts, weight in weights:
+            count = task_counts.get(task_id)
+            if count is None:
+                return None
+            score += count * weight
+
+        return score
+
+    @property
+    def built(self):
+        return self._postings is not None
+
+    def build(self, texts):
+        ''' Builds the index from 'texts', an iterable of pairs of a task ID and a tuple of the
+        title, description and comments of the task. '''
+
+        with self._lock:
+            self._postings = {}
+            self._words = {}
+            self._size = 0
+            self._ranked = {}
+
+            for task_id, text in texts:
+                self._index(task_id, self._count(*text))
+
+    def clear(self):
+        ''' Discards the index, for when the tasks have been replaced wholesale. '''
+
+        with self._lock:
+            self._postings = None
+            self._words = None
+            self._size = 0
+            self._ranked = {}
+
+    def load(self, path, stamp):
+        ''' Reads the index from the file at 'path', as written by SearchIndex.save(), and returns
+        True if it was saved with 'stamp'. Otherwise, or if there is no such file, the index is
+        left as it was and False is returned.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        try:
+            with open(path, mode='r', encoding='utf-8') as f:
+                if json.loads(f.readline()) != stamp:
+                    return False
+                size = json.loads(f.readline())
+                postings = json.loads(f.readline())
+        except FileNotFoundError:
+            return False
+        except json.JSONDecodeError as e:
+            raise DataError(path=path, msg="Search index could not be decoded.") from e
+        except OSError as e:
+            raise FSError(path=path, msg=str(e)) from e
+
+        try:
+            postings = {word: dict(zip(task_ids, counts)) for word, (task_ids, counts) in postings.items()}
+        except (TypeError, ValueError, AttributeError) as e:
+            raise DataError(path=path, msg="Search index is not in the expected format.") from e
+
+        with self._lock:
+            self._postings = postings
+            self._words = None
+            self._size = size
+            self._ranked = {}
+
+        return True
+
+    def save(self, path, stamp):
+        ''' Writes the index, with 'stamp', to the file at 'path'. The word counts of each word
+        are written as a list of task IDs and a list of counts, which are faster to decode than
+        a dict.
+
+        Raises:
+            FSError
+        '''
+
+        with self._lock:
+            postings = {word: [list(task_counts), list(task_counts.values())] for word, task_counts in self._postings.items()}
+            lines = (stamp, self._size, postings)
+
+        text = ''.join(json.dumps(line, ensure_ascii=False) + '\n' for line in lines)
+        atomic_write(path, text.encode('utf-8'))
+
+    def search(self, query, task_ids=None, limit=SEARCH_LIMIT):
+        ''' Returns a list of the IDs of up to 'limit' tasks holding every word in str 'query',
+        best match first. If 'task_ids' is passed, only tasks with ID in it are returned. '''
+
+        words = set(self.WORD.findall(query.lower()))
+        if not words or limit <= 0:
+            return []
+
+        with self._lock:
+            if not all(word in self._postings for word in words):
+                return []
+
+            words = sorted(words, key=lambda word: len(self._postings[word]))
+            postings = [self._postings[word] for word in words]
+            weights = [(task_counts, math.log(1 + self._size / len(task_counts))) for task_counts in postings]
+
+            if task_ids is not None and len(task_ids) < len(postings[0]):
+                candidates = [task_id for task_id in task_ids if task_id in postings[0]]
+            elif len(postings[0]) > (limit if len(words) == 1 else self.RANKED_SIZE):
+                return self._top(words, weights, task_ids, limit)
+            elif task_ids is not None:
+                candidates = [task_id for task_id in postings[0] if task_id in task_ids]
+            else:
+                candidates = postings[0]
+
+            scores = {}
+            for task_id in candidates:
+                score = self._score(task_id, weights)
+                if score is not None:
+                    scores[task_id] = score
+
+        return heapq.nlargest(limit, scores, key=scores.__getitem__)
+
+    def update(self, task_id, text):
+        ''' Indexes the title, description and comments in tuple 'text' of task with ID 'task_id',
+        after it has been modified or created, or removes it from the index if 'text' is None.
+        Does nothing if the index has not been built. '''
+
+        with self._lock:
+            if self._postings is not None:
+                self._index(task_id, self._count(*text) if text is not None else None)
@@ -0,0 +1,2683 @@
+import os, re, sys, copy, json, mmap, time, array, struct, sqlite3, itertools, threading, contextlib, concurrent.futures
+from collections.abc import MutableMapping
+try:
+    import fcntl
+except ImportError: # Not available on Windows, where a shared JSONStorage is not supported.
+    fcntl = None
+from task import Task
+from globals import *
+
+def groups_task_ids_to(type, data):
+    ''' Converts task IDs in every group in 'data' to set or list.
+
+    Raises:
+        TypeError
+    '''
+
+    if not (type == OrderedSet or type == list):
+        raise TypeError(f"Invalid type provided: {type}")
+
+    for group_id in data[DATA_GROUPS].keys():
+        data[DATA_GROUPS][group_id][GROUP_TASKS] = type(data[DATA_GROUPS][group_id][GROUP_TASKS])
+
+def task_dict(task):
+    ''' Returns the task dictionary of 'task', which is either a Task object or a task dictionary. '''
+    return task.write_dict() if isinstance(task, Task) else task
+
+def task_title(task):
+    ''' Returns the title of 'task', which is either a Task object or a task dictionary. '''
+    return task.get_title() if isinstance(task, Task) else task[TASK_TITLE]
+
+def task_text(task):
+    ''' Returns a tuple of the title, description and comments of 'task', which is either a Task 
+    object or a task dictionary. '''
+
+    if isinstance(task, Task):
+        return task.get_title(), task.get_description(), task.get_comments()
+
+    return task[TASK_TITLE], task[TASK_DESCRIPTION], task[TASK_COMMENTS]
+
+class LazyDict(MutableMapping):
+    ''' Dictionary whose values are fetched from a storage backend on first access.
+
+    'fetch' is called with a key and returns its value, or None if no such key is stored. 'keys'
+    is called without arguments and returns an iterable of every stored key, in order. 'exists' 
+    (optional) is called with a key and returns True if it is stored, without fetching its value. 
+    Values that have been fetched, set or deleted are kept in memory, everything else is left in 
+    the store. Values may be fetched by several threads at once, but only set or deleted by one
+    thread while no other accesses the dictionary.
+    '''
+
+    def __init__(self, fetch, keys, exists=None):
+        self._fetch = fetch
+        self._keys = keys
+        self._exists = exists
+
+        self._loaded = {}
+        self._removed = set()
+        self._lock = threading.Lock() # Held while fetching a value and keeping it in memory.
+
+    def __contains__(self, key):
+        if key in self._loaded:
+            return True
+        if key in self._removed:
+            return False
+
+        if self._exists:
+            return self._exists(key)
+        
+        return super().__contains__(key)
+
+    def __getitem__(self, key):
+        try:
+            return self._loaded[key]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if key in self._loaded: # Fetched by another thread meanwhile.
+                return self._loaded[key]
+            if key in self._removed:
+                raise KeyError(key)
+
+            value = self._fetch(key)
+            if value is None:
+                raise KeyError(key)
+
+            self._loaded[key] = value
+            return value
+
+    def __setitem__(self, key, value):
+        self._loaded[key] = value
+        self._removed.discard(key)
+
+    def __delitem__(self, key):
+        self[key] # Raises KeyError if key does not exist.
+
+        del self._loaded[key]
+        self._removed.add(key)
+
+    def __iter__(self):
+        return iter(self._key_list())
+
+    def __len__(self):
+        return len(self._key_list())
+
+    def _key_list(self):
+        ''' Returns a list of every key, stored keys first. '''
+
+        keys = self._keys()
+        if self._removed:
+            keys = [key for key in keys if key not in self._removed]
+
+        if self._loaded:
+            return list(dict.fromkeys(itertools.chain(keys, self._loaded)))
+
+        return list(keys)
+
+    def is_loaded(self, key):
+        ''' Returns True if the value of 'key' is held in memory. '''
+        return key in self._loaded
+
+    def loaded(self):
+        ''' Returns a dict of the entries currently held in memory. '''
+        return dict(self._loaded)
+
+    def peek(self, key, default=None):
+        ''' Returns the value of 'key' like get(), but without keeping a fetched value in memory. '''
+
+        if key in self._loaded:
+            return self._loaded[key]
+        if key in self._removed:
+            return default
+
+        value = self._fetch(key)
+        return default if value is None else value
+
+def atomic_write(path, data):
+    ''' Writes bytes 'data' to a temporary file next to 'path', flushes it to disk and renames it
+    over 'path'. A crash at any point leaves 'path' with either its previous or its new contents.
+
+    Raises:
+        OSError
+    '''
+
+    temp_path = path + ".tmp"
+
+    try:
+        with open(temp_path, mode='wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+    # Persist the rename itself. Not every platform allows opening a directory.
+    try:
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+class Payload:
+    ''' Everything a storage backend needs to persist one write, captured from Master.data by 
+    Storage.prepare() so that Storage.commit() does not have to read Master.data. 
+
+    'rewrites' is True if committing the payload rewrites the entire store.
+    '''
+
+    def __init__(self, content, rewrites=False):
+        self.content = content
+        self.rewrites = rewrites
+
+class Storage:
+    ''' Base class for the storage backends used by Master to persist Master.data.
+
+    Master sets 'master' when the backend is passed to it. Subclasses must define:
+
+        create(data)                                    : Creates (or overwrites) the store so that it contains 'data'.
+        load()                                          : Returns the stored data in the layout of Master.data, with task IDs of
+                                                          each group in an OrderedSet. Returns an empty dict if no store exists.
+        prepare(data, tasks, groups, header, compact)   : Returns a Payload of the tasks and groups with IDs in 'tasks' and 'groups'
+                                                          (removing any that are no longer in 'data') and, if 'header' is True, the
+                                                          header values. If 'compact' is True the payload also reorganizes the store
+                                                          to reclaim space. Returns None if there is nothing to write.
+        commit(payloads)                                : Persists a list of payloads, in the order they were prepared.
+
+    prepare() is called on the thread that modifies Master.data and should only do work
+    proportional to the modified data. commit() may be called on another thread (see 
+    WriteBehind), concurrently with reads of the store by load() and LazyDict.
+
+    If 'lazy' is True, task and group dictionaries returned by load() are fetched from the store
+    on first access (see LazyDict) rather than read up front. Such backends may override
+    preload() to read the tasks of several groups at once.
+
+    If 'shared' is True, several processes may write to the store at once. Such backends override
+    locked() and fetch_changes(), see JSONStorage.
+    '''
+
+    lazy = False
+    shared = False
+
+    def __init__(self, path):
+        self.path = path
+        self.master = None
+
+    def _files(self):
+        ''' Returns the paths of the files the store is kept in. '''
+
+        if os.path.isdir(self.path):
+            return sorted(os.path.join(self.path, name) for name in os.listdir(self.path))
+
+        return [self.path]
+
+    def _relay(self, message):
+        if self.master:
+            self.master.ui.relay(message)
+
+    def close(self):
+        ''' Releases any resources held by the backend. '''
+        pass
+
+    def compact(self, data, tasks, groups, header):
+        ''' Persists modified data and reorganizes the store to reclaim space, if supported.
+        Returns True if the entire store was rewritten. '''
+        return self.write(data, tasks, groups, header, compact=True)
+
+    def fetch_changes(self):
+        ''' Returns the changes made to the store by other processes since this backend last
+        loaded, wrote or fetched changes from it, or None if there are none. Always None unless
+        the store is shared. '''
+        return None
+
+    def locked(self):
+        ''' Returns a context manager that keeps other processes from writing to the store while
+        it is entered. '''
+        return contextlib.nullcontext()
+
+    def preload(self, group_ids):
+        ''' Reads the tasks of the groups with IDs in 'group_ids' (every group if None) ahead of
+        their first access, if supported. '''
+        pass
+
+    def stamp(self):
+        ''' Returns a list that changes whenever the store is written to, by this process or any
+        other: the path, size and modification time of each file the store is kept in. '''
+
+        stamp = []
+        for path in self._files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            stamp.append([path, stat.st_size, stat.st_mtime_ns])
+
+        return stamp
+
+    def write(self, data, tasks, groups, header, compact=False):
+        ''' Prepares and commits modified data on the calling thread. Returns True if the 
+        entire store was rewritten. '''
+
+        payload = self.prepare(data, tasks, groups, header, compact=compact)
+        if not payload:
+            return False
+
+        self.commit([payload])
+        return payload.rewrites
+
+class WriteBehind:
+    ''' Commits payloads prepared by a storage backend on a background thread.
+
+    The thread waits until no payload has been submitted for 'debounce' seconds, then commits
+    every pending payload at once, so that a burst of writes reaches the store as one. If the
+    commit fails its payloads are kept and retried after another 'debounce' seconds, and the 
+    error is raised by the next call to submit(), flush() or close().
+    '''
+
+    def __init__(self, storage, debounce=WRITE_BEHIND_DEBOUNCE):
+        self.storage = storage
+        self.debounce = debounce
+
+        self._condition = threading.Condition()
+        self._pending = []
+        self._last_submit = 0
+        self._committing = False
+        self._flushing = False
+        self._closed = False
+        self._error = None
+
+        self._thread = threading.Thread(target=self._run, name="WriteBehind", daemon=True)
+        self._thread.start()
+
+    def _raise_error(self):
+        ''' Raises (and forgets) the error of the last failed commit, if any. Expects the condition to be held. '''
+
+        if self._error:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not (self._pending or self._closed):
+                    self._condition.wait()
+                if not self._pending:
+                    return
+
+                while not (self._flushing or self._closed):
+                    remaining = self._last_submit + self.debounce - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                payloads, self._pending = self._pending, []
+                self._committing = True
+
+            error = None
+            try:
+                self.storage.commit(payloads)
+            except Exception as e:
+                error = e
+
+            with self._condition:
+                self._committing = False
+
+                if error:
+                    self._error = error
+                    if self._closed: # Nothing will retry them.
+                        return
+                    self._pending = payloads + self._pending
+                    self._last_submit = time.monotonic()
+
+                self._condition.notify_all()
+
+    def close(self):
+        ''' Commits every pending payload and stops the thread.
+
+        Raises:
+            FSError
+        '''
+
+        try:
+            self.flush()
+        finally:
+            with self._condition:
+                self._closed = True
+                self._condition.notify_all()
+
+            self._thread.join()
+
+            with self._condition:
+                self._raise_error()
+
+    def flush(self):
+        ''' Blocks until every submitted payload has been committed, without waiting for the debounce interval.
+
+        Raises:
+            FSError
+        '''
+
+        with self._condition:
+            self._flushing = True
+            self._condition.notify_all()
+
+            try:
+                while (self._pending or self._committing) and not self._error:
+                    self._condition.wait()
+            finally:
+                self._flushing = False
+
+            self._raise_error()
+
+    def submit(self, payload):
+        ''' Queues 'payload' to be committed once the debounce interval has passed. 
+
+        Raises:
+            FSError
+        '''
+
+        with self._condition:
+            self._pending.append(payload)
+            self._last_submit = time.monotonic()
+            self._condition.notify_all()
+
+            self._raise_error()
+
+class JSONStorage(Storage):
+    ''' Stores Master.data in a single JSON file.
+
+    If 'journal' is True, a write appends a record for every task, group and header value
+    modified since the last write to a journal file next to the storage file instead of
+    rewriting the whole file. The journal is folded into a new snapshot once it holds
+    JOURNAL_COMPACT_THRESHOLD records, or when compact() is called. A leftover journal is
+    always replayed by load(), regardless of 'journal'.
+
+    If 'lazy' is True, load() only decodes the header (everything but the tasks) and the 
+    storage file is memory-mapped. Each task dict is decoded from its byte span in the file 
+    when first accessed. The spans are recorded in an index file next to the storage file 
+    whenever the storage file is written, or found by scanning the file once if the index 
+    is missing or out of date. Unmodified tasks are written back from their span without 
+    being decoded.
+
+    commit() keeps the data as last written: the JSON text of each header value and group, 
+    and the span of each task in the mapped storage file or, if modified since, its JSON text.
+    It is read from the storage file, index and journal when first needed. prepare() therefore
+    only encodes modified tasks and groups, and a snapshot copies the bytes of unmodified tasks,
+    so the work done on the thread calling prepare() does not depend on the size of the store.
+
+    The storage file, and the index file, are only ever replaced as a whole (see atomic_write()),
+    so a crash while writing a snapshot leaves the previous snapshot in place.
+
+    If 'shared' is True, several processes may use the store at once. load() holds a lock file
+    next to the storage file with a shared advisory lock (fcntl.flock()), and commit() with an
+    exclusive one. Every commit also appends an entry to a change log next to the storage file,
+    with the IDs of the tasks and groups it changes and the generation of the store it creates.
+    If another process has written to the store since, commit() first brings the data as last
+    written up to date, by reading the journal records appended since if the storage file is the
+    one mapped, so that it only replaces the tasks and groups of its own payloads. fetch_changes()
+    returns what other processes changed, read from the change log, for Master to merge.
+    '''
+
+    # A JSON string, or a structural character. Used to find spans without decoding.
+    TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]:]')
+
+    def __init__(self, path, journal=False, lazy=False, shared=False):
+        super().__init__(path)
+
+        if shared and not fcntl:
+            raise FSError(path=path, msg="A shared storage file requires fcntl, which is not available on this platform.")
+
+        self.journal = journal
+        self.journal_path = os.path.splitext(path)[0] + ".journal"
+        self.lazy = lazy
+        self.index_path = os.path.splitext(path)[0] + ".index"
+        self.shared = shared
+        self.lock_path = os.path.splitext(path)[0] + ".lock"
+        self.changes_path = os.path.splitext(path)[0] + ".changes"
+
+        self._journal_length = 0
+        self._journal_size = 0 # Bytes of the journal file reflected in the data as last written.
+
+        # Header values, groups and tasks as last written, see _load_written(). Only accessed by commit().
+        self._written = None
+
+        # Mapping of the storage file, for lazy loading and for copying unmodified tasks.
+        self._file = None
+        self._mm = None
+        self._tasks_span = None
+        self._task_ids = []
+        self._spans = {} # Task ID -> (start, end) byte offsets in the mapped storage file.
+        self._mapped = None # Identity of the mapped storage file, see _identity().
+        self._lock = threading.Lock() # Held while reading or replacing the mapping, as commit() may run on another thread.
+
+        # Lock file, and the generation of the store as last loaded, written or fetched from. Only used if 'shared'.
+        self._lock_file = None
+        self._lock_depth = 0
+        self._file_lock = threading.RLock() # Held by the thread holding the lock file, see _hold().
+        self._generation = 0
+
+    def _apply(self, changes):
+        ''' Applies changes captured by _capture() to the header values, groups and tasks as last written. '''
+
+        fields, groups, tasks = changes
+
+        written_fields, written_groups, written_tasks = self._written
+        written_fields.update(fields)
+
+        for written, changed in ((written_groups, groups), (written_tasks, tasks)):
+            for id, text in changed.items():
+                if text is None:
+                    written.pop(id, None)
+                else:
+                    written[id] = text
+
+    def _apply_journal_record(self, data, record):
+        ''' Applies a single journal record to 'data'.
+
+        Raises:
+            DataError
+        '''
+
+        try:
+            op = record[JOURNAL_OP]
+
+            if op == JOURNAL_OP_HEADER:
+                data.update(record[JOURNAL_DATA])
+            elif op == JOURNAL_OP_GROUP:
+                data[DATA_GROUPS][record[JOURNAL_ID]] = record[JOURNAL_DATA]
+            elif op == JOURNAL_OP_REMOVE_GROUP:
+                data[DATA_GROUPS].pop(record[JOURNAL_ID], None)
+            elif op == JOURNAL_OP_TASK:
+                data[DATA_TASKS][record[JOURNAL_ID]] = record[JOURNAL_DATA]
+            elif op == JOURNAL_OP_REMOVE_TASK:
+                data[DATA_TASKS].pop(record[JOURNAL_ID], None)
+            else:
+                raise DataError(path=self.journal_path, msg=f"Unknown journal operation: '{op}'")
+        except (KeyError, TypeError, AttributeError) as e:
+            raise DataError(path=self.journal_path, msg=f"Malformed journal record: {record}") from e
+
+    def _capture(self, data, tasks, groups, header):
+        ''' Returns the JSON text of the provided tasks, groups and (if 'header' is True) header
+        values of 'data', with None for tasks and groups that have been removed. '''
+
+        fields = {}
+        if header:
+            fields = {key: self._encode(value) for key, value in data.items() if key not in (DATA_GROUPS, DATA_TASKS)}
+
+        captured_groups = {}
+        for group_id in groups:
+            group = data[DATA_GROUPS].get(group_id)
+            captured_groups[group_id] = group and self._encode({GROUP_TASKS: list(group[GROUP_TASKS]), GROUP_TITLE: group[GROUP_TITLE]})
+
+        captured_tasks = {}
+        for task_id in tasks:
+            task = data[DATA_TASKS].get(task_id)
+            captured_tasks[task_id] = task and self._encode(task_dict(task))
+
+        return fields, captured_groups, captured_tasks
+
+    def _commit(self, payloads):
+        ''' Applies 'payloads' to the data as last written and persists them, see commit().
+
+        Raises:
+            FSError
+        '''
+
+        if self._written is None:
+            self._written = self._load_written()
+
+        for payload in payloads:
+            self._apply(payload.content)
+
+        if any(payload.rewrites for payload in payloads):
+            self._write_snapshot()
+            return
+
+        lines = [line for payload in payloads for line in self._journal_lines(payload.content)]
+        if lines:
+            self._write_journal(lines)
+
+    def _decode_changes(self, header, group_ids, task_ids):
+        ''' Returns the header values (if 'header' is True) and the groups and tasks with IDs in
+        'group_ids' and 'task_ids' as last written, decoded into the layout of Master.data with
+        None for groups and tasks that no longer exist. If 'task_ids' is None every group and
+        task is returned. Also returns whether that is the case, see fetch_changes().
+
+        Raises:
+            DataError
+        '''
+
+        fields, groups, tasks = self._written
+        complete = task_ids is None
+
+        if complete:
+            header, group_ids, task_ids = True, groups, tasks
+
+        try:
+            changes = {}
+            if header:
+                changes = {key: json.loads(text) for key, text in fields.items() if key not in (DATA_GROUPS, DATA_TASKS)}
+
+            changes[DATA_GROUPS] = {group_id: groups[group_id] and json.loads(groups[group_id]) if group_id in groups else None for group_id in group_ids}
+
+            changes[DATA_TASKS] = {}
+            with self._lock:
+                for task_id in task_ids:
+                    text = tasks.get(task_id)
+                    if isinstance(text, tuple):
+                        text = self._mm[text[0]:text[1]]
+                    changes[DATA_TASKS][task_id] = text and json.loads(text)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise DataError(path=self.path, msg="The data in storage file could not be interpreted.") from e
+
+        return changes, complete
+
+    def _decode_header(self):
+        ''' Returns the mapped storage file decoded, apart from its tasks.
+
+        Raises:
+            DataError
+        '''
+
+        start, end = self._tasks_span
+
+        try:
+            return json.loads(self._mm[:start] + b'{}' + self._mm[end:])
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise DataError(path=self.path, msg="The data in storage file could not be interpreted.") from e
+
+    def _encode(self, obj):
+        return json.dumps(obj, ensure_ascii=False)
+
+    def _encode_data(self):
+        ''' Returns the header values, groups and tasks as last written as the UTF-8 JSON text
+        of the storage file. Also returns the byte span of the tasks object and a dict of the
+        byte span of each task. '''
+
+        fields, groups, tasks = self._written
+
+        chunks = []
+        length = 0
+        tasks_span = None
+        spans = {}
+
+        def add(chunk):
+            nonlocal length
+
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            chunks.append(chunk)
+            length += len(chunk)
+
+        add('{')
+        for i, (key, text) in enumerate(fields.items()):
+            if i:
+                add(', ')
+            add(f"{self._encode(key)}: ")
+
+            if key == DATA_GROUPS:
+                add('{' + ', '.join(f"{self._encode(group_id)}: {text}" for group_id, text in groups.items()) + '}')
+            elif key == DATA_TASKS:
+                tasks_start = length
+
+                add('{')
+                for j, (task_id, text) in enumerate(tasks.items()):
+                    if j:
+                        add(', ')
+                    add(f"{self._encode(task_id)}: ")
+
+                    start = length
+                    if isinstance(text, tuple): # Unmodified since the storage file was mapped, copy its bytes.
+                        add(self._mm[text[0]:text[1]])
+                    else:
+                        add(text)
+                    spans[task_id] = (start, length)
+                add('}')
+
+                tasks_span = (tasks_start, length)
+            else:
+                add(text)
+        add('}')
+
+        return b''.join(chunks), tasks_span, spans
+
+    def _fetch_task(self, task_id):
+        ''' Decodes the task dict with ID 'task_id' from its span in the storage file. 
+        Returns None if there is no such task.
+
+        Raises:
+            DataError
+        '''
+
+        with self._lock:
+            span = self._spans.get(task_id)
+            if span is None:
+                return None
+
+            text = self._mm[span[0]:span[1]]
+
+        try:
+            return json.loads(text)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise DataError(path=self.path, task_id=task_id, msg="The data of task in storage file could not be interpreted.") from e
+
+    def _files(self):
+        return [self.path, self.journal_path, self.changes_path]
+
+    def _get_task_ids(self):
+        return self._task_ids
+
+    def _has_task(self, task_id):
+        return task_id in self._spans
+
+    @contextlib.contextmanager
+    def _hold(self, exclusive):
+        ''' Holds the lock file with an exclusive lock if 'exclusive' is True, else with a shared
+        one, while the block runs. A thread that already holds the lock keeps it as first taken
+        until its outermost block exits. Does nothing unless the store is shared.
+
+        Raises:
+            FSError
+        '''
+
+        if not self.shared:
+            yield
+            return
+
+        with self._file_lock:
+            if not self._lock_depth:
+                try:
+                    if not self._lock_file:
+                        self._lock_file = open(self.lock_path, mode='ab')
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                except OSError as e:
+                    raise FSError(path=self.lock_path, msg=f"Failed to lock storage file through lock file at: '{self.lock_path}'") from e
+
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if not self._lock_depth:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _identity(self, stat):
+        ''' Returns what identifies a version of the storage file, from its 'stat'. A new
+        snapshot is a new file, see atomic_write(). '''
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _iter_changes(self):
+        ''' Yields the entries of the change log, the last one first. A final line without a
+        terminating newline is the result of an interrupted append and is skipped.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        def decode(line):
+            try:
+                return json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                raise DataError(path=self.changes_path, msg="An entry in change log could not be interpreted.") from e
+
+        try:
+            with open(self.changes_path, mode='rb') as f:
+                position = f.seek(0, os.SEEK_END)
+                rest = b''
+                skip_last = True
+
+                while position > 0:
+                    size = min(position, 65536)
+                    position -= size
+                    f.seek(position)
+
+                    lines = (f.read(size) + rest).split(b'\n')
+                    rest = lines.pop(0) # May continue in the part before this one.
+
+                    if skip_last and lines:
+                        lines.pop() # Empty, unless the last append was interrupted.
+                        skip_last = False
+
+                    for line in reversed(lines):
+                        yield decode(line)
+
+                if rest and not skip_last:
+                    yield decode(rest)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            raise FSError(path=self.changes_path, msg=f"Failed to read change log at: '{self.changes_path}'") from e
+
+    def _journal_changes(self, records):
+        ''' Returns journal records as changes in the form captured by _capture().
+
+        Raises:
+            DataError
+        '''
+
+        fields, groups, tasks = {}, {}, {}
+
+        for record in records:
+            try:
+                op = record[JOURNAL_OP]
+
+                if op == JOURNAL_OP_HEADER:
+                    fields.update((key, self._encode(value)) for key, value in record[JOURNAL_DATA].items())
+                elif op == JOURNAL_OP_GROUP:
+                    groups[record[JOURNAL_ID]] = self._encode(record[JOURNAL_DATA])
+                elif op == JOURNAL_OP_REMOVE_GROUP:
+                    groups[record[JOURNAL_ID]] = None
+                elif op == JOURNAL_OP_TASK:
+                    tasks[record[JOURNAL_ID]] = self._encode(record[JOURNAL_DATA])
+                elif op == JOURNAL_OP_REMOVE_TASK:
+                    tasks[record[JOURNAL_ID]] = None
+                else:
+                    raise DataError(path=self.journal_path, msg=f"Unknown journal operation: '{op}'")
+            except (KeyError, TypeError, AttributeError) as e:
+                raise DataError(path=self.journal_path, msg=f"Malformed journal record: {record}") from e
+
+        return fields, groups, tasks
+
+    def _journal_line(self, op, id=None, encoded_data=None):
+        ''' Returns a journal record as a line of JSON text. 'encoded_data' is expected to be JSON text. '''
+
+        parts = [f"{self._encode(JOURNAL_OP)}: {self._encode(op)}"]
+
+        if id is not None:
+            parts.append(f"{self._encode(JOURNAL_ID)}: {self._encode(id)}")
+        if encoded_data is not None:
+            parts.append(f"{self._encode(JOURNAL_DATA)}: {encoded_data}")
+
+        return '{' + ', '.join(parts) + '}\n'
+
+    def _journal_lines(self, changes):
+        ''' Returns a list of journal records, as lines of JSON text, describing changes captured by _capture(). '''
+
+        fields, groups, tasks = changes
+        lines = []
+
+        if fields:
+            encoded_fields = '{' + ', '.join(f"{self._encode(key)}: {text}" for key, text in fields.items()) + '}'
+            lines.append(self._journal_line(JOURNAL_OP_HEADER, encoded_data=encoded_fields))
+
+        for group_id, text in groups.items():
+            if text is None:
+                lines.append(self._journal_line(JOURNAL_OP_REMOVE_GROUP, group_id))
+            else:
+                lines.append(self._journal_line(JOURNAL_OP_GROUP, group_id, text))
+
+        for task_id, text in tasks.items():
+            if text is None:
+                lines.append(self._journal_line(JOURNAL_OP_REMOVE_TASK, task_id))
+            else:
+                lines.append(self._journal_line(JOURNAL_OP_TASK, task_id, text))
+
+        return lines
+
+    def _load(self):
+        ''' Loads the storage file and replays the journal on top of it, see load().
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        data = {}
+
+        if self.lazy:
+            data = self._load_lazy()
+
+            if data:
+                self._replay_journal(data)
+                groups_task_ids_to(OrderedSet, data)
+
+            return data
+
+        try:
+            with open(self.path, mode='r') as f:
+                data = json.loads(f.read())
+        except FileNotFoundError as e:
+            self._relay(f"Storage file at '{self.path}' not found.")
+        except json.JSONDecodeError as e:
+            raise DataError(path=self.path, msg="The data in storage file could not be interpreted.") from e
+        except PermissionError as e:
+            raise FSError(path=self.path, msg=f"No permission to access storage file. Inspect file permissions for: '{self.path}'") from e
+        except Exception as e:
+            raise FSError(path=self.path, msg="An unexpected error occurred while loading data.") from e
+
+        if data:
+            self._replay_journal(data)
+            groups_task_ids_to(OrderedSet, data)
+
+        return data
+
+    def _load_lazy(self):
+        ''' Maps the storage file, decodes its header and returns it with a LazyDict of its
+        tasks. Returns an empty dict if the storage file does not exist.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        try:
+            self._map()
+        except FileNotFoundError:
+            self._relay(f"Storage file at '{self.path}' not found.")
+            return {}
+
+        data = self._decode_header()
+        data[DATA_TASKS] = LazyDict(self._fetch_task, self._get_task_ids, exists=self._has_task)
+
+        return data
+
+    def _load_written(self):
+        ''' Returns the header values, groups and tasks as last written, read from the storage
+        file (which is mapped if it is not already) and the journal: the JSON text of each header
+        value and group, and the span of each task unless it was changed by the journal, in which
+        case its JSON text. The groups and tasks fields hold None, to record their position.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        if not self._mm:
+            self._map()
+
+        data = self._decode_header()
+        data[DATA_TASKS] = dict(self._spans)
+
+        records, length, _ = self._read_journal()
+        for record in records:
+            self._apply_journal_record(data, record)
+        self._journal_size = length
+
+        fields = {key: None if key in (DATA_GROUPS, DATA_TASKS) else self._encode(value) for key, value in data.items()}
+        groups = {group_id: self._encode(group) for group_id, group in data[DATA_GROUPS].items()}
+        tasks = {task_id: task if isinstance(task, tuple) else self._encode(task) for task_id, task in data[DATA_TASKS].items()}
+
+        return fields, groups, tasks
+
+    def _log_changes(self, payloads, generation):
+        ''' Appends an entry for 'payloads' to the change log, as generation 'generation' + 1 of
+        the store, and returns that generation. If 'payloads' is None the entry records that the
+        entire store changed. Every SHARED_CHANGE_LOG_LENGTH generations, entries older than the
+        last SHARED_CHANGE_LOG_LENGTH are dropped.
+
+        Raises:
+            FSError
+        '''
+
+        generation += 1
+        entry = {"generation": generation}
+
+        if payloads is None:
+            entry["all"] = True
+        else:
+            entry["header"] = any(payload.content[0] for payload in payloads)
+            entry["groups"] = list(dict.fromkeys(group_id for payload in payloads for group_id in payload.content[1]))
+            entry["tasks"] = list(dict.fromkeys(task_id for payload in payloads for task_id in payload.content[2]))
+
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+
+        try:
+            if generation % SHARED_CHANGE_LOG_LENGTH:
+                with open(self.changes_path, mode='ab') as f:
+                    f.write(line)
+                    f.flush()
+                    os.fsync(f.fileno())
+            else:
+                try:
+                    with open(self.changes_path, mode='rb') as f:
+                        lines = [line for line in f if line.endswith(b'\n')]
+                except FileNotFoundError:
+                    lines = []
+
+                atomic_write(self.changes_path, b''.join(lines[-(SHARED_CHANGE_LOG_LENGTH - 1):] + [line]))
+        except OSError as e:
+            raise FSError(path=self.changes_path, msg=f"An unexpected error occured during attempt to append to change log at: '{self.changes_path}'") from e
+
+        return generation
+
+    def _map(self):
+        ''' Maps the storage file and finds the span of the tasks object and of each task, from
+        the index file if it describes the storage file, else by scanning the storage file.
+
+        Raises:
+            DataError
+            FileNotFoundError
+            FSError
+        '''
+
+        self._unmap()
+
+        try:
+            self._file = open(self.path, mode='rb')
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            self._unmap()
+            raise
+        except PermissionError as e:
+            self._unmap()
+            raise FSError(path=self.path, msg=f"No permission to access storage file. Inspect file permissions for: '{self.path}'") from e
+        except (OSError, ValueError) as e: # mmap raises ValueError for an empty file.
+            self._unmap()
+            raise FSError(path=self.path, msg="An unexpected error occurred while loading data.") from e
+
+        self._mapped = self._identity(os.fstat(self._file.fileno()))
+
+        index = self._read_index()
+        if index:
+            self._tasks_span, self._task_ids, self._spans = index
+        else:
+            self._tasks_span, self._task_ids, self._spans = self._scan()
+            self._write_index(self._file, self._tasks_span, self._task_ids, self._spans)
+
+    def _read_changes(self, since):
+        ''' Returns the generation of the store, whether the header changed after generation
+        'since' and the IDs of the groups and tasks that did, read from the end of the change
+        log. The IDs are None if the change log does not reach back to 'since', as then any
+        of them may have changed.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        generation = None
+        header = False
+        group_ids, task_ids = set(), set()
+
+        try:
+            for entry in self._iter_changes():
+                if generation is None:
+                    generation = entry["generation"]
+                    if generation < since: # The change log was replaced.
+                        break
+
+                if entry["generation"] <= since:
+                    return generation, header, group_ids, task_ids
+                if entry.get("all"):
+                    break
+
+                header = header or entry["header"]
+                group_ids.update(entry["groups"])
+                task_ids.update(entry["tasks"])
+                oldest = entry["generation"]
+            else:
+                if generation is None or oldest == since + 1:
+                    return generation or 0, header, group_ids, task_ids
+        except (KeyError, TypeError) as e:
+            raise DataError(path=self.changes_path, msg="Malformed entry in change log.") from e
+
+        return generation, True, None, None
+
+    def _read_generation(self):
+        ''' Returns the generation of the store, as recorded by the last entry in the change log.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        for entry in self._iter_changes():
+            try:
+                return entry["generation"]
+            except (KeyError, TypeError) as e:
+                raise DataError(path=self.changes_path, msg="Malformed entry in change log.") from e
+
+        return 0
+
+    def _read_index(self):
+        ''' Returns the tasks span, task IDs and task spans recorded in the index file, 
+        or None if the index file is missing or does not describe the mapped storage file. '''
+
+        try:
+            with open(self.index_path, mode='r') as f:
+                index = json.loads(f.read())
+
+            stat = os.fstat(self._file.fileno())
+            if index["size"] != stat.st_size or index["mtime_ns"] != stat.st_mtime_ns:
+                return None
+
+            task_ids = index["ids"]
+            offsets = index["offsets"]
+            spans = {task_id: (offsets[2 * i], offsets[2 * i + 1]) for i, task_id in enumerate(task_ids)}
+
+            return tuple(index["tasks"]), task_ids, spans
+        except (OSError, json.JSONDecodeError, KeyError, TypeError, IndexError):
+            return None
+
+    def _read_journal(self, start=0):
+        ''' Returns the records in the journal file (if any) from byte offset 'start' on, in the order
+        they were written, the length in bytes of those records, and whether they are followed by an 
+        incomplete record.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        records = []
+        length = 0
+
+        try:
+            with open(self.journal_path, mode='rb') as f:
+                f.seek(start)
+                for line_n, line in enumerate(f, start=1):
+                    if not line.endswith(b'\n'):
+                        return records, length, True
+
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError as e:
+                        raise DataError(path=self.journal_path, msg=f"Journal record on line {line_n} could not be interpreted.") from e
+
+                    length += len(line)
+        except FileNotFoundError:
+            pass
+        except PermissionError as e:
+            raise FSError(path=self.journal_path, msg=f"No permission to access journal file. Inspect file permissions for: '{self.journal_path}'") from e
+
+        return records, length, False
+
+    def _refresh(self):
+        ''' Brings the data as last written up to date with the store, which other processes may
+        have written to since. If the storage file is the one mapped, only the journal records
+        appended since are read. Otherwise the storage file is mapped again and the data as last
+        written read from it.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        try:
+            current = self._mm and self._identity(os.stat(self.path)) == self._mapped
+        except OSError as e:
+            raise FSError(path=self.path, msg="An unexpected error occurred while loading data.") from e
+
+        if current and self._written is not None:
+            records, length, torn = self._read_journal(start=self._journal_size)
+            self._apply(self._journal_changes(records))
+
+            self._journal_size += length
+            self._journal_length += len(records)
+            if torn:
+                self._truncate_journal(self._journal_size)
+            return
+
+        if not current:
+            with self._lock:
+                self._map()
+
+        self._written = self._load_written()
+
+    def _remove_journal(self):
+        ''' Removes the journal file (if any).
+
+        Raises:
+            FSError
+        '''
+
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            raise FSError(path=self.journal_path, msg="Failed to remove journal file.") from e
+
+    def _replay_journal(self, data):
+        ''' Applies the records in the journal file (if any) to 'data' in the order they were written.
+
+        A trailing record without a terminating newline is the result of an interrupted write. It is
+        discarded and truncated from the journal file so that later records are not appended to it.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        records, valid_length, torn = self._read_journal()
+
+        for record in records:
+            self._apply_journal_record(data, record)
+        self._journal_length = len(records)
+        self._journal_size = valid_length
+
+        if torn:
+            self._truncate_journal(valid_length)
+
+    def _scan(self):
+        ''' Finds the span of the tasks object and of each task in the mapped storage file 
+        by scanning for strings and structural characters, without decoding any values.
+
+        Raises:
+            DataError
+        '''
+
+        depth = 0
+        key = None
+        last_string = None
+        in_tasks = False
+        tasks_span = None
+        task_ids = []
+        spans = {}
+
+        for match in self.TOKEN.finditer(self._mm):
+            c = self._mm[match.start()]
+
+            if c == ord('"'):
+                last_string = match
+            elif c == ord(':'):
+                if depth <= 2: # Keys within a task are of no interest.
+                    key = json.loads(self._mm[last_string.start():last_string.end()])
+            elif c == ord('{') or c == ord('['):
+                depth += 1
+
+                if depth == 2 and key == DATA_TASKS and not tasks_span:
+                    in_tasks = True
+                    tasks_start = match.start()
+                elif depth == 3 and in_tasks:
+                    task_id = key
+                    task_start = match.start()
+            else:
+                if depth == 3 and in_tasks:
+                    task_ids.append(task_id)
+                    spans[task_id] = (task_start, match.end())
+                elif depth == 2 and in_tasks:
+                    in_tasks = False
+                    tasks_span = (tasks_start, match.end())
+
+                depth -= 1
+
+        if not tasks_span:
+            raise DataError(path=self.path, msg=f"No '{DATA_TASKS}' object found in storage file.")
+
+        return tasks_span, task_ids, spans
+
+    def _truncate_journal(self, length):
+        ''' Truncates an incomplete record, the result of an interrupted write, from the end of 
+        the journal file so that later records are not appended to it.
+
+        Raises:
+            FSError
+        '''
+
+        self._relay(f"Discarding incomplete record at the end of journal file '{self.journal_path}'.")
+        try:
+            os.truncate(self.journal_path, length)
+        except OSError as e:
+            raise FSError(path=self.journal_path, msg="Failed to truncate incomplete record from journal file.") from e
+
+    def _unmap(self):
+        if self._mm:
+            self._mm.close()
+            self._mm = None
+        if self._file:
+            self._file.close()
+            self._file = None
+
+        self._tasks_span = None
+        self._task_ids = []
+        self._spans = {}
+        self._mapped = None
+        self._written = None
+
+    def _write_index(self, file, tasks_span, task_ids, spans):
+        ''' Records the spans of storage file 'file' in the index file. Failure to write
+        the index only means the storage file is scanned again on the next load. '''
+
+        stat = os.fstat(file.fileno())
+        offsets = [offset for task_id in task_ids for offset in spans[task_id]]
+        index = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "tasks": tasks_span, "ids": task_ids, "offsets": offsets}
+
+        try:
+            atomic_write(self.index_path, json.dumps(index).encode('utf-8'))
+        except OSError:
+            self._relay(f"Failed to write index file at '{self.index_path}'.")
+
+    def _write_journal(self, lines):
+        ''' Appends journal records 'lines' to the journal file. If the append fails, the journal
+        file is truncated to its previous length so that no partial record is left behind.
+
+        Raises:
+            FSError
+        '''
+
+        length = None
+
+        try:
+            with open(self.journal_path, mode='ab') as f:
+                length = f.tell()
+                f.write(''.join(lines).encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+                self._journal_size = f.tell()
+        except Exception as e:
+            if length is not None:
+                try:
+                    os.truncate(self.journal_path, length)
+                except OSError:
+                    pass
+
+            if isinstance(e, PermissionError):
+                raise FSError(path=self.journal_path, msg=f"No permission to write to journal file. Inspect file permissions for: '{self.journal_path}'") from e
+            raise FSError(path=self.journal_path, msg=f"An unexpected error occured during attempt to append to journal file at: '{self.journal_path}'") from e
+
+    def _write_snapshot(self):
+        ''' Replaces the storage file with the data as last written and removes the journal
+        file, as the snapshot now contains all of its records. The new storage file is mapped
+        in place of the old one.
+
+        Raises:
+            FSError
+        '''
+
+        text, tasks_span, spans = self._encode_data()
+
+        try:
+            atomic_write(self.path, text)
+        except PermissionError as e:
+            raise FSError(path=self.path, msg=f"No permission to write to storage file. Inspect file permissions for: '{self.path}'") from e
+        except Exception as e:
+            raise FSError(path=self.path, msg=f"An unexpected error occured during attempt to write data to storage file at: '{self.path}'") from e
+
+        self._remove_journal()
+        self._journal_size = 0
+
+        try:
+            file = open(self.path, mode='rb')
+            mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise FSError(path=self.path, msg="Failed to map storage file after writing it.") from e
+
+        task_ids = list(spans)
+        self._write_index(file, tasks_span, task_ids, spans)
+
+        # Every task is now unmodified since the storage file was mapped.
+        fields, groups, _ = self._written
+        self._written = (fields, groups, dict(spans))
+
+        with self._lock:
+            old_file, old_mm = self._file, self._mm
+            self._file, self._mm = file, mm
+            self._tasks_span, self._task_ids, self._spans = tasks_span, task_ids, spans
+            self._mapped = self._identity(os.fstat(file.fileno()))
+
+        if old_mm:
+            old_mm.close()
+        if old_file:
+            old_file.close()
+
+    def close(self):
+        self._unmap()
+
+        with self._file_lock:
+            if self._lock_file and not self._lock_depth:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def commit(self, payloads):
+        ''' Applies 'payloads' to the data as last written, then writes a new snapshot if any of
+        them rewrites the store, or else appends all of their journal records in a single write.
+
+        If the store is shared, the data as last written is first brought up to date with the
+        writes of other processes, and the payloads are recorded in the change log. Changes made
+        by other processes are left for fetch_changes() to return.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        if not self.shared:
+            self._commit(payloads)
+            return
+
+        with self._hold(exclusive=True):
+            generation = self._read_generation()
+            if generation != self._generation:
+                self._refresh()
+
+            new_generation = self._log_changes(payloads, generation)
+            self._commit(payloads)
+
+            if generation == self._generation:
+                self._generation = new_generation
+
+    def create(self, data):
+        ''' Creates (or overwrites) the storage file so that it contains 'data'.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        self._unmap()
+
+        with self._hold(exclusive=True):
+            try:
+                atomic_write(self.path, json.dumps(data, ensure_ascii=False).encode('utf-8'))
+            except FileNotFoundError as e:
+                raise FSError(path=self.path, msg="A file system error occured during creation of storage file.") from e
+            except PermissionError as e:
+                raise FSError(path=self.path, msg=f"No permission to create storage file. Inspect file permissions for: '{self.path}'") from e
+
+            self._remove_journal() # Records in a leftover journal belong to the previous storage file.
+            self._journal_length = 0
+            self._journal_size = 0
+
+            if self.shared:
+                self._generation = self._log_changes(None, self._read_generation())
+
+        with open(self.path, "r") as f:
+            try:
+                written = json.loads(f.read())
+            except json.JSONDecodeError as e:
+                raise DataError(path=self.path,
+                                msg="An error occured while creating storage file.") from e
+
+            if written != data:
+                raise DataError(path=self.path, msg=f"Expected: {data}\nActual: {written}")
+
+    def fetch_changes(self):
+        ''' Returns the header values, groups and tasks changed by other processes since this
+        backend last loaded, wrote or fetched changes from the store, in the layout of Master.data
+        with None for removed groups and tasks, and whether the entire store is returned instead,
+        as the changes are older than the change log. Returns None if there are no changes or
+        the store is not shared.
+
+        Should be called within locked(), so that the store does not change again before the
+        changes are written back.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        if not self.shared:
+            return None
+
+        with self._hold(exclusive=True):
+            generation, header, group_ids, task_ids = self._read_changes(self._generation)
+            if generation == self._generation:
+                return None
+
+            self._refresh()
+            self._generation = generation
+
+            return self._decode_changes(header, group_ids, task_ids)
+
+    def load(self):
+        ''' Loads the storage file, replays the journal on top of it and returns the result.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        self._unmap()
+
+        with self._hold(exclusive=False):
+            if self.shared:
+                self._generation = self._read_generation()
+
+            return self._load()
+
+    def locked(self):
+        if not self.shared:
+            return super().locked()
+
+        return self._hold(exclusive=True)
+
+    def prepare(self, data, tasks, groups, header, compact=False):
+        ''' Returns a payload of the JSON text of modified data. Committing it appends journal
+        records, or writes a new snapshot if journaling is disabled, the journal holds
+        JOURNAL_COMPACT_THRESHOLD records or 'compact' is True. '''
+
+        if compact and not (self._journal_length or tasks or groups or header):
+            return None
+
+        changes = self._capture(data, tasks, groups, header)
+
+        if compact or not self.journal or self._journal_length >= JOURNAL_COMPACT_THRESHOLD:
+            self._journal_length = 0
+            return Payload(changes, rewrites=True)
+
+        fields, groups, tasks = changes
+        records = bool(fields) + len(groups) + len(tasks)
+        if not records:
+            return None
+
+        self._journal_length += records
+        return Payload(changes)
+
+class SQLiteStorage(Storage):
+    ''' Stores Master.data in an SQLite database.
+
+    Tasks, groups, ordered group membership and ordered parent/subtask edges are kept in separate
+    tables. Opening the store only reads the header, task and group dictionaries are fetched when
+    first accessed and every write is a single transaction covering only modified data.
+
+    The connection may be used from the thread committing writes and the thread fetching tasks 
+    and groups, so every use of it holds a lock.
+    '''
+
+    lazy = True
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS header (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS groups (
+            id TEXT PRIMARY KEY,
+            title TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS group_tasks (
+            group_id TEXT NOT NULL,
+            task_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            PRIMARY KEY (group_id, task_id)
+        );
+        CREATE INDEX IF NOT EXISTS group_tasks_position ON group_tasks (group_id, position);
+        CREATE TABLE IF NOT EXISTS tasks (
+            id TEXT PRIMARY KEY,
+            comments TEXT NOT NULL,
+            description TEXT NOT NULL,
+            files TEXT NOT NULL,
+            links TEXT NOT NULL,
+            completed INTEGER NOT NULL,
+            title TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS edges (
+            parent_id TEXT NOT NULL,
+            subtask_id TEXT NOT NULL,
+            subtask_position INTEGER,
+            parent_position INTEGER,
+            PRIMARY KEY (parent_id, subtask_id)
+        );
+        CREATE INDEX IF NOT EXISTS edges_subtask ON edges (subtask_id);
+    '''
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._connection = None
+        self._lock = threading.RLock()
+
+    def _connect(self):
+        ''' Opens the database connection if not already open.
+
+        Raises:
+            FSError
+        '''
+
+        if self._connection:
+            return
+
+        try:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.executescript(self.SCHEMA)
+        except sqlite3.Error as e:
+            raise FSError(path=self.path, msg=f"Failed to open database: {e}") from e
+
+    def _delete_task(self, task_id):
+        self._connection.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+        self._connection.execute("DELETE FROM edges WHERE parent_id = ? OR subtask_id = ?", (task_id, task_id))
+
+    def _fetch_group(self, group_id):
+        with self._lock:
+            row = self._connection.execute("SELECT title FROM groups WHERE id = ?", (group_id,)).fetchone()
+            if row is None:
+                return None
+
+            task_ids = self._connection.execute("SELECT task_id FROM group_tasks WHERE group_id = ? ORDER BY position", (group_id,)).fetchall()
+
+        return {GROUP_TASKS: OrderedSet(task_id for task_id, in task_ids), GROUP_TITLE: row[0]}
+
+    def _fetch_task(self, task_id):
+        with self._lock:
+            row = self._connection.execute("SELECT comments, description, files, links, completed, title FROM tasks WHERE id = ?", (task_id,)).fetchone()
+            if row is None:
+                return None
+
+            subtasks = self._connection.execute("SELECT subtask_id FROM edges WHERE parent_id = ? AND subtask_position IS NOT NULL ORDER BY subtask_position", (task_id,)).fetchall()
+            parents = self._connection.execute("SELECT parent_id FROM edges WHERE subtask_id = ? AND parent_position IS NOT NULL ORDER BY parent_position", (task_id,)).fetchall()
+
+        comments, description, files, links, completed, title = row
+
+        return {
+            TASK_COMMENTS: json.loads(comments),
+            TASK_DESCRIPTION: description,
+            TASK_FILES: json.loads(files),
+            TASK_LINKS: json.loads(links),
+            TASK_STATUS: bool(completed),
+            TASK_SUBTASKS: [subtask_id for subtask_id, in subtasks],
+            TASK_PARENTS: [parent_id for parent_id, in parents],
+            TASK_TITLE: title
+        }
+
+    def _has_task(self, task_id):
+        with self._lock:
+            return self._connection.execute("SELECT 1 FROM tasks WHERE id = ?", (task_id,)).fetchone() is not None
+
+    def _group_ids(self):
+        with self._lock:
+            return [group_id for group_id, in self._connection.execute("SELECT id FROM groups ORDER BY rowid")]
+
+    def _task_ids(self):
+        with self._lock:
+            return [task_id for task_id, in self._connection.execute("SELECT id FROM tasks ORDER BY rowid")]
+
+    def _task_row(self, taskd):
+        ''' Returns the column values of task dict 'taskd', followed by its subtask and parent IDs. '''
+        return (json.dumps(taskd[TASK_COMMENTS], ensure_ascii=False), taskd[TASK_DESCRIPTION], json.dumps(taskd[TASK_FILES], ensure_ascii=False),
+                json.dumps(taskd[TASK_LINKS], ensure_ascii=False), int(taskd[TASK_STATUS]), taskd[TASK_TITLE],
+                list(taskd[TASK_SUBTASKS]), list(taskd[TASK_PARENTS]))
+
+    def _write_group(self, group_id, title, task_ids):
+        self._connection.execute("INSERT INTO groups (id, title) VALUES (?, ?) ON CONFLICT (id) DO UPDATE SET title = excluded.title",
+                                 (group_id, title))
+        self._connection.execute("DELETE FROM group_tasks WHERE group_id = ?", (group_id,))
+        self._connection.executemany("INSERT INTO group_tasks (group_id, task_id, position) VALUES (?, ?, ?)",
+                                     ((group_id, task_id, i) for i, task_id in enumerate(task_ids)))
+
+    def _write_task(self, task_id, row):
+        c = self._connection
+        *columns, subtasks, parents = row
+
+        c.execute('''INSERT INTO tasks (id, comments, description, files, links, completed, title) VALUES (?, ?, ?, ?, ?, ?, ?)
+                     ON CONFLICT (id) DO UPDATE SET comments = excluded.comments, description = excluded.description, files = excluded.files,
+                     links = excluded.links, completed = excluded.completed, title = excluded.title''',
+                  (task_id, *columns))
+
+        # An edge is kept for as long as either end lists the other.
+        c.execute("UPDATE edges SET subtask_position = NULL WHERE parent_id = ?", (task_id,))
+        c.executemany('''INSERT INTO edges (parent_id, subtask_id, subtask_position) VALUES (?, ?, ?)
+                         ON CONFLICT (parent_id, subtask_id) DO UPDATE SET subtask_position = excluded.subtask_position''',
+                      ((task_id, subtask_id, i) for i, subtask_id in enumerate(subtasks)))
+        c.execute("UPDATE edges SET parent_position = NULL WHERE subtask_id = ?", (task_id,))
+        c.executemany('''INSERT INTO edges (parent_id, subtask_id, parent_position) VALUES (?, ?, ?)
+                         ON CONFLICT (parent_id, subtask_id) DO UPDATE SET parent_position = excluded.parent_position''',
+                      ((parent_id, task_id, i) for i, parent_id in enumerate(parents)))
+        c.execute("DELETE FROM edges WHERE (parent_id = ? OR subtask_id = ?) AND subtask_position IS NULL AND parent_position IS NULL", (task_id, task_id))
+
+    def close(self):
+        with self._lock:
+            if self._connection:
+                self._connection.close()
+                self._connection = None
+
+    def commit(self, payloads):
+        ''' Writes 'payloads' in a single transaction, then vacuums the database if any of them compacts.
+
+        Raises:
+            FSError
+        '''
+
+        with self._lock:
+            self._connect()
+
+            try:
+                with self._connection:
+                    for header_rows, group_rows, task_rows, _ in (payload.content for payload in payloads):
+                        self._connection.executemany("INSERT INTO header (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                                                     header_rows)
+
+                        for group_id, group in group_rows:
+                            if group:
+                                self._write_group(group_id, *group)
+                            else:
+                                self._connection.execute("DELETE FROM groups WHERE id = ?", (group_id,))
+                                self._connection.execute("DELETE FROM group_tasks WHERE group_id = ?", (group_id,))
+
+                        for task_id, row in task_rows:
+                            if row:
+                                self._write_task(task_id, row)
+                            else:
+                                self._delete_task(task_id)
+            except sqlite3.Error as e:
+                raise FSError(path=self.path, msg=f"An error occured during attempt to write data to database: {e}") from e
+
+            if any(payload.content[3] for payload in payloads):
+                try:
+                    self._connection.execute("VACUUM")
+                except sqlite3.Error as e:
+                    raise FSError(path=self.path, msg=f"Failed to vacuum database: {e}") from e
+
+    def create(self, data):
+        ''' Creates (or overwrites) the database so that it contains 'data'.
+
+        Raises:
+            FSError
+        '''
+
+        self.close()
+
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            raise FSError(path=self.path, msg="Failed to remove existing database.") from e
+
+        self.write(data, data[DATA_TASKS].keys(), data[DATA_GROUPS].keys(), True)
+
+    def load(self):
+        ''' Opens the database and returns its data. Only the header is read, tasks and groups
+        are fetched on first access.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        if not os.path.exists(self.path):
+            self._relay(f"Storage file at '{self.path}' not found.")
+            return {}
+
+        with self._lock:
+            self._connect()
+
+            try:
+                rows = self._connection.execute("SELECT key, value FROM header ORDER BY rowid").fetchall()
+                data = {key: json.loads(value) for key, value in rows}
+            except (sqlite3.Error, json.JSONDecodeError) as e:
+                raise DataError(path=self.path, msg="The header in database could not be interpreted.") from e
+
+        if not data:
+            return {}
+
+        data[DATA_GROUPS] = LazyDict(self._fetch_group, self._group_ids)
+        data[DATA_TASKS] = LazyDict(self._fetch_task, self._task_ids, exists=self._has_task)
+
+        return data
+
+    def prepare(self, data, tasks, groups, header, compact=False):
+        ''' Returns a payload of the rows of modified data. '''
+
+        header_rows = []
+        if header:
+            header_rows = [(key, json.dumps(value, ensure_ascii=False)) for key, value in data.items() if key not in (DATA_GROUPS, DATA_TASKS)]
+
+        group_rows = []
+        for group_id in groups:
+            group = data[DATA_GROUPS].get(group_id)
+            group_rows.append((group_id, group and (group[GROUP_TITLE], list(group[GROUP_TASKS]))))
+
+        task_rows = []
+        for task_id in tasks:
+            task = data[DATA_TASKS].get(task_id)
+            task_rows.append((task_id, task and self._task_row(task_dict(task))))
+
+        if not (header_rows or group_rows or task_rows or compact):
+            return None
+
+        return Payload((header_rows, group_rows, task_rows, compact))
+
+class ShardedStorage(Storage):
+    ''' Stores Master.data in a directory of JSON files: a manifest holding the header values,
+    the groups and the names of the shard files, and one shard file per group holding the tasks
+    reachable from the group's task IDs via subtasks. Tasks reachable from no group are kept in
+    the UNGROUPED shard, and a task reachable from several groups in the first one's shard.
+
+    A shard is read when one of its tasks is first accessed, or when preload() is called for its
+    group, and only shards holding modified tasks are rewritten. A new task is placed in the shard
+    of its first parent, else of the first group holding it. Tasks keep their shard when moved
+    between groups until compact() redistributes every task.
+
+    Each task is on a line of its own in a shard file, so that a shard can be read without
+    decoding its tasks. Each task is decoded when first accessed.
+    '''
+
+    lazy = True
+
+    MANIFEST = "manifest.json"
+    MANIFEST_SHARDS = "shards"
+    UNGROUPED = "ungrouped"
+
+    # A task in a shard file: its quoted ID and its JSON text, with a trailing comma unless last.
+    LINE = re.compile(rb'("(?:[^"\\]|\\.)*"): (.*?),?')
+
+    def __init__(self, path):
+        super().__init__(path)
+
+        self._lock = threading.Lock() # Held while accessing shards, as commit() may run on another thread.
+        self._shard_names = []
+        self._shards = {} # Shard name -> {task ID: JSON text} of each shard read, as last written.
+        self._task_shards = {} # Task ID -> shard name, of tasks accessed or placed by prepare().
+
+        # Header values and groups as last written. Only accessed by commit().
+        self._fields = {}
+        self._groups = {}
+
+    def _encode(self, obj):
+        return json.dumps(obj, ensure_ascii=False)
+
+    def _encode_manifest(self):
+        ''' Returns the header values, groups and shard names as last written as the UTF-8 JSON text of the manifest. '''
+
+        parts = []
+        for key, text in self._fields.items():
+            if key == DATA_GROUPS:
+                text = '{' + ', '.join(f"{self._encode(group_id)}: {group}" for group_id, group in self._groups.items()) + '}'
+            parts.append(f"{self._encode(key)}: {text}")
+        parts.append(f"{self._encode(self.MANIFEST_SHARDS)}: {self._encode(self._shard_names)}")
+
+        return ('{' + ', '.join(parts) + '}').encode('utf-8')
+
+    def _encode_shard(self, tasks):
+        ''' Returns dict 'tasks' of task IDs and their JSON text as the UTF-8 JSON text of a shard file. '''
+
+        if not tasks:
+            return b'{}\n'
+
+        return b'{\n' + b',\n'.join(self._encode(task_id).encode('utf-8') + b': ' + text for task_id, text in tasks.items()) + b'\n}\n'
+
+    def _fetch_task(self, task_id):
+        ''' Decodes the task dict with ID 'task_id'. Returns None if there is no such task.
+
+        Raises:
+            DataError
+        '''
+
+        text = self._find(task_id)
+        if text is None:
+            return None
+
+        try:
+            return json.loads(text)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise DataError(path=self._shard_path(self._task_shards[task_id]), task_id=task_id, msg="The data of task in shard file could not be interpreted.") from e
+
+    def _find(self, task_id):
+        ''' Returns the JSON text of task with ID 'task_id' as last written, reading shards not
+        yet read until it is found. Returns None if there is no such task.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        with self._lock:
+            names = [name for name in self._shard_names if name in self._shards]
+            names += [name for name in self._shard_names if name not in self._shards]
+
+            for name in names:
+                text = self._shard(name).get(task_id)
+                if text is not None:
+                    self._task_shards[task_id] = name
+                    return text
+
+        return None
+
+    def _get_task_ids(self):
+        self.preload(None)
+
+        with self._lock:
+            return [task_id for name in self._shard_names for task_id in self._shards[name]]
+
+    def _group_shard(self, group_id):
+        return f"group-{group_id}"
+
+    def _has_task(self, task_id):
+        return self._find(task_id) is not None
+
+    def _layout(self, data, subtasks):
+        ''' Returns a dict of the shard name of every task in 'data'. 'subtasks' is called with a
+        task ID and returns its subtask IDs. '''
+
+        shards = {}
+
+        for group_id, group in data[DATA_GROUPS].items():
+            name = self._group_shard(group_id)
+            stack = list(reversed(group[GROUP_TASKS]))
+
+            while stack:
+                task_id = stack.pop()
+                if task_id in shards or task_id not in data[DATA_TASKS]:
+                    continue
+
+                shards[task_id] = name
+                stack.extend(reversed(subtasks(task_id)))
+
+        for task_id in data[DATA_TASKS]:
+            shards.setdefault(task_id, self.UNGROUPED)
+
+        return shards
+
+    def _place(self, data, task_id, visited=None):
+        ''' Returns the shard name of task with ID 'task_id', placing it if it is new. '''
+
+        name = self._task_shards.get(task_id)
+        if name:
+            return name
+
+        if visited is None:
+            visited = set()
+        visited.add(task_id)
+
+        name = None
+        for parent_id in task_dict(data[DATA_TASKS][task_id])[TASK_PARENTS]:
+            if parent_id not in visited and parent_id in data[DATA_TASKS]:
+                name = self._place(data, parent_id, visited)
+                break
+
+        if not name:
+            name = next((self._group_shard(group_id) for group_id, group in data[DATA_GROUPS].items() if task_id in group[GROUP_TASKS]), self.UNGROUPED)
+
+        self._task_shards[task_id] = name
+        return name
+
+    def _read_shard(self, name):
+        ''' Reads shard 'name' and returns a dict of its task IDs and their JSON text. A missing
+        shard file holds no tasks.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        path = self._shard_path(name)
+
+        try:
+            with open(path, mode='rb') as f:
+                lines = f.read().split(b'\n')
+        except FileNotFoundError:
+            return {}
+        except PermissionError as e:
+            raise FSError(path=path, msg=f"No permission to access shard file. Inspect file permissions for: '{path}'") from e
+        except OSError as e:
+            raise FSError(path=path, msg="An unexpected error occurred while loading shard file.") from e
+
+        tasks = {}
+        try:
+            if lines[-2:] != [b'}', b''] and lines != [b'{}', b'']:
+                raise ValueError(path)
+
+            for line in lines[1:-2]: # Between the opening and closing brace.
+                key, _, text = line.partition(b'": ')
+                if b'\\' in key: # The key may contain an escaped '": '.
+                    key, text = self.LINE.fullmatch(line).groups()
+                    task_id = json.loads(key)
+                elif key.startswith(b'"') and text:
+                    task_id = key[1:].decode('utf-8')
+                else:
+                    raise ValueError(line)
+
+                tasks[task_id] = text[:-1] if text.endswith(b',') else text
+        except (AttributeError, ValueError): # JSONDecodeError and UnicodeDecodeError are ValueErrors.
+            # Not written by _encode_shard(), decode it in full.
+            try:
+                tasks = {task_id: self._encode(taskd).encode('utf-8') for task_id, taskd in json.loads(b'\n'.join(lines)).items()}
+            except (json.JSONDecodeError, UnicodeDecodeError, AttributeError) as e:
+                raise DataError(path=path, msg="The data in shard file could not be interpreted.") from e
+
+        return tasks
+
+    def _redistribute(self, data):
+        ''' Returns a dict of shard names and their tasks, with every task of 'data' in the shard
+        given by _layout(). Reads every shard. '''
+
+        self.preload(None)
+
+        def taskd(task_id):
+            if data[DATA_TASKS].is_loaded(task_id):
+                return task_dict(data[DATA_TASKS][task_id])
+            return json.loads(self._find(task_id))
+
+        layout = self._layout(data, lambda task_id: taskd(task_id)[TASK_SUBTASKS])
+
+        shards = {self._group_shard(group_id): {} for group_id in data[DATA_GROUPS]}
+        shards[self.UNGROUPED] = {}
+        for task_id, name in layout.items():
+            if data[DATA_TASKS].is_loaded(task_id):
+                shards[name][task_id] = self._encode(task_dict(data[DATA_TASKS][task_id])).encode('utf-8')
+            else: # Unmodified, as it was never accessed.
+                shards[name][task_id] = self._find(task_id)
+
+        self._task_shards = dict(layout)
+        return shards
+
+    def _shard(self, name):
+        ''' Returns the tasks of shard 'name', reading it if not yet read. Expects the lock to be held.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        tasks = self._shards.get(name)
+        if tasks is None:
+            tasks = self._shards[name] = self._read_shard(name)
+
+        return tasks
+
+    def _shard_path(self, name):
+        return os.path.join(self.path, name + ".json")
+
+    def _write_files(self, shards, manifest, removed):
+        ''' Replaces the files of 'shards' (a dict of shard names and the tasks to write), then the
+        manifest if 'manifest' is True, then removes the files of shards named in 'removed'.
+
+        Raises:
+            FSError
+        '''
+
+        paths = [(self._shard_path(name), self._encode_shard(tasks)) for name, tasks in shards.items()]
+        if manifest:
+            paths.append((os.path.join(self.path, self.MANIFEST), self._encode_manifest()))
+
+        for path, text in paths:
+            try:
+                atomic_write(path, text)
+            except PermissionError as e:
+                raise FSError(path=path, msg=f"No permission to write to storage file. Inspect file permissions for: '{path}'") from e
+            except Exception as e:
+                raise FSError(path=path, msg=f"An unexpected error occured during attempt to write data to storage file at: '{path}'") from e
+
+        for name in removed:
+            try:
+                os.remove(self._shard_path(name))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                raise FSError(path=self._shard_path(name), msg="Failed to remove shard file.") from e
+
+    def commit(self, payloads):
+        ''' Applies 'payloads' to the shards, then rewrites each modified shard and, if the header
+        values, groups or shard names changed, the manifest.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        modified = set()
+        manifest = False
+        removed = set()
+
+        with self._lock:
+            for fields, groups, tasks, layout in (payload.content for payload in payloads):
+                if layout is not None:
+                    removed.update(name for name in self._shard_names if name not in layout)
+                    self._shards = layout
+                    self._shard_names = list(layout)
+                    modified.update(layout)
+                    manifest = True
+
+                self._fields.update(fields)
+                for group_id, text in groups.items():
+                    if text is None:
+                        self._groups.pop(group_id, None)
+                    else:
+                        self._groups[group_id] = text
+                manifest = manifest or bool(fields or groups)
+
+                for task_id, (name, text) in tasks.items():
+                    if name not in self._shard_names:
+                        self._shard_names.append(name)
+                        manifest = True
+
+                    if text is None:
+                        self._shard(name).pop(task_id, None)
+                    else:
+                        self._shard(name)[task_id] = text
+                    modified.add(name)
+
+            shards = {name: dict(self._shards[name]) for name in modified}
+
+        self._write_files(shards, manifest, removed - modified)
+
+    def create(self, data):
+        ''' Creates (or overwrites) the storage directory so that it contains 'data'.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        try:
+            os.makedirs(self.path, exist_ok=True)
+        except OSError as e:
+            raise FSError(path=self.path, msg="A file system error occured during creation of storage directory.") from e
+
+        layout = self._layout(data, lambda task_id: task_dict(data[DATA_TASKS][task_id])[TASK_SUBTASKS])
+        shards = {self._group_shard(group_id): {} for group_id in data[DATA_GROUPS]}
+        shards[self.UNGROUPED] = {}
+        for task_id, name in layout.items():
+            shards[name][task_id] = self._encode(task_dict(data[DATA_TASKS][task_id])).encode('utf-8')
+
+        # Shard files left by a previous store.
+        try:
+            removed = [file[:-len(".json")] for file in os.listdir(self.path)
+                       if file.endswith(".json") and file != self.MANIFEST and file[:-len(".json")] not in shards]
+        except OSError as e:
+            raise FSError(path=self.path, msg="Failed to list storage directory.") from e
+
+        with self._lock:
+            self._fields = {key: None if key == DATA_GROUPS else self._encode(value) for key, value in data.items() if key != DATA_TASKS}
+            self._groups = {group_id: self._encode({GROUP_TASKS: list(group[GROUP_TASKS]), GROUP_TITLE: group[GROUP_TITLE]})
+                            for group_id, group in data[DATA_GROUPS].items()}
+            self._shards = shards
+            self._shard_names = list(shards)
+            self._task_shards = dict(layout)
+
+            self._write_files(shards, True, removed)
+
+    def load(self):
+        ''' Reads the manifest and returns its data. Tasks are read from their shard on first access.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        path = os.path.join(self.path, self.MANIFEST)
+
+        try:
+            with open(path, mode='r') as f:
+                data = json.loads(f.read())
+        except FileNotFoundError:
+            self._relay(f"Storage file at '{path}' not found.")
+            return {}
+        except json.JSONDecodeError as e:
+            raise DataError(path=path, msg="The data in manifest could not be interpreted.") from e
+        except PermissionError as e:
+            raise FSError(path=path, msg=f"No permission to access manifest. Inspect file permissions for: '{path}'") from e
+        except Exception as e:
+            raise FSError(path=path, msg="An unexpected error occurred while loading data.") from e
+
+        with self._lock:
+            self._shard_names = data.pop(self.MANIFEST_SHARDS, [])
+            self._shards = {}
+            self._task_shards = {}
+
+            self._fields = {key: None if key == DATA_GROUPS else self._encode(value) for key, value in data.items()}
+            self._groups = {group_id: self._encode(group) for group_id, group in data[DATA_GROUPS].items()}
+
+        data[DATA_TASKS] = LazyDict(self._fetch_task, self._get_task_ids, exists=self._has_task)
+        groups_task_ids_to(OrderedSet, data)
+
+        return data
+
+    def prepare(self, data, tasks, groups, header, compact=False):
+        ''' Returns a payload of the JSON text and shard of modified tasks and the JSON text of
+        modified groups and (if 'header' is True) header values. If 'compact' is True, every
+        task is read and the payload redistributes them over the shards. '''
+
+        fields = {}
+        if header or compact:
+            fields = {key: self._encode(value) for key, value in data.items() if key not in (DATA_GROUPS, DATA_TASKS)}
+
+        captured_groups = {}
+        for group_id in (itertools.chain(groups, data[DATA_GROUPS].keys()) if compact else groups):
+            group = data[DATA_GROUPS].get(group_id)
+            captured_groups[group_id] = group and self._encode({GROUP_TASKS: list(group[GROUP_TASKS]), GROUP_TITLE: group[GROUP_TITLE]})
+
+        if compact:
+            return Payload((fields, captured_groups, {}, self._redistribute(data)), rewrites=True)
+
+        captured_tasks = {}
+        for task_id in tasks:
+            task = data[DATA_TASKS].get(task_id)
+            if task is None:
+                if task_id not in self._task_shards and self._find(task_id) is None:
+                    continue # Removed before it was ever written.
+                captured_tasks[task_id] = (self._task_shards.pop(task_id), None)
+            else:
+                captured_tasks[task_id] = (self._place(data, task_id), self._encode(task_dict(task)).encode('utf-8'))
+
+        if not (fields or captured_groups or captured_tasks):
+            return None
+
+        return Payload((fields, captured_groups, captured_tasks, None))
+
+    def preload(self, group_ids):
+        ''' Reads the shards of the groups with IDs in 'group_ids' (every shard if None) that have
+        not been read yet, in parallel.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        with self._lock:
+            names = self._shard_names if group_ids is None else [self._group_shard(group_id) for group_id in group_ids]
+            names = [name for name in names if name in self._shard_names and name not in self._shards]
+
+        if not names:
+            return
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(names), SHARD_LOAD_WORKERS)) as executor:
+            shards = dict(zip(names, executor.map(self._read_shard, names)))
+
+        with self._lock:
+            for name, tasks in shards.items():
+                self._shards.setdefault(name, tasks) # A shard read by commit() meanwhile is more recent.
+
+class TaskColumns:
+    ''' The tasks of a binary storage file, column by column as stored (see BinaryStorage).
+
+    'strings' is the string table, 'ids' and 'statuses' hold the string table index of the ID and
+    the status of each task, 'titles' and 'descriptions' their text. 'lists' maps each list key of
+    a task dict to the number of values of each task and the values of every task in order: text
+    for comments, string table indexes for the rest. Columns are never modified.
+    '''
+
+    LISTS = (TASK_COMMENTS, TASK_FILES, TASK_LINKS, TASK_SUBTASKS, TASK_PARENTS)
+
+    def __init__(self, strings, ids, statuses, titles, descriptions, lists):
+        self.strings = strings
+        self.ids = ids
+        self.statuses = statuses
+        self.titles = titles
+        self.descriptions = descriptions
+        self.lists = lists
+
+        self.rows = {strings[ref]: row for row, ref in enumerate(ids)} # Task ID -> row.
+
+        # Key -> position of the first value of each task in the values of 'lists', and the end of the last.
+        self.starts = {key: list(itertools.accumulate(counts, initial=0)) for key, (counts, _) in lists.items()}
+
+        if len(self.rows) != len(ids) or not len(ids) == len(statuses) == len(titles) == len(descriptions):
+            raise ValueError("Task columns differ in length.")
+
+        for key, (counts, values) in lists.items():
+            if len(counts) != len(ids) or self.starts[key][-1] != len(values):
+                raise ValueError(f"Column '{key}' does not match the tasks.")
+
+    def task_dict(self, task_id):
+        ''' Returns a new task dict of task with ID 'task_id', or None if there is no such task. '''
+
+        row = self.rows.get(task_id)
+        if row is None:
+            return None
+
+        lists = {}
+        for key, (_, values) in self.lists.items():
+            start, end = self.starts[key][row], self.starts[key][row + 1]
+            lists[key] = values[start:end] if key == TASK_COMMENTS else [self.strings[ref] for ref in values[start:end]]
+
+        return {
+            TASK_COMMENTS: lists[TASK_COMMENTS],
+            TASK_DESCRIPTION: self.descriptions[row],
+            TASK_FILES: lists[TASK_FILES],
+            TASK_LINKS: lists[TASK_LINKS],
+            TASK_STATUS: bool(self.statuses[row]),
+            TASK_SUBTASKS: lists[TASK_SUBTASKS],
+            TASK_PARENTS: lists[TASK_PARENTS],
+            TASK_TITLE: self.titles[row]
+        }
+
+class BinaryStorage(Storage):
+    ''' Stores Master.data in a compact binary file.
+
+    Tasks are stored column by column rather than as a dictionary each. Task and group IDs, file
+    paths and links are interned in a string table and referred to by their index in it; titles,
+    descriptions and comments are stored as text. Every column of integers (string table indexes,
+    lengths and counts) is an array of the narrowest unsigned type that fits its largest value,
+    and every column of text is an array of the length of each text followed by their UTF-8
+    encoding. Header values are stored as JSON. File layout, little-endian:
+
+        MAGIC, VERSION (uint16)
+        header JSON             : byte length (uint32), UTF-8 JSON text
+        string table            : text column
+        groups                  : integer column of IDs, text column of titles,
+                                  integer column of task counts, integer column of task IDs
+        tasks                   : integer column of IDs, integer column of statuses,
+                                  text column of titles, text column of descriptions,
+                                  integer column of comment counts, text column of comments,
+                                  and for files, links, subtasks and parents (in that order)
+                                  an integer column of counts and an integer column of values
+
+    An integer column is its item size (uint8), item count (uint32) and items. A text column is
+    an integer column of the length in characters of each text, the byte length of their UTF-8
+    encoding (uint32) and the encoding.
+
+    load() only decodes the columns, task dicts are built from them on first access (see
+    LazyDict). Every write rewrites the file, but tasks not modified since it was loaded are
+    copied column by column rather than encoded again, and their strings are kept in the string
+    table even once no longer used until compact() rebuilds it.
+    '''
+
+    lazy = True
+
+    MAGIC = b'TASKBIN\x00'
+    VERSION = 1
+
+    # Item size -> typecode of the array holding unsigned integers of that size.
+    TYPECODES = {array.array(typecode).itemsize: typecode for typecode in 'LIHB'}
+
+    def __init__(self, path):
+        super().__init__(path)
+
+        self._columns = None # Tasks of the storage file when loaded.
+
+        # Header values, groups and tasks as last written: TaskColumns of the storage file when
+        # read, and the task dict of every task modified since (or None if removed). Only
+        # accessed by commit().
+        self._written = None
+
+    def _decode_data(self, buffer):
+        ''' Returns the header values and groups encoded in bytes 'buffer' in the layout of
+        Master.data, with task IDs of each group in a list, and its tasks as TaskColumns.
+
+        Raises:
+            DataError
+        '''
+
+        try:
+            if buffer[:len(self.MAGIC)] != self.MAGIC:
+                raise ValueError("Not a binary storage file.")
+
+            version, size = struct.unpack_from('<HI', buffer, len(self.MAGIC))
+            if version != self.VERSION:
+                raise ValueError(f"Unsupported version: {version}")
+
+            pos = len(self.MAGIC) + 6
+            data = json.loads(buffer[pos:pos + size])
+            pos += size
+
+            strings, pos = self._unpack_texts(buffer, pos)
+
+            columns = []
+            for unpack in (self._unpack_ints, self._unpack_texts, self._unpack_ints, self._unpack_ints,
+                           self._unpack_ints, self._unpack_ints, self._unpack_texts, self._unpack_texts,
+                           self._unpack_ints, self._unpack_texts, *[self._unpack_ints] * 8):
+                column, pos = unpack(buffer, pos)
+                columns.append(column)
+
+            if pos != len(buffer):
+                raise ValueError("Unexpected data at end of file.")
+
+            group_ids, group_titles, group_task_counts, group_task_ids, ids, statuses, titles, descriptions, *lists = columns
+
+            group_tasks = [strings[ref] for ref in group_task_ids]
+            starts = list(itertools.accumulate(group_task_counts, initial=0))
+            if starts[-1] != len(group_tasks):
+                raise ValueError("Group task counts do not match group task IDs.")
+
+            data[DATA_GROUPS] = {strings[ref]: {GROUP_TASKS: group_tasks[start:end], GROUP_TITLE: title}
+                                 for ref, title, start, end in zip(group_ids, group_titles, starts[:-1], starts[1:], strict=True)}
+
+            columns = TaskColumns(strings, ids, statuses, titles, descriptions,
+                                  {key: (lists[2 * i], lists[2 * i + 1]) for i, key in enumerate(TaskColumns.LISTS)})
+        except (struct.error, IndexError, KeyError, TypeError, ValueError) as e: # JSONDecodeError and UnicodeDecodeError are ValueErrors.
+            raise DataError(path=self.path, msg=f"The data in storage file could not be interpreted: {e}") from e
+
+        return data, columns
+
+    def _encode_data(self, data, columns=None, tasks=None):
+        ''' Returns the header values and groups in 'data' (in the layout of Master.data) and tasks
+        encoded as bytes. The tasks are those of TaskColumns 'columns' (if any) with dict 'tasks'
+        of task IDs and task dicts (or None, to remove the task) applied, in the order of 'columns'
+        followed by new tasks. Only 'data' is encoded if neither is passed.
+
+        Raises:
+            DataError
+        '''
+
+        if columns is None and tasks is None:
+            tasks = data[DATA_TASKS]
+
+        strings = list(columns.strings) if columns else []
+        refs = {string: ref for ref, string in enumerate(strings)}
+
+        def intern(string):
+            ref = refs.get(string)
+            if ref is None:
+                ref = refs[string] = len(strings)
+                strings.append(string)
+            return ref
+
+        group_ids, group_titles, group_task_counts, group_task_ids = [], [], [], []
+        for group_id, group in data[DATA_GROUPS].items():
+            group_ids.append(intern(group_id))
+            group_titles.append(group[GROUP_TITLE])
+            group_task_counts.append(len(group[GROUP_TASKS]))
+            group_task_ids.extend(intern(task_id) for task_id in group[GROUP_TASKS])
+
+        ids, statuses, titles, descriptions = [], [], [], []
+        lists = {key: ([], []) for key in TaskColumns.LISTS}
+
+        def copy_rows(start, end):
+            ''' Copies the tasks in rows 'start' to 'end' of 'columns'. '''
+
+            ids.extend(columns.ids[start:end])
+            statuses.extend(columns.statuses[start:end])
+            titles.extend(columns.titles[start:end])
+            descriptions.extend(columns.descriptions[start:end])
+
+            for key, (counts, values) in lists.items():
+                column_counts, column_values = columns.lists[key]
+                counts.extend(column_counts[start:end])
+                values.extend(column_values[columns.starts[key][start]:columns.starts[key][end]])
+
+        def add_task(task_id, task):
+            taskd = task_dict(task)
+
+            try:
+                ids.append(intern(task_id))
+                statuses.append(bool(taskd[TASK_STATUS]))
+                titles.append(taskd[TASK_TITLE])
+                descriptions.append(taskd[TASK_DESCRIPTION])
+
+                for key, (counts, values) in lists.items():
+                    counts.append(len(taskd[key]))
+                    values.extend(taskd[key] if key == TASK_COMMENTS else map(intern, taskd[key]))
+            except (KeyError, TypeError) as e:
+                raise DataError(path=self.path, task_id=task_id, msg=f"Task could not be encoded: {e}") from e
+
+        start = 0
+        if columns:
+            for row in sorted(columns.rows[task_id] for task_id in tasks if task_id in columns.rows):
+                copy_rows(start, row)
+                start = row + 1
+
+                task_id = columns.strings[columns.ids[row]]
+                if tasks[task_id] is not None:
+                    add_task(task_id, tasks[task_id])
+
+            copy_rows(start, len(columns.ids))
+
+        for task_id, task in tasks.items():
+            if task is not None and not (columns and task_id in columns.rows):
+                add_task(task_id, task)
+
+        header = json.dumps({key: value for key, value in data.items() if key not in (DATA_GROUPS, DATA_TASKS)}, ensure_ascii=False).encode('utf-8')
+
+        parts = [self.MAGIC, struct.pack('<HI', self.VERSION, len(header)), header, self._pack_texts(strings),
+                 self._pack_ints(group_ids), self._pack_texts(group_titles), self._pack_ints(group_task_counts), self._pack_ints(group_task_ids),
+                 self._pack_ints(ids), self._pack_ints(statuses), self._pack_texts(titles), self._pack_texts(descriptions)]
+        for key, (counts, values) in lists.items():
+            parts += [self._pack_ints(counts), self._pack_texts(values) if key == TASK_COMMENTS else self._pack_ints(values)]
+
+        return b''.join(parts)
+
+    def _fetch_task(self, task_id):
+        return self._columns.task_dict(task_id)
+
+    def _get_task_ids(self):
+        return list(self._columns.rows)
+
+    def _has_task(self, task_id):
+        return task_id in self._columns.rows
+
+    def _pack_ints(self, values):
+        ''' Returns unsigned integers 'values' as an integer column.
+
+        Raises:
+            DataError
+        '''
+
+        largest = max(values, default=0)
+        size = next((size for size in sorted(self.TYPECODES) if largest < 1 << 8 * size), None)
+        if size is None or size > 4:
+            raise DataError(path=self.path, msg=f"Value too large to be stored: {largest}")
+
+        column = array.array(self.TYPECODES[size], values)
+        if sys.byteorder == 'big':
+            column.byteswap()
+
+        return struct.pack('<BI', size, len(column)) + column.tobytes()
+
+    def _pack_texts(self, texts):
+        ''' Returns strings 'texts' as a text column.
+
+        Raises:
+            DataError
+        '''
+
+        encoded = ''.join(texts).encode('utf-8')
+        return self._pack_ints([len(text) for text in texts]) + struct.pack('<I', len(encoded)) + encoded
+
+    def _read(self):
+        ''' Reads the storage file and returns its header values, groups and TaskColumns (see
+        _decode_data()), or None if it does not exist.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        try:
+            with open(self.path, mode='rb') as f:
+                buffer = f.read()
+        except FileNotFoundError:
+            return None
+        except PermissionError as e:
+            raise FSError(path=self.path, msg=f"No permission to access storage file. Inspect file permissions for: '{self.path}'") from e
+        except OSError as e:
+            raise FSError(path=self.path, msg="An unexpected error occurred while loading data.") from e
+
+        return self._decode_data(buffer)
+
+    def _unpack_ints(self, buffer, pos):
+        ''' Returns the integer column at 'pos' in 'buffer' as an array, and the position following it. '''
+
+        size, count = struct.unpack_from('<BI', buffer, pos)
+        pos += 5
+        end = pos + size * count
+
+        column = array.array(self.TYPECODES[size])
+        column.frombytes(buffer[pos:end])
+        if len(column) != count:
+            raise ValueError("Integer column is truncated.")
+        if sys.byteorder == 'big':
+            column.byteswap()
+
+        return column, end
+
+    def _unpack_texts(self, buffer, pos):
+        ''' Returns the text column at 'pos' in 'buffer' as a list of strings, and the position following it. '''
+
+        lengths, pos = self._unpack_ints(buffer, pos)
+        size, = struct.unpack_from('<I', buffer, pos)
+        pos += 4
+
+        text = str(buffer[pos:pos + size], 'utf-8')
+        starts = list(itertools.accumulate(lengths, initial=0))
+        if starts[-1] != len(text):
+            raise ValueError("Text column lengths do not match its text.")
+
+        return [text[start:end] for start, end in zip(starts, starts[1:])], pos + size
+
+    def commit(self, payloads):
+        ''' Applies 'payloads' to the data as last written and rewrites the storage file with the
+        result. If any of them compacts, every task is encoded again and unused strings are
+        dropped from the string table.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        if self._written is None:
+            data, columns = self._read() or ({DATA_GROUPS: {}}, None)
+            self._written = (data, columns, {})
+
+        data, columns, tasks = self._written
+
+        for fields, groups, changed_tasks, _ in (payload.content for payload in payloads):
+            data.update(fields)
+
+            for group_id, group in groups.items():
+                if group is None:
+                    data[DATA_GROUPS].pop(group_id, None)
+                else:
+                    data[DATA_GROUPS][group_id] = group
+
+            tasks.update(changed_tasks)
+
+        compact = any(payload.content[3] for payload in payloads)
+        if compact and columns:
+            # Every task as a task dict, so that the string table is built anew.
+            all_tasks = {task_id: tasks[task_id] if task_id in tasks else columns.task_dict(task_id) for task_id in columns.rows}
+            all_tasks.update(tasks)
+            text = self._encode_data(data, tasks=all_tasks)
+        else:
+            text = self._encode_data(data, columns, tasks)
+
+        try:
+            atomic_write(self.path, text)
+        except PermissionError as e:
+            raise FSError(path=self.path, msg=f"No permission to write to storage file. Inspect file permissions for: '{self.path}'") from e
+        except Exception as e:
+            raise FSError(path=self.path, msg=f"An unexpected error occured during attempt to write data to storage file at: '{self.path}'") from e
+
+        if compact:
+            data, columns = self._decode_data(text)
+            self._written = (data, columns, {})
+
+    def create(self, data):
+        ''' Creates (or overwrites) the storage file so that it contains 'data'.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        text = self._encode_data(data)
+
+        try:
+            atomic_write(self.path, text)
+        except FileNotFoundError as e:
+            raise FSError(path=self.path, msg="A file system error occured during creation of storage file.") from e
+        except PermissionError as e:
+            raise FSError(path=self.path, msg=f"No permission to create storage file. Inspect file permissions for: '{self.path}'") from e
+
+        self._written = None
+
+    def load(self):
+        ''' Reads the storage file and returns its data. Task dicts are built on first access.
+
+        Raises:
+            DataError
+            FSError
+        '''
+
+        written = self._read()
+        if written is None:
+            self._relay(f"Storage file at '{self.path}' not found.")
+            return {}
+
+        data, self._columns = written
+        self._written = (copy.deepcopy(data), self._columns, {})
+
+        data[DATA_TASKS] = LazyDict(self._fetch_task, self._get_task_ids, exists=self._has_task)
+        groups_task_ids_to(OrderedSet, data)
+
+        return data
+
+    def prepare(self, data, tasks, groups, header, compact=False):
+        ''' Returns a payload of modified tasks, groups and (if 'header' is True) header values. 
+        Task dicts are never modified in place (see Task.write_dict()), so they are not copied. '''
+
+        fields = {}
+        if header:
+            fields = {key: copy.deepcopy(value) for key, value in data.items() if key not in (DATA_GROUPS, DATA_TASKS)}
+
+        captured_groups = {}
+        for group_id in groups:
+            group = data[DATA_GROUPS].get(group_id)
+            captured_groups[group_id] = group and {GROUP_TASKS: list(group[GROUP_TASKS]), GROUP_TITLE: group[GROUP_TITLE]}
+
+        captured_tasks = {}
+        for task_id in tasks:
+            task = data[DATA_TASKS].get(task_id)
+            captured_tasks[task_id] = task and task_dict(task)
+
+        if not (fields or captured_groups or captured_tasks or compact):
+            return None
+
+        return Payload((fields, captured_groups, captured_tasks, compact), rewrites=True)
+
+def convert_binary_to_json(binary_path, json_path):
+    ''' Copies the store in binary storage file at 'binary_path' to a new JSON storage file at
+    'json_path'. Returns the number of tasks converted.
+
+    Raises:
+        DataError
+        FSError
+    '''
+
+    data = BinaryStorage(binary_path).load()
+    if not data:
+        raise FSError(path=binary_path, msg="No data to convert.")
+
+    data[DATA_TASKS] = dict(data[DATA_TASKS])
+    groups_task_ids_to(list, data)
+    JSONStorage(json_path).create(data)
+
+    return len(data[DATA_TASKS])
+
+def convert_json_to_binary(json_path, binary_path):
+    ''' Copies the store in JSON storage file at 'json_path' (including its journal, if any)
+    to a new binary storage file at 'binary_path'. Returns the number of tasks converted.
+
+    Raises:
+        DataError
+        FSError
+    '''
+
+    data = JSONStorage(json_path).load()
+    if not data:
+        raise FSError(path=json_path, msg="No data to convert.")
+
+    BinaryStorage(binary_path).create(data)
+
+    return len(data[DATA_TASKS])
+
+def migrate_json_to_sqlite(json_path, db_path):
+    ''' Copies the store in JSON storage file at 'json_path' (including its journal, if any)
+    to a new SQLite database at 'db_path'. Returns the number of tasks migrated.
+
+    Raises:
+        DataError
+        FSError
+    '''
+
+    data = JSONStorage(json_path).load()
+    if not data:
+        raise FSError(path=json_path, msg="No data to migrate.")
+
+    db = SQLiteStorage(db_path)
+    try:
+        db.create(data)
+    finally:
+        db.close()
+
+    return len(data[DATA_TASKS])
+
+if __name__ == '__main__':
+    # Conversion by the extensions of the source and destination paths.
+    conversions = {
+        (".json", ".db"): migrate_json_to_sqlite,
+        (".json", ".bin"): convert_json_to_binary,
+        (".bin", ".json"): convert_binary_to_json
+    }
+
+    convert = len(sys.argv) == 3 and conversions.get(tuple(os.path.splitext(path)[1] for path in sys.argv[1:]))
+    if not convert:
+        print(f"Usage: {sys.argv[0]} <storage.json> <storage.db | storage.bin>")
+        print(f"       {sys.argv[0]} <storage.bin> <storage.json>")
+        sys.exit(1)
+
+    n = convert(sys.argv[1], sys.argv[2])
+    print(f"Converted {n} tasks from '{sys.argv[1]}' to '{sys.argv[2]}'.")
@@ -1,13 +1,110 @@
-import copy, os
+import os, functools
 from id_gen import increment_id
 from globals import *
 
+def _reader(method):
+    ''' Runs Task method 'method' holding the lock of the task's master (see Master.lock) for 
+    reading, if it has one. '''
+
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        lock = getattr(self.master, "lock", None)
+        if not lock:
+            return method(self, *args, **kwargs)
+
+        lock.acquire_read()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            lock.release_read()
+
+    return locked
+
+def _writer(method):
+    ''' Runs Task method 'method' holding the lock of the task's master (see Master.lock) for 
+    writing, if it has one. '''
+
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        lock = getattr(self.master, "lock", None)
+        if not lock:
+            return method(self, *args, **kwargs)
+
+        lock.acquire_write()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            lock.release_write()
+
+    return locked
+
+# Links, files, subtasks and parents are each kept as a tuple while they hold up to _TUPLE_SIZE 
+# items, which takes the least memory, and as the keys of a dict (in order) once they hold more,
+# for constant time lookups. These return the value of such an attribute after a modification.
+
+_TUPLE_SIZE = 8
+
+def _add(items, item):
+    ''' Returns 'items' with 'item' added. '''
+
+    if item in items:
+        return items
+    if isinstance(items, dict):
+        items[item] = None
+        return items
+
+    return _pack(items + (item,))
+
+def _discard(items, item):
+    ''' Returns 'items' with 'item' removed. '''
+    return _pack(value for value in items if value != item)
+
+def _move(items, item, steps):
+    ''' Returns 'items' with 'item' moved 'steps' indices, and the index of 'item'. If the new
+    index would be out of range 'item' is not moved, as OrderedSet.move().
+
+    Raises:
+        KeyError
+    '''
+
+    values = list(items)
+    try:
+        i = values.index(item)
+    except ValueError as e:
+        raise KeyError(item) from e
+
+    if i + steps < 0 or i + steps > len(values) - 1:
+        return items, i
+
+    values.insert(i + steps, values.pop(i))
+
+    return _pack(values), i + steps
+
+def _pack(values):
+    ''' Returns the unique values of iterable 'values', in order, as a tuple or a dict. '''
+
+    values = tuple(dict.fromkeys(values))
+
+    return values if len(values) <= _TUPLE_SIZE else dict.fromkeys(values)
+
+def _replace(items, index, item):
+    ''' Returns 'items' with the value at 'index' replaced with 'item'.
+
+    Raises:
+        IndexError
+    '''
+
+    values = list(items)
+    values[index] = item
+
+    return _pack(values)
+
 class Task:
     ''' Represents a task. 
     
     If 'taskd' is passed the data from 'taskd' (task dictionary) will be validated and then used to construct self (Task). 'task_id' will also be validated. 
     See '_validate_id()' for format and type requirements. If 'taskd' is not passed 'task_id' will be ignored, and an ID will be generated. All other 
-    arguments will be used (except 'master'), if any, to construct the Task object. 'master' is always optional and if passed is expected to contain method 'get_current_task_id()'. 
+    arguments will be used (except 'master'), if any, to construct the Task object. 'master' is always optional and if passed is expected to contain methods 'get_current_task_id()', 'set_current_task_id()' and 'task_changed()'. 
     
     Args:
     
@@ -29,26 +126,29 @@ class Task:
                         Trying to update an index with no associated value will raise IndexError.
         'add_x'       : Adds value to list or set if it passes validation by '_validate_x'.
         'remove_x'    : Removes by value from set or by index from list. 
+
+    Task keeps no data beside its attributes, which hold small lists as tuples (see _pack()) and 
+    comments in a list only once there are any, to keep tasks small in memory.
     '''
 
+    __slots__ = ("master", "_id", "_title", "_description", "_status", "_comments", "_links", "_files", "_subtasks", "_parents")
+
     def __init__(self, master=None, taskd={}, task_id=None, status=False, title="", subtasks=[], parents=[], comments=[], description="", links=[], files=[]):
         self.master = master
 
-        self._taskd = copy.deepcopy(TASKD_TEMPLATE)
-
         self._validate_args(taskd=taskd, task_id=task_id, status=status, title=title, subtasks=subtasks, parents=parents, comments=comments, description=description, links=links, files=files)
 
         if taskd:
             self._id = task_id
             self._load_dict(taskd)
         else:
-            self._comments = comments
+            self._comments = list(comments) or ()
             self._description = description
             self._init_files(files)
-            self._links = OrderedSet(links)
+            self._links = _pack(links)
             self._status = status
-            self._subtasks = OrderedSet(subtasks)
-            self._parents = OrderedSet(parents)
+            self._subtasks = _pack(subtasks)
+            self._parents = _pack(parents)
             self._title = title or self.generate_task_title()
             self._id = self.generate_task_id() # Last, so errors happen before increment of current_id
 
@@ -68,24 +168,40 @@ class Task:
         
         return header
     
+    def _build_dict(self, status=False, title="", subtasks=[], parents=[], comments=[], description="", links=[], files=[]):
+        ''' Returns the task dict of a task created with the provided arguments. The arguments
+        are not validated, see Task.build_dicts(). '''
+
+        return {
+            TASK_COMMENTS: list(comments),
+            TASK_DESCRIPTION: description,
+            TASK_FILES: list(dict.fromkeys(os.path.abspath(path) for path in files)),
+            TASK_LINKS: list(dict.fromkeys(links)),
+            TASK_STATUS: status,
+            TASK_SUBTASKS: list(dict.fromkeys(subtasks)),
+            TASK_PARENTS: list(dict.fromkeys(parents)),
+            TASK_TITLE: title or self.generate_task_title()
+        }
+
+    def _changed(self):
+        ''' Notifies master (if any) that self has been modified. '''
+        if self.master:
+            self.master.task_changed(self._id)
+
     def _init_files(self, files):
-        self._files = OrderedSet()
-        for path in files:
-            self._files.add(os.path.abspath(path))
+        self._files = _pack(os.path.abspath(path) for path in files)
     
     def _load_dict(self, taskd):
         ''' Loads an existing dictionary into Task. '''
         
-        self._comments = taskd[TASK_COMMENTS]
+        self._comments = list(taskd[TASK_COMMENTS]) or ()
         self._description = taskd[TASK_DESCRIPTION]
-        self._links = OrderedSet(taskd[TASK_LINKS])
+        self._links = _pack(taskd[TASK_LINKS])
         self._init_files(taskd[TASK_FILES])
         self._status = taskd[TASK_STATUS]
-        self._subtasks = OrderedSet(taskd[TASK_SUBTASKS])
-        self._parents = OrderedSet(taskd[TASK_PARENTS])
+        self._subtasks = _pack(taskd[TASK_SUBTASKS])
+        self._parents = _pack(taskd[TASK_PARENTS])
         self._title = taskd[TASK_TITLE]
-        
-        self._taskd = taskd
 
     def _validate_args(self, taskd, task_id, status, title, subtasks, parents, comments, description, links, files):
         ''' Validates provided arguments (including data in taskd, if provided). 
@@ -217,25 +333,122 @@ class Task:
     def _validate_title(self, title):
         self._validate_base_object(title, str, "title", max_length=MAX_TITLE_LENGTH)
 
+    @_writer
     def add_parent(self, parent_id):
         self._validate_id(parent_id)
-        self._parents.add(parent_id)
+        self._parents = _add(self._parents, parent_id)
+        self._changed()
 
+    @_writer
     def add_subtask(self, subtask_id):
         self._validate_id(subtask_id)
-        self._subtasks.add(subtask_id)
+        self._subtasks = _add(self._subtasks, subtask_id)
+        self._changed()
 
+    @_writer
     def add_comment(self, comment):
         self._validate_comment(comment)
+        if not self._comments:
+            self._comments = []
         self._comments.append(comment)
+        self._changed()
     
+    @_writer
     def add_link(self, url):
         self._validate_link(url)
-        self._links.append(url)
+        self._links = _add(self._links, url)
+        self._changed()
 
+    @_writer
     def add_file(self, path):
         self._validate_file(path)
-        self._files.add(os.path.abspath(path))
+        self._files = _add(self._files, os.path.abspath(path))
+        self._changed()
+
+    @classmethod
+    def build_dicts(cls, specs):
+        ''' Returns a task dict for each dict of keyword arguments to Task.__init__() in 'specs', 
+        validated as Task.__init__() would, without creating Task objects. 
+
+        Raises:
+            TypeError
+            ValueError
+        '''
+
+        validator = cls.__new__(cls) # Validation does not depend on the state of a Task.
+        validators = {
+            "comments": validator._validate_comments,
+            "description": validator._validate_description,
+            "links": validator._validate_links,
+            "files": validator._validate_files,
+            "status": validator._validate_status,
+            "subtasks": validator._validate_subtasks,
+            "parents": validator._validate_parents,
+            "title": validator._validate_title
+        }
+        taskds = []
+
+        for i, kwargs in enumerate(specs):
+            try:
+                if not isinstance(kwargs, dict):
+                    raise TypeError("Task arguments are not of type dict.")
+
+                # Arguments left out take their default values, which need no validation.
+                for name, value in kwargs.items():
+                    if name not in validators:
+                        raise TypeError(f"Unexpected argument '{name}'.")
+                    validators[name](value)
+
+                taskds.append(validator._build_dict(**kwargs))
+            except (TypeError, ValueError) as e:
+                raise type(e)(f"Invalid arguments for task {i}: {e}") from e
+
+        return taskds
+
+    @classmethod
+    def load_dicts(cls, master, items, validate=True):
+        ''' Returns a Task object for each pair of task ID and task dict in 'items', in order. Unless
+        'validate' is False, every pair is validated (see Task.validate_dicts()) before any Task
+        object is created.
+
+        Raises:
+            TypeError
+            ValueError
+        '''
+
+        items = list(items)
+        if validate:
+            cls.validate_dicts(items)
+
+        tasks = []
+        for task_id, taskd in items:
+            task = cls.__new__(cls)
+            task.master = master
+            task._id = task_id
+            task._load_dict(taskd)
+            tasks.append(task)
+
+        return tasks
+
+    @classmethod
+    def validate_dicts(cls, items):
+        ''' Validates each pair of task ID and task dict in 'items' as Task.__init__() would
+        validate 'task_id' and 'taskd'.
+
+        Raises:
+            TypeError
+            ValueError
+        '''
+
+        validator = cls.__new__(cls) # Validation does not depend on the state of a Task.
+
+        for task_id, taskd in items:
+            try:
+                if not taskd:
+                    raise ValueError("Provided 'taskd' is empty.")
+                validator._validate_args(taskd, task_id, False, "", [], [], [], "", [], [])
+            except (TypeError, ValueError) as e:
+                raise type(e)(f"Invalid task dict with ID '{task_id}': {e}") from e
 
     def generate_task_id(self):
         ''' Generates a task ID based on information provided by master.
@@ -287,64 +500,102 @@ class Task:
     def get_title(self):
         return self._title
 
+    @_writer
     def move_parent(self, parent_id, steps):
         try:
-            index = self._parents.move(parent_id, steps)
+            self._parents, index = _move(self._parents, parent_id, steps)
         except KeyError as e:
             raise TaskNotFoundError(task_id=parent_id, msg=f"No parent found with ID: '{parent_id}'") from e
         
+        self._changed()
         return index
     
+    @_writer
     def move_subtask(self, subtask_id, steps):
         try:
-            index = self._subtasks.move(subtask_id, steps)
+            self._subtasks, index = _move(self._subtasks, subtask_id, steps)
         except KeyError as e:
             raise TaskNotFoundError(task_id=subtask_id, msg=f"No subtask found with ID: '{subtask_id}'") from e
         
+        self._changed()
         return index
     
+    @_writer
     def gh_comment(self, index):
-        self._comments.pop(index)
+        comments = self._comments or []
+        comments.pop(index)
+        self._comments = comments or ()
+        self._changed()
     
+    @_writer
     def remove_file(self, path): 
-        self._files.discard(path)
+        if path in self._files:
+            self._files = _discard(self._files, path)
+            self._changed()
 
+    @_writer
     def remove_link(self, url):
-        self._links.discard(url)
+        if url in self._links:
+            self._links = _discard(self._links, url)
+            self._changed()
 
+    @_writer
     def remove_parent(self, parent_id):
-        self._parents.discard(parent_id)
+        if parent_id in self._parents:
+            self._parents = _discard(self._parents, parent_id)
+            self._changed()
 
+    @_writer
     def remove_subtask(self, subtask_id):
-        self._subtasks.discard(subtask_id)
+        if subtask_id in self._subtasks:
+            self._subtasks = _discard(self._subtasks, subtask_id)
+            self._changed()
+    
+    @_writer
+    def remove_subtasks(self, subtask_ids):
+        subtask_ids = set(subtask_ids)
+        if not subtask_ids.isdisjoint(self._subtasks):
+            self._subtasks = _pack(subtask_id for subtask_id in self._subtasks if subtask_id not in subtask_ids)
+            self._changed()
     
+    @_writer
     def replace_comment(self, index, comment):
         self._validate_comment(comment)
 
         try:
-            self._comments[index] = comment
+            (self._comments or [])[index] = comment
         except IndexError as e:
             raise type(e)(f"No comment with index: '{index}'") from e
 
+        self._changed()
+
+    @_writer
     def replace_file(self, index, path):
         self._validate_file(path)
 
         try:
-            self._files[index] = path
+            self._files = _replace(self._files, index, path)
         except IndexError as e:
             raise type(e)(f"No file at index: '{index}'") from e
 
+        self._changed()
+
+    @_writer
     def replace_link(self, index, url):
         self._validate_link(url)
 
         try:
-            self._links[index] = url
+            self._links = _replace(self._links, index, url)
         except IndexError as e:
             raise type(e)(f"No link at index: '{index}'") from e
 
+        self._changed()
+
+    @_writer
     def set_description(self, description):
         self._validate_description(description)
         self._description = description
+        self._changed()
 
     def set_id(self, id):
         ''' Set Task ID. set_id() is disabled if a master 
@@ -363,18 +614,25 @@ class Task:
         
         return self._id
 
+    @_writer
     def set_status(self, status):
         self._validate_status(status)
 
         self._status = status
+        self._changed()
 
+    @_writer
     def toggle_status(self):
         self._status = not self._status
+        self._changed()
 
+    @_writer
     def set_title(self, title):
         self._validate_title(title)
         self._title = title
+        self._changed()
 
+    @_reader
     def summarize(self):        
         title_to_max_display_n = {
                 "comments": MAX_COMMENTS_TO_DISPLAY,
@@ -461,19 +719,21 @@ class Task:
                 
         return text
     
+    @_reader
     def write_dict(self):
-        ''' Updates the self._taskd dictionary and returns it.
+        ''' Returns a new task dictionary of the task. Dictionaries returned earlier are left 
+        untouched, so that they can be shared by snapshots (see Master.STORAGE_BACKUP).
 
         Example usage: Writing a task to JSON
         '''
 
-        self._taskd[TASK_COMMENTS] = list(self._comments)
-        self._taskd[TASK_DESCRIPTION] = self._description
-        self._taskd[TASK_FILES] = list(self._files)
-        self._taskd[TASK_LINKS] = list(self._links)
-        self._taskd[TASK_STATUS] = self._status
-        self._taskd[TASK_SUBTASKS] = list(self._subtasks)
-        self._taskd[TASK_PARENTS] = list(self._parents)
-        self._taskd[TASK_TITLE] = self._title
-        
-        return self._taskd
\ No newline at end of file
+        return {
+            TASK_COMMENTS: list(self._comments),
+            TASK_DESCRIPTION: self._description,
+            TASK_FILES: list(self._files),
+            TASK_LINKS: list(self._links),
+            TASK_STATUS: self._status,
+            TASK_SUBTASKS: list(self._subtasks),
+            TASK_PARENTS: list(self._parents),
+            TASK_TITLE: self._title
+        }
\ No newline at end of file
@@ -0,0 +1,87 @@
+''' Tests of AsyncMaster.
+
+Run from the repository root with: python -m unittest discover tests
+'''
+
+import os, sys, shutil, asyncio, tempfile, unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import Master
+from async_master import AsyncMaster
+from storage import JSONStorage
+
+class SilentUI:
+    def relay(self, message=''):
+        pass
+
+    def request(self, request_type=bool, message=''):
+        return True
+
+class AsyncMasterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def run_async(self, test):
+        ''' Runs the coroutine function 'test' with an AsyncMaster on a new lazy store. '''
+
+        async def main():
+            async with AsyncMaster(ui=SilentUI(), storage=JSONStorage(os.path.join(self.dir, "storage.json"), lazy=True)) as amaster:
+                amaster.CHUNK_SIZE = 7
+                await amaster.load()
+                await test(amaster)
+
+        asyncio.run(main())
+
+    def test_iterators(self):
+        async def test(amaster):
+            group_id = await amaster.get_active_group()
+            task_ids = await amaster.create_tasks([{"title": f"T{i}"} for i in range(20)], group_id=group_id)
+
+            self.assertEqual([task_id async for task_id in amaster.iter_tasks()], task_ids)
+            self.assertEqual([task_id async for task_id in amaster.iter_tasks(start=task_ids[5], limit=3)], task_ids[6:9])
+            self.assertEqual([task_id async for task_id in amaster.iter_group_tasks(group_id)], task_ids)
+            self.assertEqual([line async for line in amaster.iter_export()], await amaster.run(lambda: list(amaster.master.iter_export())))
+
+        self.run_async(test)
+
+    def test_calls_between_chunks(self):
+        async def test(amaster):
+            group_id = await amaster.get_active_group()
+            task_ids = await amaster.create_tasks([{"title": f"T{i}"} for i in range(20)], group_id=group_id)
+            await amaster.save()
+            await amaster.load()
+
+            lines = []
+            async for line in amaster.iter_export():
+                lines.append(line)
+                if len(lines) == 10:
+                    await amaster.create_task(group_id=group_id, task_kwargs={"title": "new"})
+                    await amaster.remove_tasks([task_ids[-1]])
+
+            # The header, the group and the tasks present when the export reached them.
+            self.assertEqual(len(lines), 2 + len(task_ids) - 1)
+
+        self.run_async(test)
+
+    def test_refuses_iterators(self):
+        class TitleMaster(Master):
+            def iter_titles(self):
+                return (self.get_task(task_id).get_title() for task_id in self.get_tasks())
+
+        async def main():
+            master = TitleMaster(SilentUI(), storage=JSONStorage(os.path.join(self.dir, "storage.json")))
+            async with AsyncMaster(master) as amaster:
+                await amaster.load()
+                with self.assertRaises(TypeError):
+                    await amaster.iter_titles()
+
+        asyncio.run(main())
+
+if __name__ == "__main__":
+    unittest.main()
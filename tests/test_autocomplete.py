@@ -0,0 +1,91 @@
+''' Tests of autocomplete.TitleIndex against a brute-force comparison of every title.
+
+Run from the repository root with: python -m unittest discover tests
+'''
+
+import os, sys, random, unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from autocomplete import TitleIndex
+
+# Few characters, so that many titles are within a few edits of each other.
+CHARS = "abcé "
+
+class TitleIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(0)
+
+    def title(self):
+        return ''.join(self.rng.choices(CHARS, k=self.rng.randint(0, 6))).title()
+
+    def distance(self, key, text):
+        ''' Returns the smallest Levenshtein distance between 'text' and a prefix of 'key'. '''
+
+        row = list(range(len(text) + 1))
+        best = row[-1]
+        for depth, char in enumerate(key, 1):
+            next_row = [depth]
+            for i in range(1, len(text) + 1):
+                next_row.append(min(next_row[i - 1] + 1, row[i] + 1, row[i - 1] + (text[i - 1] != char)))
+            row = next_row
+            best = min(best, row[-1])
+
+        return best
+
+    def assertCompletes(self, index, titles):
+        texts = [''.join(self.rng.choices(CHARS, k=self.rng.randint(0, 5))) for _ in range(60)]
+
+        for text in texts:
+            for max_distance in (0, 1, 2, 3):
+                with self.subTest(text=text, max_distance=max_distance):
+                    distances = {key: self.distance(key, text) for key in index._keys}
+
+                    # Every title is in a range at its distance, and in none closer.
+                    found = {}
+                    for distance, lo, end in index._fuzzy(text, max_distance):
+                        for i in range(lo, end):
+                            found[index._keys[i]] = min(distance, found.get(index._keys[i], distance))
+                    self.assertEqual(found, {key: distance for key, distance in distances.items() if distance <= max_distance})
+
+                    # Prefix matches in order of title, then fuzzy matches by distance and title.
+                    if text and max_distance:
+                        ordered = sorted((distance, key) for key, distance in distances.items() if distance <= max_distance)
+                    else:
+                        ordered = [(0, key) for key in index._keys if key.startswith(text.lower())]
+                    ids = [id for _, key in ordered for id in titles[key]]
+                    for limit in (1, 5, len(ids) + 1):
+                        self.assertEqual(index.complete(text, limit, max_distance), ids[:limit])
+
+    def test_complete(self):
+        items = [(str(i), self.title()) for i in range(300)] + [("empty", "")]
+        index = TitleIndex(items)
+
+        def titles():
+            by_key = {}
+            for id, title in items:
+                by_key.setdefault(title.lower(), []).append(id)
+            return by_key
+
+        self.assertCompletes(index, titles())
+
+        # Additions and removals after trie nodes have been cached.
+        for i in range(100):
+            if self.rng.random() < 0.5:
+                id, title = items.pop(self.rng.randrange(len(items)))
+                index.remove(id, title)
+            else:
+                items.append((f"new {i}", self.title()))
+                index.add(*items[-1])
+        self.assertCompletes(index, titles())
+
+    def test_empty_title(self):
+        index = TitleIndex([("1", ""), ("2", "ab"), ("3", "xyz")])
+
+        self.assertEqual(index.complete("q", max_distance=1), ["1", "2", "3"])
+        self.assertEqual(index.complete("qq", max_distance=1), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+''' Tests of Master.restore_backup().
+
+Run from the repository root with: python -m unittest discover tests
+'''
+
+import os, sys, shutil, tempfile, unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import Master
+from query import in_group, status
+from storage import JSONStorage
+
+class SilentUI:
+    def relay(self, message=''):
+        pass
+
+    def request(self, request_type=bool, message=''):
+        return True
+
+class BackupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_restore_keeps_order(self):
+        for journal in (False, True):
+            with self.subTest(journal=journal):
+                master = Master(SilentUI(), storage=JSONStorage(os.path.join(self.dir, f"storage_{journal}.json"), journal=journal))
+                master.load_data()
+                group_id = master.get_active_group()
+
+                task_ids = [master.create_task(group_id=group_id, task_kwargs={"title": f"task {i}"}) for i in range(12)]
+                master.write_data()
+                task_ids += [master.create_task(group_id=group_id, task_kwargs={"title": f"task {i}"}) for i in range(12, 20)]
+                master.write_data()
+
+                master.get_task(task_ids[0]).set_title("modified")
+                master.create_task(group_id=group_id)
+                master.restore_backup()
+
+                self.assertEqual(master.get_tasks(), task_ids)
+                self.assertEqual(master.get_group_tasks(group_id), task_ids)
+                self.assertEqual(master.query(status(False) & in_group()), task_ids)
+                self.assertEqual(master.get_task(task_ids[0]).get_title(), "task 0")
+                master.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+''' Tests of the task graph index kept by Master (see graph.TaskGraph) against the same values
+recomputed from the tasks after every change.
+
+Run from the repository root with: python -m unittest discover tests
+'''
+
+import os, sys, random, shutil, tempfile, unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import Master
+from task import Task
+from storage import JSONStorage
+
+# Keyword arguments of JSONStorage for each way of loading a store.
+MODES = {
+    "eager": {},
+    "lazy": {"lazy": True}
+}
+
+# Number of random changes made by each test.
+STEPS = 150
+
+class SilentUI:
+    def relay(self, message=''):
+        pass
+
+    def request(self, request_type=bool, message=''):
+        return True
+
+class GraphTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.masters = []
+
+    def tearDown(self):
+        for master in self.masters:
+            master.close()
+        shutil.rmtree(self.dir)
+
+    def master(self, mode):
+        ''' Returns a Master with a random forest of tasks in two groups, written and reloaded
+        with the storage of 'mode'. '''
+
+        path = os.path.join(self.dir, mode + ".json")
+        rng = random.Random(mode)
+
+        master = Master(SilentUI(), storage=JSONStorage(path))
+        master.load_data()
+        self.masters.append(master)
+
+        group_ids = [master.get_active_group(), master.create_group("Other")]
+        task_ids = []
+        for i in range(60):
+            kwargs = {"title": f"T{i}", "status": rng.random() < 0.3}
+            if task_ids and rng.random() < 0.8:
+                task_ids.append(master.create_subtask(rng.choice(task_ids), task_kwargs=kwargs))
+            else:
+                task_ids.append(master.create_task(group_id=rng.choice(group_ids), task_kwargs=kwargs))
+        master.write_data()
+
+        master = Master(SilentUI(), storage=JSONStorage(path, **MODES[mode]))
+        master.load_data()
+        self.masters.append(master)
+
+        return master
+
+    def change(self, master, rng):
+        ''' Makes a random change to the tasks of 'master'. '''
+
+        task_ids = master.get_tasks()
+        change = rng.random()
+
+        if change < 0.35:
+            subtask_id, task_id = rng.sample(task_ids, 2)
+            try:
+                master.make_subtask(subtask_id, task_id)
+            except ValueError:
+                pass
+        elif change < 0.6:
+            task_id = rng.choice(task_ids)
+            subtask_ids = master.get_task(task_id).get_subtasks()
+            if subtask_ids:
+                master.remove_direct_relationship(task_id, rng.choice(subtask_ids))
+        elif change < 0.9:
+            master.get_task(rng.choice(task_ids)).toggle_status()
+        elif len(task_ids) > 10:
+            master.remove_tasks([rng.choice(task_ids)])
+
+    def progress(self, master, task_id):
+        ''' Returns the number of completed tasks and of tasks below task with ID 'task_id',
+        counted once for each path to them, see Master.get_progress(). '''
+
+        completed = total = 0
+        for subtask_id in master.get_task(task_id).get_subtasks():
+            subtask_completed, subtask_total = self.progress(master, subtask_id)
+            completed += master.get_task(subtask_id).get_status() + subtask_completed
+            total += 1 + subtask_total
+
+        return completed, total
+
+    def closure(self, master, task_id, neighbors):
+        ''' Returns the IDs of the tasks reached from task with ID 'task_id' by repeatedly
+        following 'neighbors' (a Task method returning IDs). '''
+
+        closure = set()
+        stack = [task_id]
+        while stack:
+            for next_id in neighbors(master.get_task(stack.pop())):
+                if next_id not in closure:
+                    closure.add(next_id)
+                    stack.append(next_id)
+
+        return closure
+
+    def assertClosures(self, master):
+        for task_id in master.get_tasks():
+            self.assertEqual(master.ancestors(task_id), self.closure(master, task_id, Task.get_parents), task_id)
+            self.assertEqual(master.descendants(task_id), self.closure(master, task_id, Task.get_subtasks), task_id)
+
+    def assertProgress(self, master):
+        for task_id in master.get_tasks():
+            self.assertEqual(master.get_progress(task_id), self.progress(master, task_id), task_id)
+
+        for group_id in master.get_groups():
+            completed = total = 0
+            for task_id in master.get_group_tasks(group_id):
+                task_completed, task_total = self.progress(master, task_id)
+                completed += master.get_task(task_id).get_status() + task_completed
+                total += 1 + task_total
+
+            self.assertEqual(master.get_group_progress(group_id), (completed, total), group_id)
+
+    def test_closures(self):
+        for mode in MODES:
+            with self.subTest(mode=mode):
+                master = self.master(mode)
+                rng = random.Random(mode)
+
+                self.assertClosures(master)
+                for _ in range(STEPS):
+                    # Rejected exactly when the task would end up below itself.
+                    subtask_id, task_id = rng.choice(master.get_tasks()), rng.choice(master.get_tasks())
+                    if not master.in_group(subtask_id):
+                        if task_id == subtask_id or task_id in self.closure(master, subtask_id, Task.get_subtasks):
+                            self.assertRaises(ValueError, master.make_subtask, subtask_id, task_id)
+                        else:
+                            master.make_subtask(subtask_id, task_id)
+                        self.assertClosures(master)
+
+                    self.change(master, rng)
+                    self.assertClosures(master)
+
+    def test_progress(self):
+        for mode in MODES:
+            with self.subTest(mode=mode):
+                master = self.master(mode)
+                rng = random.Random(mode)
+
+                self.assertProgress(master)
+                for _ in range(STEPS):
+                    self.change(master, rng)
+                    self.assertProgress(master)
+
+    def test_remove_tasks(self):
+        for mode in MODES:
+            with self.subTest(mode=mode):
+                master = self.master(mode)
+                rng = random.Random(mode)
+
+                while len(master.get_tasks()) > 5:
+                    task_ids = rng.sample(master.get_tasks(), 2)
+                    removed = set(task_ids)
+                    for task_id in task_ids:
+                        removed |= self.closure(master, task_id, Task.get_subtasks)
+                    remaining = set(master.get_tasks()) - removed
+
+                    master.remove_tasks(task_ids)
+                    self.assertEqual(set(master.get_tasks()), remaining)
+                    for task_id in remaining:
+                        task = master.get_task(task_id)
+                        self.assertTrue(remaining.issuperset(task.get_subtasks() + task.get_parents()), task_id)
+                    for group_id in master.get_groups():
+                        self.assertTrue(remaining.issuperset(master.get_group_tasks(group_id)), group_id)
+                    self.assertClosures(master)
+                    self.assertProgress(master)
+
+                    self.change(master, rng)
+
+if __name__ == "__main__":
+    unittest.main()
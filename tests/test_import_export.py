@@ -0,0 +1,78 @@
+''' Tests of Master.iter_export() and Master.import_stream().
+
+Run from the repository root with: python -m unittest discover tests
+'''
+
+import os, sys, shutil, tempfile, unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import Master
+from storage import JSONStorage
+
+class SilentUI:
+    def relay(self, message=''):
+        pass
+
+    def request(self, request_type=bool, message=''):
+        return True
+
+class ImportExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.masters = []
+
+    def tearDown(self):
+        for master in self.masters:
+            master.close()
+        shutil.rmtree(self.dir)
+
+    def master(self, name, lazy=False):
+        master = Master(SilentUI(), storage=JSONStorage(os.path.join(self.dir, name), lazy=lazy))
+        master.load_data()
+        self.masters.append(master)
+        return master
+
+    def test_round_trip(self):
+        source = self.master("source.json")
+        group_id = source.create_group("Imported")
+        parent_id = source.create_task(group_id=group_id, task_kwargs={"title": "parent", "comments": ["comment"]})
+        source.create_subtask(parent_id, task_kwargs={"title": "subtask", "links": ["link"]})
+        source.write_data()
+
+        target = self.master("target.json")
+        self.assertEqual(target.import_stream(list(source.iter_export())), 5)
+
+        reloaded = self.master("target.json")
+        self.assertEqual(list(reloaded.iter_export()), list(source.iter_export()))
+
+    def test_import_into_non_empty_store(self):
+        for lazy in (False, True):
+            with self.subTest(lazy=lazy):
+                source = self.master(f"source_{lazy}.json")
+                source.create_tasks([{"title": f"A{i}"} for i in range(3)], group_id=source.get_active_group())
+                source.write_data()
+
+                target = self.master(f"target_{lazy}.json", lazy=lazy)
+                group_id = target.create_group("Existing")
+                task_ids = target.create_tasks([{"title": f"B{i}"} for i in range(10)], group_id=group_id)
+                target.set_active_group(group_id)
+                target.write_data()
+
+                target.import_stream(source.iter_export())
+                new_id = target.create_task(task_kwargs={"title": "new"})
+                new_group_id = target.create_group("New")
+                target.write_data()
+
+                reloaded = self.master(f"target_{lazy}.json", lazy=lazy)
+                self.assertNotIn(new_id, task_ids)
+                self.assertNotIn(new_group_id, ("0", group_id))
+                self.assertEqual([reloaded.get_task(task_id).get_title() for task_id in task_ids[3:]], [f"B{i}" for i in range(3, 10)])
+                self.assertEqual(reloaded.get_task(new_id).get_title(), "new")
+                self.assertEqual(reloaded.get_group_title(group_id), "Existing")
+                self.assertIn(reloaded.get_active_group(), reloaded.get_groups())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+''' Tests of search.SearchIndex against a brute-force ranking of the same texts.
+
+Run from the repository root with: python -m unittest discover tests
+'''
+
+import os, sys, math, random, unittest, itertools
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from search import SearchIndex
+from globals import SEARCH_TITLE_WEIGHT
+
+# Few words, some much more frequent than others, so that queries match many tasks with tied scores.
+WORDS = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta", "iota", "kappa"]
+WORD_WEIGHTS = [30, 20, 12, 8, 6, 4, 3, 2, 1, 1]
+
+class SearchIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(0)
+
+    def text(self):
+        ''' Returns a random title, description and comments. '''
+
+        def words(n):
+            return ' '.join(self.rng.choices(WORDS, WORD_WEIGHTS, k=n))
+
+        return (words(self.rng.randint(0, 3)).title(), words(self.rng.randint(0, 6)), [words(self.rng.randint(1, 3)) for _ in range(self.rng.randint(0, 2))])
+
+    def scores(self, texts, query):
+        ''' Returns the score of each task in 'texts' holding every word of 'query', computed from scratch. '''
+
+        counts = {}
+        for task_id, (title, description, comments) in texts.items():
+            counts[task_id] = Counter(' '.join((description, *comments)).lower().split())
+            for word in title.lower().split():
+                counts[task_id][word] += SEARCH_TITLE_WEIGHT
+
+        # Tasks without a word are not indexed, nor counted in the inverse document frequency.
+        size = sum(1 for task_counts in counts.values() if task_counts)
+
+        scores = {}
+        words = set(query.split())
+        for task_id, task_counts in counts.items():
+            if all(task_counts[word] for word in words):
+                scores[task_id] = sum(task_counts[word] * math.log(1 + size / sum(1 for c in counts.values() if c[word])) for word in words)
+
+        return scores
+
+    def assertSearches(self, index, texts):
+        task_ids = list(texts)
+        queries = [' '.join(words) for n in (1, 2, 3) for words in itertools.combinations(WORDS[:6], n)]
+
+        for query in queries:
+            scores = self.scores(texts, query)
+            for limit in (1, 3, 10, 1000):
+                for scope in (None, set(self.rng.sample(task_ids, 5)), set(self.rng.sample(task_ids, len(task_ids) // 2))):
+                    with self.subTest(query=query, limit=limit, scope=scope and len(scope)):
+                        result = index.search(query, scope, limit)
+
+                        expected = sorted((score for task_id, score in scores.items() if scope is None or task_id in scope), reverse=True)[:limit]
+                        self.assertEqual(len(result), len(set(result)))
+                        self.assertTrue(all(task_id in scores and (scope is None or task_id in scope) for task_id in result))
+                        # Tasks with the same score may be returned in any order.
+                        self.assertEqual([round(scores[task_id], 9) for task_id in result], [round(score, 9) for score in expected])
+
+    def test_search(self):
+        for ranked_size in (SearchIndex.RANKED_SIZE, 5):
+            with self.subTest(ranked_size=ranked_size):
+                texts = {str(i): self.text() for i in range(300)}
+                index = SearchIndex()
+                index.RANKED_SIZE = ranked_size
+                index.build(texts.items())
+                self.assertSearches(index, texts)
+
+                # Updates keep the tasks ranked by _top() in order.
+                for i in range(200):
+                    task_id = str(self.rng.randrange(400))
+                    if task_id in texts and self.rng.random() < 0.3:
+                        del texts[task_id]
+                        index.update(task_id, None)
+                    else:
+                        texts[task_id] = self.text()
+                        index.update(task_id, texts[task_id])
+                self.assertSearches(index, texts)
+
+if __name__ == "__main__":
+    unittest.main()
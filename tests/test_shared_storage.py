@@ -0,0 +1,245 @@
+''' Tests of merging the changes several processes make to a shared JSONStorage, see Master._merge_changes().
+
+Run from the repository root with: python -m unittest discover tests
+'''
+
+import os, sys, time, shutil, tempfile, textwrap, unittest, subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import Master
+from storage import JSONStorage, SQLiteStorage
+
+# Keyword arguments of JSONStorage for each way of loading and writing a shared store.
+MODES = {
+    "eager": {},
+    "journal": {"journal": True},
+    "lazy": {"lazy": True},
+    "lazy journal": {"lazy": True, "journal": True}
+}
+
+# Loads the store in another process, runs 'edit' with 'master' and 'task_id' defined, and writes.
+OTHER_PROCESS = '''
+import sys
+sys.path.insert(0, {root!r})
+from main import Master
+from storage import JSONStorage
+
+class UI:
+    def relay(self, message=''): pass
+    def request(self, request_type=bool, message=''): return True
+
+master = Master(UI(), storage=JSONStorage({path!r}, shared=True, **{kwargs!r}))
+master.load_data()
+task_id = {task_id!r}
+{edit}
+master.write_data()
+master.close()
+'''
+
+class SilentUI:
+    def relay(self, message=''):
+        pass
+
+    def request(self, request_type=bool, message=''):
+        return True
+
+class SharedStorageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = None
+        self.masters = []
+
+    def tearDown(self):
+        for master in self.masters:
+            master.close()
+        shutil.rmtree(self.dir)
+
+    def master(self, kwargs):
+        master = Master(SilentUI(), storage=JSONStorage(self.path, shared=True, **kwargs))
+        master.load_data()
+        self.masters.append(master)
+        return master
+
+    def new_store(self, mode):
+        ''' Points self.path at a new store for 'mode'. '''
+
+        self.path = os.path.join(self.dir, mode.replace(' ', '_'), "storage.json")
+        os.makedirs(os.path.dirname(self.path))
+
+    def other_process(self, kwargs, task_id, edit, wait=True):
+        ''' Runs 'edit' (code) on the store in another process, see OTHER_PROCESS. If 'wait' is
+        False the process is returned without waiting for it to exit. '''
+
+        code = OTHER_PROCESS.format(root=ROOT, path=self.path, kwargs=kwargs, task_id=task_id, edit=textwrap.dedent(edit))
+        if not wait:
+            return subprocess.Popen([sys.executable, "-c", code])
+
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+    def seed(self, kwargs, titles):
+        ''' Creates a task in the active group for each title in 'titles' and returns their IDs. '''
+
+        master = self.master(kwargs)
+        task_ids = master.create_tasks([{"title": title} for title in titles], group_id=master.get_active_group())
+        master.write_data()
+
+        return task_ids
+
+    def test_same_task_different_fields(self):
+        for mode, kwargs in MODES.items():
+            with self.subTest(mode=mode):
+                self.new_store(mode)
+
+                first = self.master(kwargs)
+                task_id = first.create_task(task_kwargs={"title": "old", "links": ["a", "b"]})
+                first.write_data()
+
+                master = self.master(kwargs)
+                task = master.get_task(task_id)
+                task.set_title("new")
+                task.remove_link("a")
+
+                self.other_process(kwargs, task_id, '''
+                    task = master.get_task(task_id)
+                    task.add_comment("comment")
+                    task.add_link("c")
+                ''')
+                master.write_data()
+
+                task = self.master(kwargs).get_task(task_id)
+                self.assertEqual(task.get_title(), "new")
+                self.assertEqual(task.get_comments(), ["comment"])
+                self.assertEqual(task.get_links(), ["b", "c"])
+
+    def test_same_task_same_fields(self):
+        for mode, kwargs in MODES.items():
+            with self.subTest(mode=mode):
+                self.new_store(mode)
+                task_id, = self.seed(kwargs, ["old"])
+
+                master = self.master(kwargs)
+                master.get_task(task_id).set_title("local")
+                master.get_task(task_id).add_link("local")
+
+                self.other_process(kwargs, task_id, '''
+                    master.get_task(task_id).set_title("remote")
+                    master.get_task(task_id).add_link("remote")
+                ''')
+                master.write_data()
+
+                task = self.master(kwargs).get_task(task_id)
+                self.assertEqual(task.get_title(), "local")
+                self.assertEqual(task.get_links(), ["remote", "local"])
+
+    def test_remote_delete(self):
+        for mode, kwargs in MODES.items():
+            with self.subTest(mode=mode):
+                self.new_store(mode)
+                kept_id, removed_id, modified_id = self.seed(kwargs, ["kept", "removed", "modified"])
+
+                master = self.master(kwargs)
+                master.get_task(modified_id).set_title("modified locally")
+
+                self.other_process(kwargs, removed_id, f'''
+                    master.remove_tasks([task_id, {modified_id!r}])
+                ''')
+                master.sync()
+
+                self.assertNotIn(removed_id, master.get_tasks())
+                self.assertNotIn(removed_id, master.get_group_tasks(master.get_active_group()))
+                master.write_data()
+
+                other = self.master(kwargs)
+                self.assertNotIn(removed_id, other.get_tasks())
+                self.assertIn(kept_id, other.get_tasks())
+                self.assertEqual(other.get_task(modified_id).get_title(), "modified locally")
+
+    def test_remote_delete_beyond_change_log(self):
+        for mode, kwargs in MODES.items():
+            with self.subTest(mode=mode):
+                self.new_store(mode)
+                kept_id, removed_id = self.seed(kwargs, ["kept", "removed"])
+
+                master = self.master(kwargs)
+
+                # More writes than the change log holds, so that the entire store is fetched.
+                self.other_process(kwargs, removed_id, f'''
+                    import storage
+                    storage.SHARED_CHANGE_LOG_LENGTH = 2
+                    for title in ("a", "b", "c", "d"):
+                        master.get_task({kept_id!r}).set_title(title)
+                        master.write_data()
+                    master.remove_tasks([task_id])
+                ''')
+                master.sync()
+
+                self.assertNotIn(removed_id, master.get_tasks())
+                self.assertEqual(master.get_task(kept_id).get_title(), "d")
+
+    def test_remote_group_reorder(self):
+        for mode, kwargs in MODES.items():
+            with self.subTest(mode=mode):
+                self.new_store(mode)
+                first_id, second_id, third_id = self.seed(kwargs, ["first", "second", "third"])
+
+                master = self.master(kwargs)
+                group_id = master.get_active_group()
+                new_id = master.create_task(group_id=group_id, task_kwargs={"title": "new"})
+
+                self.other_process(kwargs, first_id, '''
+                    master.move_task(task_id, 2, group_id=master.get_active_group())
+                ''')
+                master.write_data()
+
+                order = [second_id, third_id, first_id, new_id]
+                self.assertEqual(master.get_group_tasks(group_id), order)
+                self.assertEqual(self.master(kwargs).get_group_tasks(group_id), order)
+
+    def test_write_waits_for_lock(self):
+        self.new_store("eager")
+        task_id, = self.seed({}, ["old"])
+        locked_path = os.path.join(self.dir, "locked")
+
+        master = self.master({})
+        master.get_task(task_id).set_title("local")
+
+        process = self.other_process({}, task_id, f'''
+            import time
+            with master.storage.locked():
+                open({locked_path!r}, "w").close()
+                time.sleep(1)
+                master.get_task(task_id).add_comment("remote")
+                master.write_data()
+        ''', wait=False)
+
+        try:
+            while not os.path.exists(locked_path):
+                self.assertIsNone(process.poll())
+                time.sleep(0.01)
+
+            start = time.monotonic()
+            master.write_data()
+            self.assertGreater(time.monotonic() - start, 0.5)
+        finally:
+            self.assertEqual(process.wait(), 0)
+
+        task = self.master({}).get_task(task_id)
+        self.assertEqual(task.get_title(), "local")
+        self.assertEqual(task.get_comments(), ["remote"])
+
+    def test_shared_conflicts_with_storage(self):
+        self.new_store("eager")
+
+        with self.assertRaises(ValueError):
+            Master(SilentUI(), storage=JSONStorage(self.path), shared=True)
+        with self.assertRaises(ValueError):
+            Master(SilentUI(), storage=SQLiteStorage(os.path.join(self.dir, "storage.db")), shared=True)
+
+        master = Master(SilentUI(), storage=JSONStorage(self.path, shared=True), shared=True)
+        self.assertTrue(master.storage.shared)
+
+if __name__ == "__main__":
+    unittest.main()
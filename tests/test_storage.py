@@ -0,0 +1,102 @@
+''' Tests of writing and reloading a store with each storage backend.
+
+Run from the repository root with: python -m unittest discover tests
+'''
+
+import os, sys, shutil, tempfile, unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import Master
+from storage import JSONStorage, SQLiteStorage, ShardedStorage, BinaryStorage
+
+# Storage of each backend, given the directory to store in.
+BACKENDS = {
+    "json": lambda path: JSONStorage(os.path.join(path, "storage.json")),
+    "journal": lambda path: JSONStorage(os.path.join(path, "storage.json"), journal=True),
+    "lazy json": lambda path: JSONStorage(os.path.join(path, "storage.json"), lazy=True),
+    "sqlite": lambda path: SQLiteStorage(os.path.join(path, "storage.db")),
+    "sharded": lambda path: ShardedStorage(os.path.join(path, "shards")),
+    "binary": lambda path: BinaryStorage(os.path.join(path, "storage.bin"))
+}
+
+class SilentUI:
+    def relay(self, message=''):
+        pass
+
+    def request(self, request_type=bool, message=''):
+        return True
+
+class StorageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.masters = []
+
+    def tearDown(self):
+        for master in self.masters:
+            master.close()
+        shutil.rmtree(self.dir)
+
+    def master(self, backend):
+        path = os.path.join(self.dir, backend.replace(' ', '_'))
+        os.makedirs(os.path.join(path, "shards"), exist_ok=True)
+
+        master = Master(SilentUI(), storage=BACKENDS[backend](path))
+        master.load_data()
+        self.masters.append(master)
+        return master
+
+    def snapshot(self, master):
+        ''' Returns the groups and tasks of 'master' as plain values. '''
+
+        groups = {group_id: (master.get_group_title(group_id), master.get_group_tasks(group_id)) for group_id in master.get_groups()}
+        tasks = {}
+        for task_id in master.get_tasks():
+            task = master.get_task(task_id)
+            tasks[task_id] = (task.get_title(), task.get_description(), task.get_status(), task.get_comments(), task.get_links(),
+                task.get_files(), task.get_subtasks(), task.get_parents())
+
+        return groups, tasks, master.get_active_group()
+
+    def assertReloads(self, backend, master):
+        ''' Writes 'master' and asserts that a new Master loads the same data. '''
+
+        master.write_data()
+        self.assertEqual(self.snapshot(self.master(backend)), self.snapshot(master))
+
+    def test_round_trip(self):
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                master = self.master(backend)
+                group_id = master.create_group("Group")
+                parent_id = master.create_task(group_id=group_id, task_kwargs={"title": "parent", "description": "é ☃"})
+                subtask_id = master.create_subtask(parent_id, task_kwargs={"title": "subtask", "comments": ["comment"]})
+                default_group_id = master.get_active_group()
+                other_ids = master.create_tasks([{"title": f"T{i}", "links": [f"link {i}"]} for i in range(5)], group_id=default_group_id)
+                master.set_active_group(group_id)
+                self.assertReloads(backend, master)
+
+                master = self.master(backend)
+                master.get_task(subtask_id).set_title("renamed")
+                master.get_task(subtask_id).toggle_status()
+                master.get_task(other_ids[0]).add_comment("new comment")
+                master.get_task(other_ids[1]).remove_link("link 1")
+                master.group_remove_task(other_ids[2], default_group_id)
+                master.make_subtask(other_ids[2], parent_id)
+                master.set_group_title(group_id, "Renamed")
+                self.assertReloads(backend, master)
+
+                master = self.master(backend)
+                master.remove_tasks([parent_id, other_ids[3]])
+                master.remove_group(group_id)
+                self.assertReloads(backend, master)
+
+                groups, tasks, active_group_id = self.snapshot(self.master(backend))
+                self.assertNotIn(group_id, groups)
+                self.assertEqual(sorted(tasks), sorted(other_ids[:2] + other_ids[4:]))
+                self.assertEqual(groups[default_group_id][1], other_ids[:2] + other_ids[4:])
+
+if __name__ == "__main__":
+    unittest.main()